@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api.connections import close_unusable_connections
+        from api.preloading import preload_model_classes_at_startup
+
+        request_started.connect(close_unusable_connections)
+
+        if settings.DYNAMIC_MODELS_PRELOAD:
+            preload_model_classes_at_startup(settings.DYNAMIC_MODELS_PRELOAD, settings.DYNAMIC_MODELS_PRELOAD_LIMIT)
@@ -0,0 +1,140 @@
+"""
+Archive tables of dynamic models, holding cold rows moved out of their table.
+
+The archive table of a dynamic model has the columns of its table, rows keep
+their ID and change sequence number. Archive model classes are generated
+from the model class of the table and registered in their own app registry,
+so their names never clash with dynamic models.
+"""
+import threading
+
+from django.apps.registry import Apps
+from django.db import connections, transaction
+
+from api.models import DynamicTable
+
+
+# Field types whose values are compressed in compressed archive tables
+COMPRESSED_FIELD_TYPES = ('CharField', 'TextField', 'JSONField')
+# Rows wider than this many bytes are compressed by PostgreSQL, the smallest target it accepts
+ARCHIVE_TOAST_TUPLE_TARGET = 128
+
+archive_apps = Apps()
+
+# Archive model classes keyed by dynamic model ID, along with the model class they were generated from
+_archive_classes = {}
+_archive_classes_lock = threading.Lock()
+
+
+def archive_table_name(dynamic_model):
+    # Tables of dynamic models are prefixed with the app label, so this never names one of them
+    return f'archive_{dynamic_model.name}'
+
+
+def generate_archive_model_class(dynamic_model, model_class):
+    """Return the archive model class of a dynamic model, with the fields of its model class."""
+
+    with _archive_classes_lock:
+        cached_model_class, archive_class = _archive_classes.get(dynamic_model.id, (None, None))
+        if cached_model_class is not model_class:
+            meta = type('Meta', (), {
+                'apps': archive_apps,
+                'app_label': model_class._meta.app_label,
+                'db_table': archive_table_name(dynamic_model),
+            })
+            fields_data = {'__module__': 'api.models', 'Meta': meta, '_database': model_class._database}
+            fields_data.update({
+                field.name: field.clone() for field in model_class._meta.local_concrete_fields
+                if not field.primary_key and field.name != 'change_seq'
+            })
+            archive_class = type(f'{model_class.__name__}archive', (DynamicTable,), fields_data)
+            _archive_classes[dynamic_model.id] = (model_class, archive_class)
+
+    return archive_class
+
+
+def get_archive_tables():
+    """Return names of the archive tables of archive model classes generated by this process."""
+
+    return {archive_class._meta.db_table for archive_class in list(archive_apps.all_models['api'].values())}
+
+
+def compress_archive_columns(connection, archive_class, fields):
+    """
+    Compress values of the given text and JSON fields of an archive table on PostgreSQL.
+
+    Columns use lz4 compression when the server is built with it. Other
+    databases store archive tables uncompressed.
+    """
+
+    if connection.vendor != 'postgresql':
+        return
+
+    columns = [field.column for field in fields if field.get_internal_type() in COMPRESSED_FIELD_TYPES]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_settings WHERE name = 'default_toast_compression' AND 'lz4' = ANY(enumvals)"
+        )
+        if cursor.fetchone() is None:
+            return
+        table = connection.ops.quote_name(archive_class._meta.db_table)
+        for column in columns:
+            cursor.execute(f'ALTER TABLE {table} ALTER COLUMN {connection.ops.quote_name(column)} SET COMPRESSION lz4')
+
+
+def compress_archive_table(connection, archive_class):
+    """Compress rows of an archive table written from now on, on PostgreSQL."""
+
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        # Rows are compressed when wider than the target instead of the default of about 2kB
+        cursor.execute(
+            f'ALTER TABLE {connection.ops.quote_name(archive_class._meta.db_table)} '
+            f'SET (toast_tuple_target = {ARCHIVE_TOAST_TUPLE_TARGET})'
+        )
+    compress_archive_columns(connection, archive_class, archive_class._meta.local_concrete_fields)
+
+
+def create_archive_table(dynamic_model, archive_class, compress):
+    """Create the archive table of a dynamic model, compressed or not."""
+
+    connection = connections[dynamic_model.database]
+    with connection.schema_editor() as editor:
+        editor.create_model(archive_class)
+    if compress:
+        compress_archive_table(connection, archive_class)
+
+
+def archive_chunk(dynamic_model, archive_class, chunk):
+    """Move rows of a queryset of a dynamic model table to its archive table and return their number."""
+
+    using = dynamic_model.database
+    field_names = [field.attname for field in archive_class._meta.concrete_fields]
+    with transaction.atomic(using=using):
+        # Rows are locked so that they are not updated between their copy and their deletion
+        rows = list(chunk.using(using).select_for_update().values(*field_names))
+        if not rows:
+            return 0
+
+        archive_class.objects.using(using).bulk_create([archive_class(**row) for row in rows])
+        return chunk.model.objects.using(using).filter(pk__in=[row['id'] for row in rows]).delete()[0]
+
+
+def copy_archive_rows(source_archive_class, target_archive_class, source, target, batch_size):
+    """Copy rows of an archive table to another database in batches of primary keys, return their number."""
+
+    field_names = [field.attname for field in source_archive_class._meta.concrete_fields]
+    queryset = source_archive_class.objects.using(source).order_by('pk')
+    copied_count = 0
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(batch.values(*field_names)[:batch_size])
+        if not rows:
+            return copied_count
+
+        target_archive_class.objects.using(target).bulk_create([target_archive_class(**row) for row in rows])
+        copied_count += len(rows)
+        last_pk = rows[-1]['id']
@@ -0,0 +1,179 @@
+"""
+PostgreSQL database backend that takes its connections from an in-process pool.
+
+Connections are shared between the threads of a process through a
+psycopg2 ThreadedConnectionPool: Django "closing" a connection returns it
+to the pool instead of closing it. Pool settings are read from the POOL
+key of the database settings:
+
+    'POOL': {
+        'MIN_CONNS': 4,          # connections opened up front and kept open when idle
+        'MAX_CONNS': 10,         # upper bound of open connections, extra ones are closed when released
+        'TIMEOUT': 5,            # seconds to wait for a free connection
+        'HEALTH_CHECKS': True,   # ping pooled connections before handing them out
+    }
+"""
+import threading
+import time
+
+import psycopg2
+import psycopg2.extras
+from psycopg2 import pool
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+from api.backends.postgresql_pool.creation import DatabaseCreation
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(pool.ThreadedConnectionPool):
+    """Threaded connection pool that keeps usage metrics."""
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self.metrics = {
+            'created': 0,
+            'acquired': 0,
+            'released': 0,
+            'discarded': 0,
+            'exhausted': 0,
+            'wait_seconds': 0.0,
+        }
+        self.maxconn = maxconn
+        self._metrics_lock = threading.Lock()
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def count(self, metric, value=1):
+        with self._metrics_lock:
+            self.metrics[metric] += value
+
+    def _connect(self, key=None):
+        self.count('created')
+        return super()._connect(key)
+
+    def stats(self):
+        """Return pool metrics with the current number of idle and used connections."""
+
+        with self._lock, self._metrics_lock:
+            return {
+                **self.metrics,
+                'max_connections': self.maxconn,
+                'idle': len(self._pool),
+                'in_use': len(self._used),
+            }
+
+
+def get_pool_stats():
+    """Return metrics of every connection pool of the process keyed by database alias."""
+
+    with _pools_lock:
+        pools = {alias: connection_pool for alias, (conn_params, connection_pool) in _pools.items()}
+
+    return {alias: connection_pool.stats() for alias, connection_pool in pools.items()}
+
+
+def close_pools(database=None):
+    """Close the connections of every pool, or of the pools connected to the given database name."""
+
+    with _pools_lock:
+        for alias, (conn_params, connection_pool) in list(_pools.items()):
+            if database is None or conn_params['database'] == database:
+                connection_pool.closeall()
+                del _pools[alias]
+
+
+def is_healthy(connection):
+    """Check that a pooled connection still works."""
+
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        # Leave the connection idle, the check must not start a transaction
+        if not connection.autocommit:
+            connection.rollback()
+    except psycopg2.Error:
+        return False
+
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    connection_pool = None
+
+    @property
+    def pool_settings(self):
+        return {'MIN_CONNS': 4, 'MAX_CONNS': 10, 'TIMEOUT': 5, 'HEALTH_CHECKS': True,
+                **self.settings_dict.get('POOL', {})}
+
+    def get_pool(self, conn_params):
+        """Return the pool of this database alias, creating it on first use or when settings change."""
+
+        with _pools_lock:
+            pool_conn_params, connection_pool = _pools.get(self.alias, (None, None))
+            if pool_conn_params != conn_params:
+                if self.settings_dict['CONN_MAX_AGE']:
+                    raise ImproperlyConfigured(
+                        'CONN_MAX_AGE must be 0 with a connection pool, connections are kept open by the pool.'
+                    )
+                # Settings of the alias changed, e.g. when tests switch to the test database
+                if connection_pool is not None:
+                    connection_pool.closeall()
+                connection_pool = ConnectionPool(
+                    self.pool_settings['MIN_CONNS'], self.pool_settings['MAX_CONNS'], **conn_params
+                )
+                _pools[self.alias] = (conn_params, connection_pool)
+
+        return connection_pool
+
+    def acquire_connection(self, conn_params):
+        """Take a healthy connection from the pool, waiting up to TIMEOUT seconds for one to be free."""
+
+        connection_pool = self.connection_pool = self.get_pool(conn_params)
+        started_at = time.monotonic()
+        while True:
+            try:
+                connection = connection_pool.getconn()
+            except pool.PoolError:
+                connection_pool.count('exhausted')
+                if time.monotonic() - started_at > self.pool_settings['TIMEOUT']:
+                    raise
+                time.sleep(0.01)
+                continue
+
+            if self.pool_settings['HEALTH_CHECKS'] and not is_healthy(connection):
+                connection_pool.count('discarded')
+                connection_pool.putconn(connection, close=True)
+                continue
+
+            connection_pool.count('acquired')
+            connection_pool.count('wait_seconds', time.monotonic() - started_at)
+            return connection
+
+    def get_new_connection(self, conn_params):
+        connection = self.acquire_connection(conn_params)
+
+        # Same connection setup as the postgresql backend, see its get_new_connection()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                if self.connection_pool.closed:
+                    return self.connection.close()
+                # The pool rolls back any transaction left open and closes broken connections
+                self.connection_pool.count('released')
+                self.connection_pool.putconn(self.connection, close=bool(self.connection.closed))
@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        from api.backends.postgresql_pool.base import close_pools
+
+        # Pooled connections to the test database would prevent dropping it
+        close_pools(database=test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,321 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from itertools import cycle
+
+import django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import DynamicModel
+from api.records import get_field_names, get_records
+from api.utils import (
+    generate_model_class,
+    write_fields_changes_in_database,
+    update_dynamic_model_with_new_fields
+)
+
+
+STARTUP_SETTINGS_MODULES = ('dynamicModels.settings', 'dynamicModels.settings_api')
+
+# Run in a fresh interpreter: set up Django and serve a first request, which loads the url
+# configuration and views, then report duration, peak memory and loaded modules.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+started_at = time.perf_counter()
+import django
+django.setup()
+from django.apps import apps
+from django.test import Client
+response = Client(HTTP_HOST='localhost').get('/api/pool/stats/')
+print(json.dumps({
+    'seconds': time.perf_counter() - started_at,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'apps': [app_config.name for app_config in apps.get_app_configs()],
+    'status_code': response.status_code,
+}))
+"""
+
+FIELD_TYPES = ('string', 'number', 'boolean')
+FIELD_VALUES = {'string': 'benchmark value', 'number': 42, 'boolean': True}
+
+
+def generate_schema(width):
+    """Generate a synthetic fields schema with the given number of fields."""
+
+    field_types = cycle(FIELD_TYPES)
+    return {f'field{index}': next(field_types) for index in range(width)}
+
+
+def generate_rows(schema, count):
+    """Generate synthetic rows matching the given fields schema."""
+
+    row = {field_name: FIELD_VALUES[field_type] for field_name, field_type in schema.items()}
+    return [dict(row) for _ in range(count)]
+
+
+def generate_updated_schema(schema):
+    """Generate an update of the given schema that adds a field and converts numbers to strings."""
+
+    new_schema = {field_name: 'string' if field_type == 'number' else field_type
+                  for field_name, field_type in schema.items()}
+    new_schema['extra_field'] = 'string'
+    return new_schema
+
+
+def measure(func, repeat=1):
+    """Run func `repeat` times and return median duration and query count of the runs."""
+
+    durations = []
+    queries = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+
+    return {'seconds': statistics.median(durations), 'queries': max(queries)}
+
+
+def measure_memory(load_rows, using=DEFAULT_DB_ALIAS):
+    """Return the number of bytes retained per row by the rows load_rows returns, with duration and query count."""
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connections[using]) as context:
+            start = time.perf_counter()
+            rows = load_rows()
+            seconds = time.perf_counter() - start
+        retained_bytes = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': seconds,
+        'queries': len(context.captured_queries),
+        'bytes_per_row': retained_bytes // max(len(rows), 1),
+    }
+
+
+def measure_startup(settings_module):
+    """Measure cold start of a worker process using the given settings module."""
+
+    output = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT],
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module, 'DYNAMIC_MODELS_PRELOAD': ''},
+        cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+    ).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+def drop_dynamic_model(dynamic_model):
+    """Drop the table of a dynamic model and remove its details."""
+
+    model_class = generate_model_class(dynamic_model)
+    if model_class:
+        with connections[dynamic_model.database].schema_editor() as editor:
+            editor.delete_model(model_class)
+    dynamic_model.delete()
+
+
+class BenchmarkRunner:
+    """Time api endpoints and model helpers against synthetic schemas."""
+
+    def __init__(self, widths=(5, 20, 50), row_counts=(10, 100, 1000), repeat=3):
+        self.widths = widths
+        self.row_counts = row_counts
+        self.repeat = repeat
+        self.client = APIClient()
+        self.results = []
+        self._counter = 0
+
+    def _model_name(self, prefix):
+        self._counter += 1
+        return f'{prefix}{self._counter}'
+
+    def _record(self, name, width, rows, measurement):
+        self.results.append({'name': name, 'width': width, 'rows': rows, **measurement})
+
+    def _create(self, schema, prefix='bench'):
+        data = {'model_name': self._model_name(prefix), 'fields': schema}
+        response = self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        assert response.status_code == 201, response.data
+        return DynamicModel.objects.get(name=data['model_name'])
+
+    def bench_create(self, width):
+        schema = generate_schema(width)
+        created = []
+        self._record('create', width, 0, measure(lambda: created.append(self._create(schema)), self.repeat))
+        for dynamic_model in created:
+            drop_dynamic_model(dynamic_model)
+
+    def bench_generate_model_class(self, width):
+        dynamic_model = self._create(generate_schema(width))
+        self._record('generate_model_class', width, 0, measure(lambda: generate_model_class(dynamic_model), self.repeat))
+        drop_dynamic_model(dynamic_model)
+
+    def bench_populate_and_list(self, width, row_count):
+        schema = generate_schema(width)
+        dynamic_model = self._create(schema)
+        data = {'rows': generate_rows(schema, row_count)}
+
+        def populate():
+            response = self.client.post(
+                reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id}), data, format='json'
+            )
+            assert response.status_code == 201, response.data
+
+        def list_rows():
+            response = self.client.get(
+                reverse('api:list_dynamic_model_data', kwargs={'model_id': dynamic_model.id})
+            )
+            assert response.status_code == 200, response.data
+
+        self._record('populate', width, row_count, measure(populate, self.repeat))
+        # Listing after populate returns `repeat` times the generated rows
+        self._record('list', width, row_count * self.repeat, measure(list_rows, self.repeat))
+        drop_dynamic_model(dynamic_model)
+
+    def bench_row_memory(self, width, row_count):
+        schema = generate_schema(width)
+        dynamic_model = self._create(schema)
+        response = self.client.post(
+            reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id}),
+            {'rows': generate_rows(schema, row_count)}, format='json'
+        )
+        assert response.status_code == 201, response.data
+
+        model_class = generate_model_class(dynamic_model)
+        field_names = get_field_names(dynamic_model)
+        # Rows are read from the database queries are counted on, not from a replica
+        queryset = model_class.objects.using(dynamic_model.database)
+        self._record('memory instances', width, row_count, measure_memory(
+            lambda: list(queryset.all()), dynamic_model.database
+        ))
+        self._record('memory records', width, row_count, measure_memory(
+            lambda: list(get_records(queryset.all(), field_names)), dynamic_model.database
+        ))
+        drop_dynamic_model(dynamic_model)
+
+    def bench_update(self, width):
+        schema = generate_schema(width)
+        new_schema = generate_updated_schema(schema)
+        dynamic_model = self._create(schema)
+
+        def update():
+            response = self.client.put(
+                reverse('api:update_dynamic_model', kwargs={'model_id': dynamic_model.id}),
+                {'fields': new_schema}, format='json'
+            )
+            assert response.status_code == 200, response.data
+
+        self._record('update', width, 0, measure(update))
+        drop_dynamic_model(dynamic_model)
+
+    def bench_write_fields_changes_in_database(self, width):
+        schema = generate_schema(width)
+        new_schema = generate_updated_schema(schema)
+        dynamic_model = self._create(schema)
+
+        old_model_class = generate_model_class(dynamic_model)
+        fields_names_to_delete = update_dynamic_model_with_new_fields(new_schema, dynamic_model)
+        new_model_class = generate_model_class(dynamic_model)
+
+        self._record('write_fields_changes_in_database', width, 0, measure(
+            lambda: write_fields_changes_in_database(old_model_class, new_model_class, fields_names_to_delete)
+        ))
+        drop_dynamic_model(dynamic_model)
+
+    def bench_startup(self, settings_module):
+        startups = [measure_startup(settings_module) for _ in range(self.repeat)]
+        self.results.append({
+            'name': f'startup {settings_module}',
+            'width': 0,
+            'rows': 0,
+            'seconds': statistics.median(startup['seconds'] for startup in startups),
+            'queries': 0,
+            'max_rss_kb': max(startup['max_rss_kb'] for startup in startups),
+            'modules': startups[0]['modules'],
+        })
+
+    def run(self):
+        """Run all benchmarks and return the results document."""
+
+        for settings_module in STARTUP_SETTINGS_MODULES:
+            self.bench_startup(settings_module)
+
+        with warnings.catch_warnings():
+            # Generating the same model class repeatedly re-registers it in the app registry
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for width in self.widths:
+                self.bench_create(width)
+                self.bench_generate_model_class(width)
+                self.bench_update(width)
+                self.bench_write_fields_changes_in_database(width)
+                for row_count in self.row_counts:
+                    self.bench_populate_and_list(width, row_count)
+                    self.bench_row_memory(width, row_count)
+
+        return {
+            'meta': {
+                'vendor': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'repeat': self.repeat,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+            },
+            'results': self.results,
+        }
+
+
+def compare_results(baseline, current, tolerance=0.25):
+    """
+    Compare two results documents and return a list of regressions.
+
+    Any increase in query count is a regression; durations regress when they
+    grow by more than `tolerance` (a ratio) over the baseline.
+    """
+
+    baseline_results = {
+        (result['name'], result['width'], result['rows']): result for result in baseline['results']
+    }
+    regressions = []
+    for result in current['results']:
+        old_result = baseline_results.get((result['name'], result['width'], result['rows']))
+        if old_result is None:
+            continue
+        if result['queries'] > old_result['queries']:
+            regressions.append({**result, 'reason': f'queries {old_result["queries"]} -> {result["queries"]}'})
+        elif result['seconds'] > old_result['seconds'] * (1 + tolerance):
+            regressions.append({
+                **result, 'reason': f'seconds {old_result["seconds"]:.4f} -> {result["seconds"]:.4f}'
+            })
+
+    return regressions
+
+
+def write_results(results, path):
+    """Write a results document to a JSON file."""
+
+    with open(path, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+
+
+def read_results(path):
+    """Read a results document from a JSON file."""
+
+    with open(path) as input_file:
+        return json.load(input_file)
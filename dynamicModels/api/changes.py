@@ -0,0 +1,105 @@
+import heapq
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from api.models import ChangeCounter, DeletedRow
+from api.records import get_field_names, get_records
+
+
+OPERATION_UPSERT = 'upsert'
+OPERATION_DELETE = 'delete'
+
+# Tokens are the change sequence number and row ID of the last change a consumer read
+INITIAL_TOKEN = '0-0'
+TOKEN_PATTERN = r'^\d+-\d+$'
+
+
+def parse_token(token):
+    change_seq, _, row_id = token.partition('-')
+    return int(change_seq), int(row_id)
+
+
+def format_token(change_seq, row_id):
+    return f'{change_seq}-{row_id}'
+
+
+def allocate_change_seqs(dynamic_model, count):
+    """
+    Give out `count` consecutive change sequence numbers of a dynamic model table and return the first one.
+
+    It has to be called in a transaction of the database holding the table:
+    the counter stays locked until the transaction ends, so that changes
+    with smaller numbers are never committed after changes with larger ones.
+    """
+
+    counters = ChangeCounter.objects.using(dynamic_model.database).filter(dynamic_model_id=dynamic_model.id)
+    if not counters.update(last_change_seq=F('last_change_seq') + count):
+        # The counter of a table is created on its first change
+        ChangeCounter.objects.using(dynamic_model.database).get_or_create(dynamic_model_id=dynamic_model.id)
+        counters.update(last_change_seq=F('last_change_seq') + count)
+
+    return counters.values_list('last_change_seq', flat=True).get() - count + 1
+
+
+def get_last_change_seq(dynamic_model):
+    counters = ChangeCounter.objects.using(dynamic_model.database).filter(dynamic_model_id=dynamic_model.id)
+    return counters.values_list('last_change_seq', flat=True).first() or 0
+
+
+def delete_tracked_rows(dynamic_model, queryset):
+    """Delete rows of a queryset of a dynamic model table, recording them in the change feed of the table."""
+
+    using = dynamic_model.database
+    with transaction.atomic(using=using):
+        row_ids = list(queryset.using(using).values_list('pk', flat=True))
+        if not row_ids:
+            return 0
+
+        change_seq = allocate_change_seqs(dynamic_model, 1)
+        DeletedRow.objects.using(using).bulk_create([
+            DeletedRow(dynamic_model_id=dynamic_model.id, row_id=row_id, change_seq=change_seq) for row_id in row_ids
+        ])
+        # Rows matching the queryset since they were read are left for the next chunk
+        return queryset.model.objects.using(using).filter(pk__in=row_ids).delete()[0]
+
+
+def get_changes(dynamic_model, model_class, token, limit):
+    """
+    Return up to `limit` changes of a dynamic model table after a token, and whether more changes follow.
+
+    Changes are (change sequence number, row ID, record) tuples in the order
+    they were made, the record of a deleted row is None. Changes are read from
+    the database holding the table, replicas may lag behind the token.
+    """
+
+    change_seq, row_id = parse_token(token)
+    using = dynamic_model.database
+
+    rows = model_class.objects.using(using).filter(
+        Q(change_seq__gt=change_seq) | Q(change_seq=change_seq, id__gt=row_id)
+    ).order_by('change_seq', 'id')
+    field_names = ['id', 'change_seq', *get_field_names(dynamic_model)]
+    upserts = ((record.change_seq, record.id, record) for record in get_records(rows[:limit + 1], field_names))
+
+    deleted_rows = DeletedRow.objects.using(using).filter(
+        Q(change_seq__gt=change_seq) | Q(change_seq=change_seq, row_id__gt=row_id), dynamic_model_id=dynamic_model.id
+    ).order_by('change_seq', 'row_id')
+    deletes = ((*deleted_row, None) for deleted_row in deleted_rows.values_list('change_seq', 'row_id')[:limit + 1])
+
+    changes = list(heapq.merge(upserts, deletes, key=lambda change: change[:2]))
+    return changes[:limit], len(changes) > limit
+
+
+def wait_for_changes(dynamic_model, change_seq, timeout):
+    """Wait up to `timeout` seconds for changes after a change sequence number, return whether there are some."""
+
+    deadline = time.monotonic() + timeout
+    while get_last_change_seq(dynamic_model) <= change_seq:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(settings.DYNAMIC_MODEL_CHANGES_POLL_INTERVAL, remaining))
+
+    return True
@@ -0,0 +1,32 @@
+from django.db import connections
+
+
+def close_unusable_connections(**kwargs):
+    """
+    Close persistent connections that fail a health check, before a request uses them.
+
+    Enabled per database with the CONN_HEALTH_CHECKS setting, so that a
+    connection dropped by the server while kept open by CONN_MAX_AGE is
+    replaced instead of failing the request.
+    """
+
+    for connection in connections.all():
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS') or connection.connection is None:
+            continue
+        if connection.in_atomic_block:
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+POOL_ENGINE = 'api.backends.postgresql_pool'
+
+
+def get_connection_pools_stats():
+    """Return metrics of the in-process connection pools, empty when no database uses one."""
+
+    if not any(connection.settings_dict['ENGINE'] == POOL_ENGINE for connection in connections.all()):
+        return {}
+
+    from api.backends.postgresql_pool.base import get_pool_stats
+    return get_pool_stats()
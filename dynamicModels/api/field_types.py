@@ -0,0 +1,154 @@
+import datetime
+import decimal
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+
+from api.models import DynamicModelField
+
+
+STRING_MAX_LENGTH = 255
+DECIMAL_MAX_DIGITS = 30
+DECIMAL_PLACES = 10
+NUMBER_RANGE = (-2 ** 31, 2 ** 31 - 1)
+BIGINT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+BOOLEAN_TEXTS = {'true': True, 'false': False, '1': True, '0': False}
+
+# Fields of these types can be the partition key of a partitioned table
+PARTITION_FIELD_TYPES = (DynamicModelField.FIELD_TYPE_CHOICE_NUMBER, DynamicModelField.FIELD_TYPE_CHOICE_BIGINT)
+
+# Type changes applied to existing columns without losing or rejecting stored values
+SAFE_CONVERSIONS = {
+    'string': {'text'},
+    'number': {'bigint', 'float', 'decimal', 'string', 'text'},
+    'boolean': {'string', 'text'},
+    'text': set(),
+    'bigint': {'decimal', 'string', 'text'},
+    'float': {'string', 'text'},
+    'decimal': {'string', 'text'},
+    'date': {'datetime', 'string', 'text'},
+    'datetime': {'string', 'text'},
+    'json': {'text'},
+}
+
+
+def check_types(*types):
+    """Return a converter accepting columns whose values are all of the given types."""
+
+    def convert(values):
+        # Check the set of types found in the column rather than each value
+        if set(map(type, values)) - set(types):
+            raise ValueError(f'Values should be of type {" or ".join(t.__name__ for t in types)}')
+        return values
+
+    return convert
+
+
+def convert_strings(values):
+    values = check_types(str)(values)
+    if max(map(len, values), default=0) > STRING_MAX_LENGTH:
+        raise ValueError(f'Values should be at most {STRING_MAX_LENGTH} characters')
+    return values
+
+
+def integers_in_range(low, high):
+    def convert(values):
+        values = check_types(int)(values)
+        if values and (min(values) < low or max(values) > high):
+            raise ValueError(f'Values should be between {low} and {high}')
+        return values
+
+    return convert
+
+
+def convert_floats(values):
+    return list(map(float, check_types(int, float)(values)))
+
+
+def convert_decimals(values):
+    quantum = decimal.Decimal(1).scaleb(-DECIMAL_PLACES)
+    values = [decimal.Decimal(str(value)) for value in check_types(str, int, float)(values)]
+    if not all(value.is_finite() and value.adjusted() < DECIMAL_MAX_DIGITS - DECIMAL_PLACES for value in values):
+        raise ValueError(f'Values should have at most {DECIMAL_MAX_DIGITS - DECIMAL_PLACES} integer digits')
+    return [value.quantize(quantum) for value in values]
+
+
+def convert_dates(values):
+    return list(map(datetime.date.fromisoformat, check_types(str)(values)))
+
+
+def convert_datetimes(values):
+    values = list(map(datetime.datetime.fromisoformat, check_types(str)(values)))
+    # Naive datetimes are in the default time zone
+    if settings.USE_TZ:
+        default_timezone = timezone.get_default_timezone()
+        values = [timezone.make_aware(value, default_timezone) if timezone.is_naive(value) else value for value in values]
+    return values
+
+
+def convert_json(values):
+    if any(value is None for value in values):
+        raise ValueError('Values should not be null')
+    return values
+
+
+FieldType = namedtuple('FieldType', ['model_field', 'serializer_field', 'convert_values', 'parse_text'])
+
+# Model field, serializer field, converter of a column of JSON values and parser of a CSV value of each field type
+FIELD_TYPES = {
+    'string': FieldType(
+        lambda: models.CharField(max_length=STRING_MAX_LENGTH), serializers.CharField, convert_strings, None
+    ),
+    'number': FieldType(models.IntegerField, serializers.IntegerField, integers_in_range(*NUMBER_RANGE), int),
+    'boolean': FieldType(
+        models.BooleanField, serializers.BooleanField, check_types(bool), lambda text: BOOLEAN_TEXTS[text.lower()]
+    ),
+    'text': FieldType(models.TextField, serializers.CharField, check_types(str), None),
+    'bigint': FieldType(models.BigIntegerField, serializers.IntegerField, integers_in_range(*BIGINT_RANGE), int),
+    'float': FieldType(models.FloatField, serializers.FloatField, convert_floats, float),
+    'decimal': FieldType(
+        lambda: models.DecimalField(max_digits=DECIMAL_MAX_DIGITS, decimal_places=DECIMAL_PLACES),
+        lambda: serializers.DecimalField(max_digits=DECIMAL_MAX_DIGITS, decimal_places=DECIMAL_PLACES),
+        convert_decimals, None
+    ),
+    'date': FieldType(models.DateField, serializers.DateField, convert_dates, None),
+    'datetime': FieldType(models.DateTimeField, serializers.DateTimeField, convert_datetimes, None),
+    'json': FieldType(models.JSONField, serializers.JSONField, convert_json, json.loads),
+}
+
+
+def build_model_field(field_type):
+    return FIELD_TYPES[field_type].model_field()
+
+
+def build_serializer_field(field_type):
+    return FIELD_TYPES[field_type].serializer_field()
+
+
+def convert_column(field_type, values):
+    """Validate a column of values of a field type and return them converted, raise ValueError if invalid."""
+
+    try:
+        return FIELD_TYPES[field_type].convert_values(values)
+    except (TypeError, ArithmeticError) as error:
+        raise ValueError(str(error))
+
+
+def convert_text_column(field_type, texts):
+    """Convert a column of CSV text values to values of a field type, raise ValueError if invalid."""
+
+    parse_text = FIELD_TYPES[field_type].parse_text
+    try:
+        values = list(map(parse_text, texts)) if parse_text else list(texts)
+    except (KeyError, TypeError, ArithmeticError) as error:
+        raise ValueError(str(error))
+
+    return convert_column(field_type, values)
+
+
+def is_safe_conversion(old_field_type, new_field_type):
+    return old_field_type == new_field_type or new_field_type in SAFE_CONVERSIONS[old_field_type]
@@ -0,0 +1,111 @@
+import functools
+import hashlib
+import json
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.models import IdempotencyKey
+from api.sharding import get_dynamic_model_database
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_MAX_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def get_expiry_time():
+    """Return the time before which stored idempotency keys are expired."""
+
+    return timezone.now() - timedelta(seconds=settings.DYNAMIC_MODEL_IDEMPOTENCY_KEY_TTL)
+
+
+def hash_request(request):
+    """
+    Hash the method, path and parsed data of a request, to detect keys reused for another request.
+
+    The parsed data is hashed rather than the raw body, which Django only keeps
+    in memory up to DATA_UPLOAD_MAX_MEMORY_SIZE, and the view reuses it.
+    """
+
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+
+    request_hash = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    request_hash.update(json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode())
+    return request_hash.hexdigest()
+
+
+def replay_response(idempotency_key):
+    return Response(idempotency_key.response, status=idempotency_key.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """
+    Make a view method safe to retry with an Idempotency-Key header.
+
+    The successful response of the first request sent with a key is stored
+    in the same transaction as the changes of the view. Repeating the key
+    replays the stored response without running the view again, until the
+    key expires after DYNAMIC_MODEL_IDEMPOTENCY_KEY_TTL seconds.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {'Error': f'{IDEMPOTENCY_KEY_HEADER} should be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The body is parsed once here, the view then reads the parsed data
+        request_hash = hash_request(request)
+
+        idempotency_key = IdempotencyKey.objects.filter(key=key).first()
+        if idempotency_key is not None and idempotency_key.created_at < get_expiry_time():
+            idempotency_key.delete()
+            idempotency_key = None
+
+        if idempotency_key is None:
+            # Rows are written to the database holding the table, the response to the default database
+            databases = sorted({DEFAULT_DB_ALIAS, get_dynamic_model_database(kwargs.get('model_id'))})
+            try:
+                with ExitStack() as stack:
+                    for database in databases:
+                        stack.enter_context(transaction.atomic(using=database))
+                    response = view_method(self, request, *args, **kwargs)
+                    if not status.is_success(response.status_code):
+                        return response
+                    # A concurrent request with the same key makes this insert fail and roll back the view changes
+                    IdempotencyKey.objects.create(
+                        key=key, request_hash=request_hash, status_code=response.status_code, response=response.data
+                    )
+                    return response
+            except IntegrityError:
+                idempotency_key = IdempotencyKey.objects.filter(key=key).first()
+                if idempotency_key is None:
+                    raise
+
+        if idempotency_key.request_hash != request_hash:
+            return Response(
+                {'Error': f'{IDEMPOTENCY_KEY_HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        return replay_response(idempotency_key)
+
+    return wrapper
+
+
+def purge_expired_idempotency_keys():
+    """Delete expired idempotency keys and return how many were deleted."""
+
+    return IdempotencyKey.objects.filter(created_at__lt=get_expiry_time()).delete()[0]
@@ -0,0 +1,234 @@
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from api.locking import table_lock
+from api.models import IngestionJob, IngestionTask
+from api.streaming import iter_chunks
+from api.uploads import FORMAT_CSV, iter_csv_rows, iter_columnar_rows
+from api.utils import generate_model_class, insert_rows
+
+
+logger = logging.getLogger(__name__)
+
+# Tables loaded at the same time by all jobs of the process, at most DYNAMIC_MODEL_INGEST_WORKERS
+_ingestion_slots = None
+_ingestion_slots_lock = threading.Lock()
+
+
+def get_ingestion_slots():
+    global _ingestion_slots
+    with _ingestion_slots_lock:
+        if _ingestion_slots is None:
+            _ingestion_slots = threading.BoundedSemaphore(settings.DYNAMIC_MODEL_INGEST_WORKERS)
+        return _ingestion_slots
+
+
+def resolve_ingestion_path(path, root):
+    """Return the absolute path of a file under root, or None when the path leads out of it."""
+
+    root = os.path.realpath(root)
+    resolved_path = os.path.realpath(os.path.join(root, path))
+    return resolved_path if os.path.commonpath([root, resolved_path]) == root else None
+
+
+def load_rows_file(dynamic_model, model_class, rows_file, file_format, on_rows_inserted=None):
+    """
+    Insert rows of a CSV or columnar file in a dynamic model table and return their number.
+
+    Rows are read and inserted in chunks of DYNAMIC_MODEL_INGEST_CHUNK_SIZE rows
+    within one transaction, so all rows are rolled back if any of them is invalid.
+    `on_rows_inserted` is called with the number of rows inserted so far after each chunk.
+    """
+
+    field_types = {field.name: field.field_type for field in dynamic_model.fields.all()}
+    chunk_size = settings.DYNAMIC_MODEL_INGEST_CHUNK_SIZE
+    if file_format == FORMAT_CSV:
+        chunks = iter_csv_rows(rows_file, field_types, chunk_size)
+    else:
+        chunks = iter_columnar_rows(rows_file, field_types)
+
+    rows_count = 0
+    with transaction.atomic(using=dynamic_model.database):
+        for chunk in chunks:
+            for rows in iter_chunks(chunk, chunk_size):
+                insert_rows(dynamic_model, model_class, rows)
+            rows_count += len(chunk)
+            if on_rows_inserted is not None:
+                on_rows_inserted(rows_count)
+
+    return rows_count
+
+
+def create_ingestion_job(entries, workers):
+    """Create an ingestion job loading (dynamic model, path, format) entries with `workers` tables at a time."""
+
+    with transaction.atomic():
+        job = IngestionJob.objects.create(workers=workers)
+        IngestionTask.objects.bulk_create([
+            IngestionTask(job=job, dynamic_model=dynamic_model, path=path, format=file_format)
+            for dynamic_model, path, file_format in entries
+        ])
+
+    return job
+
+
+@contextmanager
+def task_progress(task):
+    """Yield a function recording rows inserted by a task, on a connection outside of the transaction loading its table."""
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    if task.dynamic_model.database != DEFAULT_DB_ALIAS:
+        yield functools.partial(record_task_rows, connection, task)
+    elif connection.vendor == 'sqlite':
+        # The single writer of SQLite is held by the transaction loading the table, rows are recorded at the end
+        yield None
+    else:
+        connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            yield functools.partial(record_task_rows, connection, task)
+        finally:
+            connection.close()
+
+
+def record_task_rows(connection, task, rows_count):
+    """Record the number of rows a running task inserted so far, before they are committed."""
+
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote_name(IngestionTask._meta.db_table)} SET {quote_name("rows")} = %s WHERE {quote_name("id")} = %s',
+            [rows_count, task.id]
+        )
+
+
+def run_ingestion_task(task):
+    """Load the file of a task, recording its outcome on the task instead of raising errors."""
+
+    with get_ingestion_slots():
+        IngestionTask.objects.filter(id=task.id).update(status=IngestionJob.STATUS_RUNNING)
+        started_at = time.perf_counter()
+        try:
+            dynamic_model = task.dynamic_model
+            with open(task.path, 'rb') as rows_file, task_progress(task) as on_rows_inserted, \
+                    table_lock(dynamic_model.id, shared=True):
+                task.rows = load_rows_file(
+                    dynamic_model, generate_model_class(dynamic_model), rows_file, task.format, on_rows_inserted
+                )
+            task.status = IngestionJob.STATUS_SUCCEEDED
+        except Exception as error:
+            # A failing table is rolled back on its own, other tables of the job go on
+            logger.exception('Ingesting %s into %s failed', task.path, task.dynamic_model.name)
+            task.status = IngestionJob.STATUS_FAILED
+            task.error = str(error.detail if isinstance(error, APIException) else error)
+        finally:
+            task.seconds = time.perf_counter() - started_at
+            task.save(update_fields=['status', 'rows', 'seconds', 'error'])
+            # Connections opened by pool threads are not closed at the end of a request
+            connections.close_all()
+
+    return task
+
+
+def build_ingestion_report(tasks, seconds):
+    """Return tables, rows and throughput of finished ingestion tasks."""
+
+    succeeded_tasks = [task for task in tasks if task.status == IngestionJob.STATUS_SUCCEEDED]
+    rows_count = sum(task.rows for task in succeeded_tasks)
+    return {
+        'tables': len(tasks),
+        'succeeded': len(succeeded_tasks),
+        'failed': len(tasks) - len(succeeded_tasks),
+        'rows': rows_count,
+        'seconds': seconds,
+        'rows_per_second': rows_count / seconds if seconds else None,
+    }
+
+
+def get_job_workers(job):
+    """Return the number of tables of a job loaded at the same time."""
+
+    # SQLite has a single writer per database, loading tables in parallel would only fail on its locks
+    if any(connections[alias].vendor == 'sqlite' for alias in connections):
+        return 1
+
+    return job.workers
+
+
+def run_ingestion_job(job, on_task_done=None):
+    """
+    Load the files of an ingestion job in parallel and return the job with its report.
+
+    Tables are loaded by a pool of `job.workers` threads (one on SQLite), each
+    with its own database connections, and at most DYNAMIC_MODEL_INGEST_WORKERS
+    tables are loaded at the same time by all jobs of the process. Threads
+    are enough as rows are mostly written by the database, not by Python.
+    `on_task_done` is called with each task as it finishes.
+    """
+
+    job.status = IngestionJob.STATUS_RUNNING
+    job.save(update_fields=['status'])
+    tasks = list(job.tasks.select_related('dynamic_model').order_by('id'))
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=get_job_workers(job), thread_name_prefix='ingestion') as executor:
+        futures = [executor.submit(run_ingestion_task, task) for task in tasks]
+        for future in as_completed(futures):
+            if on_task_done is not None:
+                on_task_done(future.result())
+
+    job.report = build_ingestion_report(tasks, time.perf_counter() - started_at)
+    job.status = IngestionJob.STATUS_FAILED if job.report['failed'] else IngestionJob.STATUS_SUCCEEDED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'report', 'finished_at'])
+
+    return job
+
+
+def describe_ingestion_job(job):
+    """Return status, per table progress and report of an ingestion job."""
+
+    return {
+        'id': job.id,
+        'status': job.status,
+        'workers': job.workers,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'tasks': [
+            {
+                'table': task.dynamic_model.name,
+                'file': task.path,
+                'format': task.format,
+                'status': task.status,
+                'rows': task.rows,
+                'seconds': task.seconds,
+                'error': task.error,
+            }
+            for task in job.tasks.select_related('dynamic_model').order_by('id')
+        ],
+        'report': job.report,
+    }
+
+
+def start_ingestion_job(job):
+    """Run an ingestion job in a background thread of the process."""
+
+    def run():
+        try:
+            run_ingestion_job(job)
+        except Exception:
+            logger.exception('Ingestion job %s failed', job.id)
+            IngestionJob.objects.filter(id=job.id).update(status=IngestionJob.STATUS_FAILED, finished_at=timezone.now())
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'ingestion-job-{job.id}', daemon=True).start()
@@ -0,0 +1,156 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+# First key of advisory locks taken on dynamic model tables, the second key is the dynamic model ID
+ADVISORY_LOCK_NAMESPACE = 0x444d
+
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+class TableLockTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The table is being changed by another request, retry later.'
+    default_code = 'table_locked'
+
+
+class ReadWriteLock:
+    """Lock held by many readers or one writer, waiting writers go before new readers."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire(self, shared=False, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if shared:
+                can_acquire = lambda: not self._writer and not self._waiting_writers
+            else:
+                can_acquire = lambda: not self._writer and not self._readers
+                self._waiting_writers += 1
+            try:
+                while not can_acquire():
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                if not shared:
+                    self._waiting_writers -= 1
+                    # Readers held back by this writer may go on if it gave up
+                    self._condition.notify_all()
+
+            if shared:
+                self._readers += 1
+            else:
+                self._writer = True
+            return True
+
+    def release(self, shared=False):
+        with self._condition:
+            if shared:
+                self._readers -= 1
+            else:
+                self._writer = False
+            self._condition.notify_all()
+
+
+# Locks of dynamic model tables on databases without advisory locks, keyed by database alias and dynamic model ID
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+
+
+def get_local_lock(using, dynamic_model_id):
+    with _local_locks_lock:
+        return _local_locks.setdefault((using, dynamic_model_id), ReadWriteLock())
+
+
+def acquire_advisory_lock(connection, dynamic_model_id, shared, timeout):
+    """Take a session level advisory lock on the table of a dynamic model, waiting at most `timeout` seconds."""
+
+    lock_sql = f"set_config('lock_timeout', %s, true), pg_advisory_lock{'_shared' if shared else ''}(%s, %s)"
+    params = [f'{int(timeout * 1000)}ms', ADVISORY_LOCK_NAMESPACE, dynamic_model_id]
+    try:
+        if not connection.in_atomic_block:
+            # The statement runs in its own transaction, the lock timeout ends with it
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT {lock_sql}', params)
+            return
+
+        # Within a transaction the lock timeout is restored once the lock is held, or rolled back with the savepoint
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"SELECT current_setting('lock_timeout'), {lock_sql}", params)
+            cursor.execute("SELECT set_config('lock_timeout', %s, true)", [cursor.fetchone()[0]])
+    except OperationalError as error:
+        if getattr(error.__cause__, 'pgcode', None) == LOCK_NOT_AVAILABLE:
+            raise TableLockTimeout()
+        raise
+
+
+def release_advisory_lock(connection, dynamic_model_id, shared):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT pg_advisory_unlock{'_shared' if shared else ''}(%s, %s)",
+                [ADVISORY_LOCK_NAMESPACE, dynamic_model_id]
+            )
+    except DatabaseError:
+        # The transaction of the connection failed, ending its session releases the lock
+        connection.close()
+
+
+@contextmanager
+def table_lock(dynamic_model_id, shared=False, using=DEFAULT_DB_ALIAS):
+    """
+    Lock the table of a dynamic model, shared for reading and writing rows or exclusive for changing its schema.
+
+    On PostgreSQL a session level advisory lock is taken and released at the
+    end of the block. It opens no transaction, so transactions of the block
+    commit as they end. Other databases use a lock
+    per table within the process, other processes don't see it.
+    TableLockTimeout is raised when the lock is not acquired within
+    DYNAMIC_MODEL_LOCK_TIMEOUT seconds.
+    """
+
+    connection = connections[using]
+    timeout = settings.DYNAMIC_MODEL_LOCK_TIMEOUT
+
+    if connection.vendor == 'postgresql':
+        acquire_advisory_lock(connection, dynamic_model_id, shared, timeout)
+        try:
+            yield
+        finally:
+            release_advisory_lock(connection, dynamic_model_id, shared)
+        return
+
+    lock = get_local_lock(using, dynamic_model_id)
+    if not lock.acquire(shared, timeout):
+        raise TableLockTimeout()
+    try:
+        yield
+    finally:
+        lock.release(shared)
+
+
+def locks_table(shared=False):
+    """Run a view method holding the lock of the table of its `model_id`."""
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            with table_lock(kwargs['model_id'], shared=shared):
+                return view_method(self, request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmarks import BenchmarkRunner, compare_results, read_results, write_results
+
+
+class Command(BaseCommand):
+    help = 'Benchmark dynamic model endpoints and helpers on a throwaway test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--widths', nargs='+', type=int, default=[5, 20, 50],
+                            help='Number of fields of the generated schemas.')
+        parser.add_argument('--rows', nargs='+', type=int, default=[10, 100, 1000],
+                            help='Number of rows of the generated payloads.')
+        parser.add_argument('--repeat', type=int, default=3, help='Number of runs per measurement.')
+        parser.add_argument('--output', default='bench_output.json', help='Path of the JSON results file.')
+        parser.add_argument('--compare', help='Path of a previous JSON results file to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed duration increase ratio before reporting a regression.')
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        old_database_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = BenchmarkRunner(
+                widths=options['widths'], row_counts=options['rows'], repeat=options['repeat']
+            ).run()
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+        write_results(results, options['output'])
+        for result in results['results']:
+            self.stdout.write(
+                f"{result['name']:<35} width={result['width']:<4} rows={result['rows']:<6} "
+                f"{result['seconds'] * 1000:10.2f} ms {result['queries']:6} queries"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            regressions = compare_results(read_results(options['compare']), results, options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(
+                    f"{regression['name']} width={regression['width']} rows={regression['rows']}: {regression['reason']}"
+                )
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions found')
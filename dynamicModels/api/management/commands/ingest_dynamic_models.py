@@ -0,0 +1,74 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ingestion import create_ingestion_job, get_job_workers, run_ingestion_job
+from api.models import DynamicModel, IngestionJob
+from api.uploads import FORMAT_CSV, UPLOAD_FORMATS
+
+
+class Command(BaseCommand):
+    help = (
+        'Load files into dynamic model tables in parallel. The manifest is a JSON list of '
+        '{"table": <model name>, "file": <path relative to the manifest>, "format": "csv" or "columns"}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='Path of the JSON manifest of tables and files to load.')
+        parser.add_argument(
+            '--workers', type=int, default=settings.DYNAMIC_MODEL_INGEST_WORKERS,
+            help='Number of tables loaded at the same time.'
+        )
+
+    def read_manifest(self, manifest_path):
+        """Return (dynamic model, path, format) entries of a manifest."""
+
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Could not read the manifest: {error}')
+        if not isinstance(manifest, list) or not manifest:
+            raise CommandError('The manifest should be a non empty list of tables and files')
+
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        dynamic_models = {dynamic_model.name: dynamic_model for dynamic_model in DynamicModel.objects.all()}
+        entries = []
+        for entry in manifest:
+            dynamic_model = dynamic_models.get(str(entry.get('table', '')).lower())
+            if dynamic_model is None:
+                raise CommandError(f'No dynamic model with name {entry.get("table")} exists')
+            file_format = entry.get('format', FORMAT_CSV)
+            if file_format not in UPLOAD_FORMATS:
+                raise CommandError(f'Format should be one of {", ".join(UPLOAD_FORMATS)} .. {file_format}')
+            entries.append((dynamic_model, os.path.join(base_dir, entry.get('file', '')), file_format))
+
+        return entries
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('Workers should be at least 1')
+
+        # Tables loaded at the same time by the process are capped by DYNAMIC_MODEL_INGEST_WORKERS
+        workers = min(options['workers'], settings.DYNAMIC_MODEL_INGEST_WORKERS)
+        if workers < options['workers']:
+            self.stderr.write(f'Workers are limited to DYNAMIC_MODEL_INGEST_WORKERS ({workers})')
+        job = create_ingestion_job(self.read_manifest(options['manifest']), workers)
+        self.stdout.write(f'Loading tables with {get_job_workers(job)} workers')
+
+        def report_task(task):
+            if task.status == IngestionJob.STATUS_SUCCEEDED:
+                self.stdout.write(f'{task.dynamic_model.name}: {task.rows} rows in {task.seconds:.2f} seconds')
+            else:
+                self.stderr.write(f'{task.dynamic_model.name}: failed .. {task.error}')
+
+        report = run_ingestion_job(job, on_task_done=report_task).report
+        rows_per_second = report['rows_per_second'] or 0
+        self.stdout.write(
+            f'{report["succeeded"]} of {report["tables"]} tables loaded, {report["rows"]} rows '
+            f'in {report["seconds"]:.2f} seconds ({rows_per_second:.0f} rows per second)'
+        )
+        if report['failed']:
+            raise CommandError(f'{report["failed"]} of {report["tables"]} tables failed')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import DynamicModel
+from api.sharding import get_shards, move_dynamic_model
+
+
+class Command(BaseCommand):
+    help = 'Move the table of a dynamic model to another shard, to rebalance tables between databases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model_id', type=int, help='ID of the dynamic model to move.')
+        parser.add_argument('database', help='Alias of the target database.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of rows copied per query.')
+
+    def handle(self, *args, **options):
+        dynamic_model = DynamicModel.objects.filter(id=options['model_id']).first()
+        if dynamic_model is None:
+            raise CommandError(f'No dynamic model with ID {options["model_id"]} exists')
+        if options['database'] not in get_shards():
+            raise CommandError(f'Database should be one of {", ".join(get_shards())}')
+
+        source = dynamic_model.database
+        copied_count = move_dynamic_model(dynamic_model, options['database'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved "{dynamic_model.name}" from {source} to {dynamic_model.database}, {copied_count} rows copied'
+        ))
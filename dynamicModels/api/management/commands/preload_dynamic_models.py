@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.preloading import preload_model_classes
+
+
+class Command(BaseCommand):
+    help = 'Build model classes of dynamic models and report how long it takes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Maximum number of model classes to build.')
+
+    def handle(self, *args, **options):
+        preloaded_count, duration = preload_model_classes(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Preloaded {preloaded_count} dynamic model classes in {duration:.3f} seconds'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_expired_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete stored responses of idempotency keys older than DYNAMIC_MODEL_IDEMPOTENCY_KEY_TTL seconds.'
+
+    def handle(self, *args, **options):
+        purged_count = purge_expired_idempotency_keys()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged_count} expired idempotency keys'))
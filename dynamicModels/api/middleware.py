@@ -0,0 +1,51 @@
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from api.routers import pin_to_primary, unpin_from_primary
+from api.statistics import SlowQueryLogger
+
+
+PIN_COOKIE_NAME = 'pin_primary'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keep reads of a client on the primary database shortly after it wrote.
+
+    Reads are pinned per thread by the database router, a cookie carries the
+    pin over to the next requests of the client which may be served by
+    another thread or process.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unpin_from_primary()
+        if request.COOKIES.get(PIN_COOKIE_NAME):
+            pin_to_primary()
+
+        response = self.get_response(request)
+
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE_NAME, '1', max_age=settings.DYNAMIC_MODEL_REPLICA_PIN_SECONDS, httponly=True
+            )
+        unpin_from_primary()
+
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Log queries of a request on dynamic model tables slower than DYNAMIC_MODEL_SLOW_QUERY_SECONDS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_query_logger = SlowQueryLogger()
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            # Dynamic model tables may be on any database, primary, shard or replica
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self.slow_query_logger))
+            return self.get_response(request)
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_create_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dynamicmodel',
+            name='partition_field',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='dynamicmodel',
+            name='partition_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dynamicmodel',
+            name='partition_type',
+            field=models.CharField(blank=True, choices=[('range', 'range'), ('hash', 'hash')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_dynamic_model_partitioning'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dynamicmodelfield',
+            name='field_type',
+            field=models.CharField(choices=[('string', 'string'), ('number', 'number'), ('boolean', 'boolean'), ('text', 'text'), ('bigint', 'bigint'), ('float', 'float'), ('decimal', 'decimal'), ('date', 'date'), ('datetime', 'datetime'), ('json', 'json')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dynamicmodel',
+            name='database',
+            field=models.CharField(default='default', max_length=100),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:57
+
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+
+def add_change_seq_columns(apps, schema_editor):
+    """Add the change sequence column to tables of existing dynamic models held by the migrated database."""
+
+    DynamicModel = apps.get_model('api', 'DynamicModel')
+    connection = schema_editor.connection
+    quote_name = schema_editor.quote_name
+    # Details of dynamic models are in the default database, their tables may be on another one
+    dynamic_models = DynamicModel.objects.using(DEFAULT_DB_ALIAS).filter(database=connection.alias)
+    existing_tables = set(connection.introspection.table_names())
+
+    for dynamic_model in dynamic_models:
+        table_name = f'api_{dynamic_model.name}'
+        if table_name not in existing_tables:
+            continue
+        # Columns are added with plain SQL, SQLite would otherwise rebuild the table from a partial model
+        schema_editor.execute(
+            f'ALTER TABLE {quote_name(table_name)} ADD COLUMN {quote_name("change_seq")} bigint DEFAULT 0 NOT NULL'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {quote_name(schema_editor._create_index_name(table_name, ["change_seq"]))} '
+            f'ON {quote_name(table_name)} ({quote_name("change_seq")})'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_dynamic_model_database'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dynamic_model_id', models.IntegerField(unique=True)),
+                ('last_change_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DeletedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dynamic_model_id', models.IntegerField()),
+                ('row_id', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='deletedrow',
+            index=models.Index(fields=['dynamic_model_id', 'change_seq', 'row_id'], name='api_deleted_dynamic_cd63ce_idx'),
+        ),
+        migrations.RunPython(add_change_seq_columns, migrations.RunPython.noop),
+    ]
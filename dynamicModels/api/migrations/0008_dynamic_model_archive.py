@@ -0,0 +1,23 @@
+# Generated by Django 3.2.18 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_ingestion_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dynamicmodel',
+            name='archive_compressed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='dynamicmodel',
+            name='has_archive',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,10 +1,41 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.utils import timezone
 
 
 class DynamicModel(models.Model):
     """Modelrepresenting a dynamic model."""
 
+    PARTITION_TYPE_RANGE = 'range'
+    PARTITION_TYPE_HASH = 'hash'
+    PARTITION_TYPE_CHOICES = (
+        (PARTITION_TYPE_RANGE, 'range'),
+        (PARTITION_TYPE_HASH, 'hash')
+    )
+
     name = models.CharField(max_length=50, unique=True)
+    # Optional partitioning of the table on a number field, only applied on PostgreSQL.
+    # partition_size is the width of range partitions or the number of hash partitions.
+    partition_field = models.CharField(max_length=50, blank=True)
+    partition_type = models.CharField(max_length=10, choices=PARTITION_TYPE_CHOICES, blank=True)
+    partition_size = models.PositiveIntegerField(null=True, blank=True)
+    # Alias of the database (shard) holding the table, details of dynamic models stay in the default database
+    database = models.CharField(max_length=100, default=DEFAULT_DB_ALIAS)
+    # Whether archived rows were moved to a companion archive table, and whether it is compressed
+    has_archive = models.BooleanField(default=False)
+    archive_compressed = models.BooleanField(default=False)
+
+
+class DynamicTable(models.Model):
+    """Base class of model classes generated from dynamic models details."""
+
+    # Alias of the database holding the table, set on generated classes
+    _database = DEFAULT_DB_ALIAS
+
+    # Position of the last insert or update of the row in the change feed of the table
+    change_seq = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        abstract = True
 
 
 class DynamicModelField(models.Model):
@@ -13,10 +44,24 @@ class DynamicModelField(models.Model):
     FIELD_TYPE_CHOICE_STRING = 'string'
     FIELD_TYPE_CHOICE_NUMBER = 'number'
     FIELD_TYPE_CHOICE_BOOLEAN = 'boolean'
+    FIELD_TYPE_CHOICE_TEXT = 'text'
+    FIELD_TYPE_CHOICE_BIGINT = 'bigint'
+    FIELD_TYPE_CHOICE_FLOAT = 'float'
+    FIELD_TYPE_CHOICE_DECIMAL = 'decimal'
+    FIELD_TYPE_CHOICE_DATE = 'date'
+    FIELD_TYPE_CHOICE_DATETIME = 'datetime'
+    FIELD_TYPE_CHOICE_JSON = 'json'
     FIELD_TYPE_CHOICES = (
         (FIELD_TYPE_CHOICE_STRING, 'string'),
         (FIELD_TYPE_CHOICE_NUMBER, 'number'),
-        (FIELD_TYPE_CHOICE_BOOLEAN, 'boolean')
+        (FIELD_TYPE_CHOICE_BOOLEAN, 'boolean'),
+        (FIELD_TYPE_CHOICE_TEXT, 'text'),
+        (FIELD_TYPE_CHOICE_BIGINT, 'bigint'),
+        (FIELD_TYPE_CHOICE_FLOAT, 'float'),
+        (FIELD_TYPE_CHOICE_DECIMAL, 'decimal'),
+        (FIELD_TYPE_CHOICE_DATE, 'date'),
+        (FIELD_TYPE_CHOICE_DATETIME, 'datetime'),
+        (FIELD_TYPE_CHOICE_JSON, 'json')
     )
 
     name = models.CharField(max_length=50)
@@ -25,4 +70,73 @@ class DynamicModelField(models.Model):
 
     def __str__(self):
         """String representation of model objects."""
-        return f'{self.name} - {self.field_type}'
\ No newline at end of file
+        return f'{self.name} - {self.field_type}'
+
+
+class IdempotencyKey(models.Model):
+    """Model representing the stored response of a request sent with an Idempotency-Key header."""
+
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+class ChangeCounter(models.Model):
+    """
+    Model representing the last change sequence number given out for a dynamic model table.
+
+    It is kept in the database holding the table. Writers lock it until they
+    commit, so sequence numbers become visible in the order they were given.
+    """
+
+    dynamic_model_id = models.IntegerField(unique=True)
+    last_change_seq = models.BigIntegerField(default=0)
+
+
+class DeletedRow(models.Model):
+    """Model representing a row deleted from a dynamic model table, for the change feed of the table."""
+
+    dynamic_model_id = models.IntegerField()
+    row_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['dynamic_model_id', 'change_seq', 'row_id'])]
+
+
+class IngestionJob(models.Model):
+    """Model representing a job loading files into dynamic model tables in parallel."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'pending'),
+        (STATUS_RUNNING, 'running'),
+        (STATUS_SUCCEEDED, 'succeeded'),
+        (STATUS_FAILED, 'failed')
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Number of tables loaded at the same time by the job
+    workers = models.PositiveSmallIntegerField()
+    # Rows, tables and throughput of the job once it finished
+    report = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class IngestionTask(models.Model):
+    """Model representing a file loaded into a dynamic model table by an ingestion job."""
+
+    job = models.ForeignKey('api.IngestionJob', related_name='tasks', on_delete=models.CASCADE)
+    dynamic_model = models.ForeignKey('api.DynamicModel', related_name='+', on_delete=models.CASCADE)
+    path = models.CharField(max_length=1024)
+    format = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=IngestionJob.STATUS_CHOICES, default=IngestionJob.STATUS_PENDING)
+    rows = models.BigIntegerField(default=0)
+    seconds = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
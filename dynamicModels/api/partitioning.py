@@ -0,0 +1,96 @@
+import threading
+
+from django.db import transaction
+from django.db.backends.utils import truncate_name
+from api.models import DynamicModel
+
+
+# Range partitions known to exist, keyed by database alias and dynamic model ID, so
+# that populating a table only runs DDL for partitions it has not seen yet
+_known_partitions = {}
+_known_partitions_lock = threading.Lock()
+
+
+def is_partitioned(dynamic_model, connection):
+    """Partitioning is only applied on PostgreSQL, it is a no-op on other databases."""
+
+    return bool(dynamic_model.partition_field) and connection.vendor == 'postgresql'
+
+
+def partition_table_name(connection, table_name, suffix):
+    return truncate_name(f'{table_name}_p{suffix}', connection.ops.max_name_length())
+
+
+def create_model_table(editor, dynamic_model, model_class):
+    """Create the table of a dynamic model, partitioned when the dynamic model declares a partition key."""
+
+    if not is_partitioned(dynamic_model, editor.connection):
+        editor.create_model(model_class)
+        return
+
+    quote_name = editor.quote_name
+    table_name = model_class._meta.db_table
+    partition_column = model_class._meta.get_field(dynamic_model.partition_field).column
+
+    # The primary key of a partitioned table has to include the partition key
+    sql, params = editor.table_sql(model_class)
+    sql = sql.replace(' PRIMARY KEY', '', 1)
+    sql = (
+        f'{sql[:-1]}, PRIMARY KEY ({quote_name(model_class._meta.pk.column)}, {quote_name(partition_column)}))'
+        f' PARTITION BY {dynamic_model.partition_type.upper()} ({quote_name(partition_column)})'
+    )
+    editor.execute(sql, params or None)
+    # Indexes of the parent table, e.g. on change_seq, are created on each of its partitions
+    editor.deferred_sql.extend(editor._model_indexes_sql(model_class))
+
+    # Hash partitions are all created up front, range partitions are created as rows need them
+    if dynamic_model.partition_type == DynamicModel.PARTITION_TYPE_HASH:
+        for remainder in range(dynamic_model.partition_size):
+            editor.execute(
+                f'CREATE TABLE {quote_name(partition_table_name(editor.connection, table_name, remainder))} '
+                f'PARTITION OF {quote_name(table_name)} '
+                f'FOR VALUES WITH (MODULUS {dynamic_model.partition_size}, REMAINDER {remainder})'
+            )
+
+
+def create_missing_partitions(connection, dynamic_model, model_class, rows):
+    """Create the range partitions needed to insert rows."""
+
+    if not is_partitioned(dynamic_model, connection) or dynamic_model.partition_type != DynamicModel.PARTITION_TYPE_RANGE:
+        return
+
+    table_name = model_class._meta.db_table
+    size = dynamic_model.partition_size
+    starts = {
+        row[dynamic_model.partition_field] // size * size
+        for row in rows if row.get(dynamic_model.partition_field) is not None
+    }
+
+    with _known_partitions_lock:
+        starts -= _known_partitions.get((connection.alias, dynamic_model.id), set())
+    if not starts:
+        return
+
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for start in sorted(starts):
+            suffix = f'm{-start}' if start < 0 else start
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {quote_name(partition_table_name(connection, table_name, suffix))} '
+                f'PARTITION OF {quote_name(table_name)} FOR VALUES FROM (%s) TO (%s)',
+                [start, start + size]
+            )
+
+    def remember_partitions():
+        with _known_partitions_lock:
+            _known_partitions.setdefault((connection.alias, dynamic_model.id), set()).update(starts)
+
+    # Partitions created in a transaction that is rolled back do not exist
+    transaction.on_commit(remember_partitions, using=connection.alias)
+
+
+def forget_partitions(using, dynamic_model):
+    """Forget partitions known to exist for the table of a dynamic model on a database, e.g. once it is dropped."""
+
+    with _known_partitions_lock:
+        _known_partitions.pop((using, dynamic_model.id), None)
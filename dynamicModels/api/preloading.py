@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connection
+from api.models import DynamicModel
+from api.utils import generate_model_class
+
+
+logger = logging.getLogger(__name__)
+
+
+def preload_model_classes(limit=None):
+    """
+    Build model classes of dynamic models up front.
+
+    Dynamic models and their fields are loaded in two queries, at most
+    `limit` model classes are built. Returns the number of model classes
+    built and how long it took in seconds.
+    """
+
+    started_at = time.perf_counter()
+    dynamic_models = DynamicModel.objects.prefetch_related('fields').order_by('id')
+    if limit:
+        dynamic_models = dynamic_models[:limit]
+
+    preloaded_count = 0
+    for dynamic_model in dynamic_models:
+        if generate_model_class(dynamic_model) is not None:
+            preloaded_count += 1
+
+    duration = time.perf_counter() - started_at
+    logger.info('Preloaded %s dynamic model classes in %.3f seconds', preloaded_count, duration)
+
+    return preloaded_count, duration
+
+
+def preload_model_classes_at_startup(mode, limit=None):
+    """
+    Preload model classes when the process starts.
+
+    In 'eager' mode startup waits for the model classes to be built, in 'lazy'
+    mode they are built by a background thread while requests build the ones
+    they need on demand.
+    """
+
+    def preload():
+        try:
+            preload_model_classes(limit)
+        except DatabaseError:
+            # e.g. migrations have not been applied yet
+            logger.warning('Dynamic model classes could not be preloaded', exc_info=True)
+        finally:
+            if mode == 'lazy':
+                connection.close()
+
+    if mode == 'eager':
+        preload()
+    elif mode == 'lazy':
+        threading.Thread(target=preload, name='preload-dynamic-models', daemon=True).start()
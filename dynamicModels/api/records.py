@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import threading
+from operator import itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, Max, Min, Sum
+
+
+EXPORT_FORMAT_NDJSON = 'ndjson'
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMATS = (EXPORT_FORMAT_NDJSON, EXPORT_FORMAT_CSV)
+EXPORT_CONTENT_TYPES = {EXPORT_FORMAT_NDJSON: 'application/x-ndjson', EXPORT_FORMAT_CSV: 'text/csv'}
+
+AGGREGATE_FUNCTIONS = {'count': Count, 'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+# Field types each aggregate function applies to, count applies to any field or to rows
+NUMBER_FIELD_TYPES = ('number', 'bigint', 'float', 'decimal')
+ORDERED_FIELD_TYPES = NUMBER_FIELD_TYPES + ('string', 'text', 'date', 'datetime')
+AGGREGATE_FIELD_TYPES = {'sum': NUMBER_FIELD_TYPES, 'avg': NUMBER_FIELD_TYPES, 'min': ORDERED_FIELD_TYPES, 'max': ORDERED_FIELD_TYPES}
+
+
+# Record classes keyed by their field names
+_record_classes = {}
+_record_classes_lock = threading.Lock()
+
+
+def get_field_names(dynamic_model):
+    return [field.name for field in dynamic_model.fields.all()]
+
+
+def get_record_class(field_names):
+    """
+    Return a class of records of the given fields.
+
+    Records are tuples with an attribute per field and no instance attributes
+    dictionary (`__slots__` is empty), so they cost as much memory as a tuple
+    and read like model instances for serializers.
+    """
+
+    field_names = tuple(field_names)
+    with _record_classes_lock:
+        record_class = _record_classes.get(field_names)
+        if record_class is None:
+            attributes = {'__slots__': (), '_fields': field_names}
+            attributes.update({field_name: property(itemgetter(index)) for index, field_name in enumerate(field_names)})
+            record_class = _record_classes[field_names] = type('Record', (tuple,), attributes)
+
+    return record_class
+
+
+def as_dict(record):
+    return dict(zip(record._fields, record))
+
+
+def get_records(queryset, field_names, chunk_size=None):
+    """
+    Return rows of a queryset as records of the given fields.
+
+    Rows are read with values_list, without building model instances with their
+    state, attributes dictionary and field descriptors. With `chunk_size` rows
+    are streamed from the database in chunks instead of being fetched at once.
+    """
+
+    rows = queryset.values_list(*field_names)
+    return map(get_record_class(field_names), rows.iterator(chunk_size) if chunk_size else rows)
+
+
+def get_aggregate_records(queryset, group_by, metrics):
+    """
+    Return records of aggregates of a queryset, one per group of `group_by` field values.
+
+    `metrics` are (function, field name) pairs, field name is None to count rows.
+    """
+
+    annotations = {
+        f'{function}_{field_name or "rows"}': AGGREGATE_FUNCTIONS[function](field_name or 'pk')
+        for function, field_name in metrics
+    }
+    if not group_by:
+        aggregates = queryset.aggregate(**annotations)
+        return [get_record_class(annotations)(aggregates[name] for name in annotations)]
+
+    queryset = queryset.values(*group_by).order_by(*group_by).annotate(**annotations)
+    return get_records(queryset, [*group_by, *annotations])
+
+
+def encode_csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_export_lines(records, field_names, export_format, chunk_size):
+    """Yield lines of records in an export format, joined in chunks of `chunk_size` rows."""
+
+    if export_format == EXPORT_FORMAT_CSV:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(field_names)
+        for index, record in enumerate(records, start=1):
+            writer.writerow(map(encode_csv_value, record))
+            if index % chunk_size == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+        return
+
+    encoder = DjangoJSONEncoder()
+    lines = []
+    for record in records:
+        lines.append(encoder.encode(as_dict(record)))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
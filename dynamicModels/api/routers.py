@@ -0,0 +1,65 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from api.models import DynamicTable
+
+
+_state = threading.local()
+
+
+def pin_to_primary(seconds=None):
+    """Send reads of the current thread to the primary database for a short window."""
+
+    if seconds is None:
+        seconds = settings.DYNAMIC_MODEL_REPLICA_PIN_SECONDS
+    _state.pinned_until = max(getattr(_state, 'pinned_until', 0), time.monotonic() + seconds)
+
+
+def unpin_from_primary():
+    _state.pinned_until = 0
+
+
+def is_pinned_to_primary():
+    return getattr(_state, 'pinned_until', 0) > time.monotonic()
+
+
+def get_read_replicas(primary=DEFAULT_DB_ALIAS):
+    """Return the aliases of the read replicas of a primary database."""
+
+    return settings.DYNAMIC_MODEL_READ_REPLICAS.get(primary, [])
+
+
+class DynamicModelReplicaRouter:
+    """
+    Route queries of dynamic model tables to the database (shard) holding them.
+
+    Reads go to read replicas of that database when it has some. Writes and
+    schema changes stay on the primary database, and after a write reads are
+    pinned to the primary for DYNAMIC_MODEL_REPLICA_PIN_SECONDS so that
+    clients read their own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not issubclass(model, DynamicTable):
+            return None
+        if is_pinned_to_primary():
+            return model._database
+
+        replicas = get_read_replicas(model._database)
+        return random.choice(replicas) if replicas else model._database
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == 'api':
+            pin_to_primary()
+
+        return model._database if issubclass(model, DynamicTable) else None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas receive their schema from the primary
+        if any(db in replicas for replicas in settings.DYNAMIC_MODEL_READ_REPLICAS.values()):
+            return False
+
+        return None
@@ -1,16 +1,73 @@
+import os
+
+from django.conf import settings
 from rest_framework import serializers
 from api.validators import (
     detect_string_special_characters,
+    detect_column_special_characters,
     detect_dictionary_special_characters,
+    detect_dictionary_keys_special_characters,
     validate_model_fields
 )
-from api.models import DynamicModel, DynamicModelField
+from api.models import DynamicModel
+from api.field_types import (
+    FIELD_TYPES,
+    PARTITION_FIELD_TYPES,
+    build_serializer_field,
+    convert_column,
+    is_safe_conversion
+)
+from api.uploads import UPLOAD_FORMATS, FORMAT_CSV
+from api.changes import INITIAL_TOKEN, TOKEN_PATTERN
+from api.ingestion import resolve_ingestion_path
+from api.records import (
+    EXPORT_FORMATS,
+    EXPORT_FORMAT_NDJSON,
+    AGGREGATE_FUNCTIONS,
+    AGGREGATE_FIELD_TYPES
+)
+
+
+def validate_field_types(fields):
+    """Validate that field types of a fields schema are supported."""
+
+    if not all(field_type in FIELD_TYPES for field_type in fields.values()):
+        raise serializers.ValidationError(
+            {'fields': f'Acceptable field types are {", ".join(list(FIELD_TYPES)[:-1])} or {list(FIELD_TYPES)[-1]}'}
+        )
+
+
+# Columns every dynamic model table has
+RESERVED_FIELD_NAMES = ('id', 'change_seq')
+
+
+def validate_field_names(fields):
+    """Validate that field names of a fields schema are not names of columns every table has."""
+
+    if any(field_name in RESERVED_FIELD_NAMES for field_name in fields):
+        raise serializers.ValidationError({'fields': f'Field names {", ".join(RESERVED_FIELD_NAMES)} are reserved'})
+
+
+class PartitionSerializer(serializers.Serializer):
+
+    field = serializers.CharField(validators=[detect_string_special_characters])
+    type = serializers.ChoiceField(choices=DynamicModel.PARTITION_TYPE_CHOICES)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        """Validate that hash partitioned tables have a bounded number of partitions, all created with the table."""
+
+        max_partitions = settings.DYNAMIC_MODEL_MAX_HASH_PARTITIONS
+        if data['type'] == DynamicModel.PARTITION_TYPE_HASH and data['size'] > max_partitions:
+            raise serializers.ValidationError({'size': f'Hash partitioned tables have at most {max_partitions} partitions'})
+        return data
 
 
 class CreateDynamicModelSerializer(serializers.Serializer):
 
     model_name = serializers.CharField(validators=[detect_string_special_characters])
     fields = serializers.DictField(allow_empty=False, validators=[detect_dictionary_special_characters, validate_model_fields])
+    partition = PartitionSerializer(required=False)
 
     def validate(self, data):
         """Validate incoming data."""
@@ -23,11 +80,17 @@ class CreateDynamicModelSerializer(serializers.Serializer):
 
         # Convert values to lowercase for comparison later on 
         data['fields'] = {field_name.lower(): field_type.lower() for field_name, field_type in data['fields'].items()}
-        # Only accept certain field types
-        if not all(value in ['string', 'number', 'boolean'] for value in data['fields'].values()):
-            raise serializers.ValidationError(
-                {'fields': 'Acceptable field types are string, number or boolean'}
-            )
+        # Only accept certain field names and types
+        validate_field_names(data['fields'])
+        validate_field_types(data['fields'])
+
+        # Tables can only be partitioned on a number field
+        if 'partition' in data:
+            data['partition']['field'] = data['partition']['field'].lower()
+            if data['fields'].get(data['partition']['field']) not in PARTITION_FIELD_TYPES:
+                raise serializers.ValidationError(
+                    {'partition': 'Partition field should be a number field of the model'}
+                )
 
         return data
 
@@ -59,84 +122,302 @@ class UpdateDynamicModelSerializer(serializers.Serializer):
                 {'message': 'Fields are the same. No update required.'}
             )
 
-        # Specify allowed field type changes which are {boolean --> string} and {integer --> string}
-        for field_name, field_type in new_fields_data.items():
-            try:
-                if (old_fields_data[field_name] != field_type) and field_type != 'string':
-                     raise serializers.ValidationError(
-                        {'Error': f'Field types can only be changed to string .. {field_name} -> {field_type}'}
-                    )
-            except KeyError:
-                continue
-        
-        # Only accept certain field types
-        if not all(value in ['string', 'number', 'boolean'] for value in data['fields'].values()):
+        # The partition key of a partitioned table can neither be removed nor changed
+        partition_field = dynamic_model.partition_field
+        if partition_field and new_fields_data.get(partition_field) != old_fields_data.get(partition_field):
             raise serializers.ValidationError(
-                {'fields': 'Acceptable field types are string, number or boolean'}
+                {'Error': f'Partition field can not be removed or changed .. {dynamic_model.partition_field}'}
             )
 
+        # Only accept certain field names and types
+        validate_field_names(data['fields'])
+        validate_field_types(data['fields'])
+
+        # Only allow field type changes that keep existing values, e.g. {number --> bigint} or {date --> datetime}
+        for field_name, field_type in new_fields_data.items():
+            if field_name in old_fields_data and not is_safe_conversion(old_fields_data[field_name], field_type):
+                raise serializers.ValidationError(
+                    {'Error': f'Field type can not be changed safely .. {field_name}: {old_fields_data[field_name]} -> {field_type}'}
+                )
+
         return data
 
 
+def get_dynamic_model(model_id):
+    """Return the dynamic model with this ID or raise a validation error listing existing models."""
+
+    try:
+        return DynamicModel.objects.get(id=model_id)
+    except DynamicModel.DoesNotExist:
+        existing_models = list(DynamicModel.objects.values('id', 'name'))
+        raise serializers.ValidationError(
+            {'Error': f'No model exists with this ID. Existing models are {existing_models}'}
+        )
+
+
+def validate_rows_values(rows, dynamic_model):
+    """
+    Validate field names and field types of rows values against the fields of a dynamic model.
+
+    Values are validated a column at a time and replaced in rows by their
+    converted values, e.g. datetime strings by datetime objects.
+    """
+
+    # Load model fields once instead of querying them for every value
+    model_fields = {field.name: field.field_type for field in dynamic_model.fields.all()}
+    fields_do_not_exist = [
+        field_name for field_name in dict.fromkeys(field_name for row in rows for field_name in row)
+        if field_name not in model_fields
+    ]
+
+    fields_wrong_field_type = []
+    for field_name, field_type in model_fields.items():
+        rows_with_field = [row for row in rows if field_name in row]
+        if not rows_with_field:
+            continue
+        try:
+            values = convert_column(field_type, [row[field_name] for row in rows_with_field])
+        except ValueError:
+            fields_wrong_field_type.append({'field_name': field_name, 'correct_type': field_type})
+            continue
+
+        detect_column_special_characters(field_type, values)
+        for row, value in zip(rows_with_field, values):
+            row[field_name] = value
+
+    if fields_do_not_exist or fields_wrong_field_type:
+        raise serializers.ValidationError(
+            {
+                'Fields do NOT exist': fields_do_not_exist,
+                'Fields with wrong value type': fields_wrong_field_type
+            }
+        )
+
+
 class PopulateDynamicModelSerializer(serializers.Serializer):
 
     rows = serializers.ListField(
         allow_empty=False, child=serializers.DictField(
-            allow_empty=False, validators=[detect_dictionary_special_characters, validate_model_fields]
+            allow_empty=False, validators=[detect_dictionary_keys_special_characters, validate_model_fields]
         )
     )
 
+    def validate(self, data):
+        """Validate incoming data."""
+
+        # Check if model_id is correct, unless the caller already loaded the dynamic model
+        dynamic_model = self.context.get('dynamic_model') or get_dynamic_model(self.context.get('model_id'))
+
+        # Validate field names and field types
+        validate_rows_values(data['rows'], dynamic_model)
+
+        return data
+
+
+class UploadDynamicModelRowsSerializer(serializers.Serializer):
+
+    file = serializers.FileField(allow_empty_file=False)
+    format = serializers.ChoiceField(choices=UPLOAD_FORMATS, default=FORMAT_CSV)
+
     def validate(self, data):
         """Validate incoming data."""
 
         # Check if model_id is correct
-        try:
-            dynamic_model = DynamicModel.objects.get(id=self.context.get('model_id'))
-        except DynamicModel.DoesNotExist:
-            existing_models = list(DynamicModel.objects.values('id', 'name'))
-            raise serializers.ValidationError(
-                {'Error': f'No model exists with this ID. Existing models are {existing_models}'}
-            )
+        data['dynamic_model'] = get_dynamic_model(self.context.get('model_id'))
+
+        return data
+
+
+class ExportDynamicModelRowsSerializer(serializers.Serializer):
+
+    export_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default=EXPORT_FORMAT_NDJSON)
+
+    def validate(self, data):
+        """Validate incoming data."""
+
+        # Check if model_id is correct
+        data['dynamic_model'] = get_dynamic_model(self.context.get('model_id'))
+
+        return data
+
+
+class AggregateDynamicModelRowsSerializer(serializers.Serializer):
+
+    group_by = serializers.CharField(required=False, default='')
+    metrics = serializers.CharField(required=False, default='count')
+
+    def validate(self, data):
+        """Validate comma separated group by fields and metrics, e.g. group_by=has_car&metrics=count,avg:age."""
+
+        # Check if model_id is correct
+        dynamic_model = get_dynamic_model(self.context.get('model_id'))
+        field_types = {field.name: field.field_type for field in dynamic_model.fields.all()}
+
+        group_by = [field_name.strip() for field_name in data['group_by'].split(',') if field_name.strip()]
+        for field_name in group_by:
+            if field_name not in field_types:
+                raise serializers.ValidationError({'group_by': [f'No field with this name exists .. {field_name}']})
+
+        metrics = []
+        for metric in data['metrics'].split(','):
+            function, _, field_name = metric.strip().partition(':')
+            if function not in AGGREGATE_FUNCTIONS:
+                raise serializers.ValidationError(
+                    {'metrics': [f'Acceptable functions are {", ".join(AGGREGATE_FUNCTIONS)} .. {metric}']}
+                )
+            if not field_name:
+                if function != 'count':
+                    raise serializers.ValidationError({'metrics': [f'Only count applies to rows .. {metric}']})
+            elif field_name not in field_types:
+                raise serializers.ValidationError({'metrics': [f'No field with this name exists .. {metric}']})
+            elif function in AGGREGATE_FIELD_TYPES and field_types[field_name] not in AGGREGATE_FIELD_TYPES[function]:
+                raise serializers.ValidationError(
+                    {'metrics': [f'{function} does not apply to {field_types[field_name]} fields .. {metric}']}
+                )
+            if f'{function}_{field_name or "rows"}' in group_by:
+                raise serializers.ValidationError({'metrics': [f'Metric name clashes with a group by field .. {metric}']})
+            metrics.append((function, field_name or None))
+
+        return {'dynamic_model': dynamic_model, 'group_by': group_by, 'metrics': list(dict.fromkeys(metrics))}
+
+
+class DynamicModelRowsChangesSerializer(serializers.Serializer):
+
+    token = serializers.RegexField(TOKEN_PATTERN, required=False, default=INITIAL_TOKEN)
+    limit = serializers.IntegerField(min_value=1, required=False)
+    wait = serializers.FloatField(min_value=0, required=False, default=0)
+
+    def validate_limit(self, limit):
+        if limit > settings.DYNAMIC_MODEL_CHANGES_PAGE_SIZE:
+            raise serializers.ValidationError(f'Ensure this value is less than or equal to {settings.DYNAMIC_MODEL_CHANGES_PAGE_SIZE}.')
+        return limit
+
+    def validate_wait(self, wait):
+        if wait > settings.DYNAMIC_MODEL_CHANGES_MAX_WAIT:
+            raise serializers.ValidationError(f'Ensure this value is less than or equal to {settings.DYNAMIC_MODEL_CHANGES_MAX_WAIT}.')
+        return wait
+
+    def validate(self, data):
+        """Validate incoming data."""
+
+        # Check if model_id is correct
+        data['dynamic_model'] = get_dynamic_model(self.context.get('model_id'))
+        data.setdefault('limit', settings.DYNAMIC_MODEL_CHANGES_PAGE_SIZE)
+
+        return data
+
+
+class BulkDeleteDynamicModelRowsSerializer(serializers.Serializer):
+
+    FILTER_LOOKUPS = ('exact', 'gt', 'gte', 'lt', 'lte', 'in')
+
+    filters = serializers.DictField(allow_empty=False, validators=[validate_model_fields])
+
+    def validate_filters(self, filters):
+        """Validate filters lookups, e.g. {"age__gte": 18, "name__in": ["x", "y"]}."""
+
+        for filter_name, filter_value in filters.items():
+            field_name, _, lookup = filter_name.partition('__')
+            detect_string_special_characters(field_name)
+            if lookup and lookup not in self.FILTER_LOOKUPS:
+                raise serializers.ValidationError(
+                    f'Acceptable filter lookups are {", ".join(self.FILTER_LOOKUPS)} .. {filter_name}'
+                )
+            if (lookup == 'in') != isinstance(filter_value, list):
+                raise serializers.ValidationError(f'Only "in" lookups accept a list of values .. {filter_name}')
+
+        return filters
+
+    def get_values_rows(self, data):
+        """Return values of incoming data as rows of field names and values, to validate their types."""
+
+        rows = []
+        for filter_name, filter_value in data['filters'].items():
+            field_name = filter_name.partition('__')[0]
+            rows.extend({field_name: value} for value in (filter_value if isinstance(filter_value, list) else [filter_value]))
+
+        return rows
+
+    def validate(self, data):
+        """Validate incoming data."""
+
+        # Check if model_id is correct
+        dynamic_model = get_dynamic_model(self.context.get('model_id'))
 
         # Validate field names and field types
-        fields_do_not_exist = []
-        fields_wrong_field_type = []
-        field_types = {'string': str, 'number': int, 'boolean': bool}
-        for row in data['rows']:
-            for field_name, field_value in row.items():
-                try:
-                    model_field = dynamic_model.fields.get(name=field_name)
-                    if not isinstance(field_value, field_types[model_field.field_type]):
-                        if {'field_name': field_name, 'correct_type': model_field.field_type} not in fields_wrong_field_type:
-                            fields_wrong_field_type.append({'field_name': field_name, 'correct_type': model_field.field_type})
-                except DynamicModelField.DoesNotExist:
-                    if field_name not in fields_do_not_exist:
-                        fields_do_not_exist.append(field_name)
-
-        if fields_do_not_exist or fields_wrong_field_type:
-            raise serializers.ValidationError(
-                {
-                    'Fields do NOT exist': fields_do_not_exist,
-                    'Fields with wrong value type': fields_wrong_field_type
-                }
-            )
+        validate_rows_values(self.get_values_rows(data), dynamic_model)
 
         return data
 
 
+class BulkUpdateDynamicModelRowsSerializer(BulkDeleteDynamicModelRowsSerializer):
+
+    values = serializers.DictField(
+        allow_empty=False, validators=[detect_dictionary_keys_special_characters, validate_model_fields]
+    )
+
+    def get_values_rows(self, data):
+        return super().get_values_rows(data) + [data['values']]
+
+
+class ArchiveDynamicModelRowsSerializer(BulkDeleteDynamicModelRowsSerializer):
+
+    compress = serializers.BooleanField(default=False)
+
+
+class ListDynamicModelRowsSerializer(serializers.Serializer):
+
+    include_archived = serializers.BooleanField(default=False)
+
+
 def generate_serializer_fields(dynamic_model):
     """Generate serializer fields."""
 
-    field_types = {
-        'string': serializers.CharField,
-        'number': serializers.IntegerField,
-        'boolean': serializers.BooleanField
-    }
     serializer_fields = {} 
     for field in dynamic_model.fields.all():
         serializer_fields.update({
-            field.name: field_types[field.field_type]()
+            field.name: build_serializer_field(field.field_type)
         })
     
     return serializer_fields
 
+
+class IngestionTaskSerializer(serializers.Serializer):
+
+    table = serializers.CharField()
+    file = serializers.CharField()
+    format = serializers.ChoiceField(choices=UPLOAD_FORMATS, default=FORMAT_CSV)
+
+
+class CreateIngestionJobSerializer(serializers.Serializer):
+
+    tasks = IngestionTaskSerializer(many=True, allow_empty=False)
+    workers = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_workers(self, workers):
+        if workers > settings.DYNAMIC_MODEL_INGEST_WORKERS:
+            raise serializers.ValidationError(f'Ensure this value is less than or equal to {settings.DYNAMIC_MODEL_INGEST_WORKERS}.')
+        return workers
+
+    def validate(self, data):
+        """Validate tables and files of the job, files are read from under DYNAMIC_MODEL_INGEST_ROOT."""
+
+        root = settings.DYNAMIC_MODEL_INGEST_ROOT
+        if not root:
+            raise serializers.ValidationError({'Error': 'Ingesting files of the server is disabled'})
+
+        table_names = {task['table'].lower() for task in data['tasks']}
+        dynamic_models = {dynamic_model.name: dynamic_model for dynamic_model in DynamicModel.objects.filter(name__in=table_names)}
+
+        data['entries'] = []
+        for task in data['tasks']:
+            dynamic_model = dynamic_models.get(task['table'].lower())
+            if dynamic_model is None:
+                raise serializers.ValidationError({'tasks': [f'No model exists with this name .. {task["table"]}']})
+            path = resolve_ingestion_path(task['file'], root)
+            if path is None or not os.path.isfile(path):
+                raise serializers.ValidationError({'tasks': [f'No file exists with this path .. {task["file"]}']})
+            data['entries'].append((dynamic_model, path, task['format']))
+        data.setdefault('workers', settings.DYNAMIC_MODEL_INGEST_WORKERS)
+
+        return data
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+from api.models import ChangeCounter, DeletedRow, DynamicModel
+
+
+def get_shards():
+    """Return the aliases of the databases dynamic model tables can be placed on."""
+
+    return settings.DYNAMIC_MODEL_SHARDS
+
+
+def choose_database():
+    """Return the alias of the database holding the fewest dynamic model tables, for a new table."""
+
+    shards = get_shards()
+    if len(shards) == 1:
+        return shards[0]
+
+    tables_counts = dict(
+        DynamicModel.objects.filter(database__in=shards).values_list('database').annotate(Count('id')).order_by()
+    )
+    return min(shards, key=lambda alias: tables_counts.get(alias, 0))
+
+
+def get_dynamic_model_database(model_id):
+    """Return the alias of the database holding the table of a dynamic model."""
+
+    if len(get_shards()) == 1:
+        return get_shards()[0]
+
+    return DynamicModel.objects.filter(id=model_id).values_list('database', flat=True).first() or DEFAULT_DB_ALIAS
+
+
+def move_dynamic_model(dynamic_model, database, batch_size):
+    """
+    Move the table of a dynamic model to another database and return the number of rows copied.
+
+    The table is created on the target database and rows are copied in batches
+    of primary keys, then the dynamic model points at the target database and
+    the source table is dropped. On PostgreSQL requests on the table wait for
+    the move, which carries over its change feed and archived rows. On SQLite
+    only requests of the same process wait for it.
+    """
+
+    from api.archiving import copy_archive_rows, create_archive_table, generate_archive_model_class
+    from api.locking import table_lock
+    from api.partitioning import create_model_table, forget_partitions
+    from api.utils import generate_model_class, insert_rows
+
+    if database not in get_shards():
+        raise ValueError(f'{database} is not one of the shards {", ".join(get_shards())}')
+
+    source = dynamic_model.database
+    if database == source:
+        return 0
+
+    with table_lock(dynamic_model.id):
+        source_model_class = generate_model_class(dynamic_model)
+        dynamic_model.database = database
+        target_model_class = generate_model_class(dynamic_model)
+        target_connection = connections[database]
+
+        with target_connection.schema_editor() as editor:
+            create_model_table(editor, dynamic_model, target_model_class)
+        if dynamic_model.has_archive:
+            source_archive_class = generate_archive_model_class(dynamic_model, source_model_class)
+            target_archive_class = generate_archive_model_class(dynamic_model, target_model_class)
+            create_archive_table(dynamic_model, target_archive_class, dynamic_model.archive_compressed)
+
+        copied_count = 0
+        try:
+            with transaction.atomic(using=database):
+                queryset = source_model_class.objects.using(source).order_by('pk')
+                last_pk = None
+                while True:
+                    batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                    rows = list(batch.values()[:batch_size])
+                    if not rows:
+                        break
+                    # Rows keep their place in the change feed
+                    insert_rows(dynamic_model, target_model_class, rows, track_changes=False)
+                    copied_count += len(rows)
+                    last_pk = rows[-1]['id']
+
+                # Archived rows move along with the table
+                if dynamic_model.has_archive:
+                    copy_archive_rows(source_archive_class, target_archive_class, source, database, batch_size)
+
+                # The change feed of the table moves along with it
+                for model in (ChangeCounter, DeletedRow):
+                    source_rows = model.objects.using(source).filter(dynamic_model_id=dynamic_model.id).values(
+                        *(field.attname for field in model._meta.concrete_fields if not field.primary_key)
+                    )
+                    model.objects.using(database).bulk_create(
+                        [model(**values) for values in source_rows.iterator()], batch_size=batch_size
+                    )
+
+                # New rows continue after the copied primary keys
+                with target_connection.cursor() as cursor:
+                    for sql in target_connection.ops.sequence_reset_sql(no_style(), [target_model_class]):
+                        cursor.execute(sql)
+        except Exception:
+            dynamic_model.database = source
+            with target_connection.schema_editor() as editor:
+                editor.delete_model(target_model_class)
+                if dynamic_model.has_archive:
+                    editor.delete_model(target_archive_class)
+            generate_model_class(dynamic_model)
+            raise
+
+        dynamic_model.save(update_fields=['database'])
+        with connections[source].schema_editor() as editor:
+            editor.delete_model(source_model_class)
+            if dynamic_model.has_archive:
+                editor.delete_model(source_archive_class)
+        for model in (ChangeCounter, DeletedRow):
+            model.objects.using(source).filter(dynamic_model_id=dynamic_model.id).delete()
+        forget_partitions(source, dynamic_model)
+
+    return copied_count
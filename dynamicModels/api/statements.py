@@ -0,0 +1,179 @@
+"""
+SQL of the hot insert and select paths of dynamic model tables, compiled once per table schema.
+
+Statements are cached with the generated model class they were compiled
+for: generate_model_class() builds a new class when the schema of a table
+changes, which drops the statements of the previous schema. On PostgreSQL
+single row inserts and selects run as server side prepared statements,
+prepared once per connection, and multi row inserts are sent with
+execute_values. Other databases execute the cached SQL.
+"""
+import itertools
+import re
+import threading
+import weakref
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connections, router
+
+from api.records import get_record_class
+
+
+KIND_INSERT = 'insert'
+KIND_INSERT_WITH_PK = 'insert_with_pk'
+KIND_SELECT = 'select'
+
+# `sql` has %s placeholders for the database driver, `prepared_sql` has $n placeholders for PREPARE,
+# `fields` are the fields of insert parameters and `converters` the (position, converters, expression) of select results
+Statement = namedtuple('Statement', ['name', 'sql', 'prepared_sql', 'params', 'fields', 'converters'])
+
+# Statements of each table keyed by table name, along with the model class and schema version they were compiled for
+_statements = {}
+_statements_lock = threading.Lock()
+# Prepared statement names include the schema version, so a statement of a previous schema is never executed
+_schema_versions = itertools.count(1)
+
+# Names of the statements prepared on each PostgreSQL connection, keyed by table name and statement kind
+_prepared_statements = weakref.WeakKeyDictionary()
+
+
+def use_prepared_statements(connection):
+    # Prepared statements live in the database session, they can't be used behind a transaction pooler
+    return connection.vendor == 'postgresql' and settings.DYNAMIC_MODEL_PREPARED_STATEMENTS
+
+
+def number_placeholders(sql):
+    """Return SQL with %s placeholders replaced by $1, $2 ... placeholders."""
+
+    numbers = itertools.count(1)
+    return re.sub(r'%[s%]', lambda match: f'${next(numbers)}' if match.group() == '%s' else '%', sql)
+
+
+def build_insert_statement(model_class, connection, name, with_pk):
+    fields = [field for field in model_class._meta.concrete_fields if with_pk or not field.primary_key]
+    quote_name = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES '.format(
+        quote_name(model_class._meta.db_table),
+        ', '.join(quote_name(field.column) for field in fields)
+    )
+    placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+    # execute_values fills a single %s with the values of all rows
+    values_sql = '%s' if connection.vendor == 'postgresql' else placeholders
+
+    return Statement(name, sql + values_sql, number_placeholders(sql + placeholders), (), fields, None)
+
+
+def build_select_statement(model_class, connection, name, field_names):
+    compiler = model_class.objects.using(connection.alias).values_list(*field_names).query.get_compiler(connection.alias)
+    sql, params = compiler.as_sql()
+    converters = compiler.get_converters([column for column, _, _ in compiler.select[:compiler.col_count]])
+    converters = [(position, *position_converters) for position, position_converters in converters.items()]
+
+    return Statement(name, sql, number_placeholders(sql), params, None, converters)
+
+
+def get_statement(model_class, connection, key, build_statement, *args):
+    """Return the statement of a table for a key and a database, compiling it on first use with its schema."""
+
+    db_table = model_class._meta.db_table
+    with _statements_lock:
+        cached_class, version, statements = _statements.get(db_table, (None, None, None))
+        if cached_class is not model_class:
+            # The schema of the table changed, statements of the previous one are dropped
+            version, statements = next(_schema_versions), {}
+            _statements[db_table] = (model_class, version, statements)
+
+        statement = statements.get((connection.alias, key))
+        if statement is None:
+            # Short names, PostgreSQL truncates identifiers longer than 63 characters
+            name = f'dm_{version}_{len(statements) + 1}'
+            statement = statements[(connection.alias, key)] = build_statement(model_class, connection, name, *args)
+
+    return statement
+
+
+def prepare_statement(connection, db_table, key, statement):
+    """Prepare a statement in the session of a PostgreSQL connection, unless it already is."""
+
+    connection.ensure_connection()
+    prepared_statements = _prepared_statements.setdefault(connection.connection, {})
+    # A statement replaces the one of the same kind prepared for a previous schema of the table
+    prepared_name = prepared_statements.get((db_table, key[0]))
+    if prepared_name == statement.name:
+        return
+
+    # Session setup, like connection setup, runs outside of the queries of the request
+    with connection.connection.cursor() as cursor:
+        if prepared_name is not None:
+            cursor.execute(f'DEALLOCATE {connection.ops.quote_name(prepared_name)}')
+        cursor.execute(f'PREPARE {connection.ops.quote_name(statement.name)} AS {statement.prepared_sql}')
+    prepared_statements[(db_table, key[0])] = statement.name
+
+
+def execute_prepared_statement(cursor, connection, db_table, statement, params):
+    placeholders = f'({", ".join(["%s"] * len(params))})' if params else ''
+    # The table name in a comment lets slow EXECUTE queries be attributed to their table
+    cursor.execute(
+        f'EXECUTE {connection.ops.quote_name(statement.name)}{placeholders} /* {connection.ops.quote_name(db_table)} */',
+        params
+    )
+
+
+def insert_table_rows(model_class, rows):
+    """Insert rows, dictionaries of field values, in the table of a generated model class with its cached statement."""
+
+    using = router.db_for_write(model_class)
+    connection = connections[using]
+    # Rows copied from another database keep their primary keys
+    key = (KIND_INSERT_WITH_PK if model_class._meta.pk.attname in rows[0] else KIND_INSERT,)
+    statement = get_statement(model_class, connection, key, build_insert_statement, key[0] == KIND_INSERT_WITH_PK)
+
+    params = [
+        [
+            field.get_db_prep_save(row[field.attname] if field.attname in row else field.get_default(), connection)
+            for field in statement.fields
+        ]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        if use_prepared_statements(connection) and len(params) == 1:
+            prepare_statement(connection, model_class._meta.db_table, key, statement)
+            execute_prepared_statement(cursor, connection, model_class._meta.db_table, statement, params[0])
+        elif connection.vendor == 'postgresql':
+            from psycopg2.extras import execute_values
+            execute_values(cursor, statement.sql, params, page_size=len(params))
+        else:
+            cursor.executemany(statement.sql, params)
+
+
+def select_table_records(model_class, field_names):
+    """Return all rows of the table of a generated model class as records of the given fields, with its cached statement."""
+
+    using = router.db_for_read(model_class)
+    connection = connections[using]
+    key = (KIND_SELECT, *field_names)
+    statement = get_statement(model_class, connection, key, build_select_statement, field_names)
+
+    with connection.cursor() as cursor:
+        if use_prepared_statements(connection):
+            prepare_statement(connection, model_class._meta.db_table, key, statement)
+            execute_prepared_statement(cursor, connection, model_class._meta.db_table, statement, statement.params)
+        else:
+            cursor.execute(statement.sql, statement.params)
+        rows = cursor.fetchall()
+
+    record_class = get_record_class(field_names)
+    if not statement.converters:
+        return list(map(record_class, rows))
+
+    records = []
+    for row in map(list, rows):
+        for position, converters, expression in statement.converters:
+            value = row[position]
+            for converter in converters:
+                value = converter(value, expression, connection)
+            row[position] = value
+        records.append(record_class(row))
+
+    return records
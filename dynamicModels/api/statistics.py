@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from api.archiving import get_archive_tables
+from api.models import DynamicTable
+
+
+logger = logging.getLogger(__name__)
+
+# Counters of the table and all its partitions, in the order of TABLE_COUNTERS
+POSTGRESQL_STATS_QUERY = """
+SELECT COALESCE(SUM(stats.n_live_tup), 0),
+       SUM(pg_table_size(tree.relid)),
+       SUM(pg_indexes_size(tree.relid)),
+       SUM(pg_total_relation_size(tree.relid)),
+       COALESCE(SUM(stats.n_tup_ins), 0),
+       COALESCE(SUM(stats.n_tup_upd), 0),
+       COALESCE(SUM(stats.n_tup_del), 0),
+       COALESCE(SUM(stats.seq_tup_read), 0) + COALESCE(SUM(stats.idx_tup_fetch), 0),
+       COALESCE(SUM(stats.seq_scan), 0),
+       COALESCE(SUM(stats.idx_scan), 0)
+FROM (
+    -- pg_partition_tree returns no rows for tables that are not partitioned
+    SELECT %(table)s::regclass AS relid UNION SELECT relid FROM pg_partition_tree(%(table)s::regclass)
+) AS tree
+LEFT JOIN pg_stat_user_tables AS stats ON stats.relid = tree.relid
+"""
+
+TABLE_COUNTERS = (
+    'rows', 'table_bytes', 'indexes_bytes', 'total_bytes', 'inserted_rows', 'updated_rows', 'deleted_rows',
+    'read_rows', 'sequential_scans', 'index_scans'
+)
+# Counters turned into rates between two stats requests
+RATE_COUNTERS = ('inserted_rows', 'read_rows')
+
+# Statements whose plan is logged with them when they are slow
+EXPLAINED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# Last counters read by this process, keyed by database alias and table name, with the time they were read
+_samples = {}
+_samples_lock = threading.Lock()
+
+
+def get_postgresql_table_counters(connection, db_table):
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_STATS_QUERY, {'table': connection.ops.quote_name(db_table)})
+        return dict(zip(TABLE_COUNTERS, (int(value) for value in cursor.fetchone())))
+
+
+def get_sqlite_table_counters(connection, db_table):
+    """Return the row count and sizes of a table, SQLite keeps no access counters."""
+
+    counters = dict.fromkeys(TABLE_COUNTERS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(db_table)}')
+        counters['rows'] = cursor.fetchone()[0]
+
+        try:
+            # Page sizes of the table and of its indexes, when SQLite is built with the dbstat table
+            cursor.execute(
+                'SELECT SUM(pgsize), SUM(CASE WHEN name = %s THEN pgsize ELSE 0 END) FROM dbstat '
+                'WHERE name = %s OR name IN (SELECT name FROM sqlite_master WHERE type = %s AND tbl_name = %s)',
+                [db_table, db_table, 'index', db_table]
+            )
+        except DatabaseError:
+            return counters
+        total_bytes, table_bytes = cursor.fetchone()
+
+    counters.update(table_bytes=table_bytes, indexes_bytes=total_bytes - table_bytes, total_bytes=total_bytes)
+    return counters
+
+
+def get_rates(key, counters):
+    """Return counters per second since the previous stats request of this process, None on the first one."""
+
+    now = time.monotonic()
+    with _samples_lock:
+        previous = _samples.get(key)
+        _samples[key] = (now, counters)
+
+    rates = {}
+    for counter in RATE_COUNTERS:
+        rate = None
+        if previous is not None and counters[counter] is not None and now > previous[0]:
+            # Counters restart from zero when PostgreSQL statistics are reset
+            rate = max(counters[counter] - previous[1][counter], 0) / (now - previous[0])
+        rates[f'{counter}_per_second'] = rate
+
+    return rates
+
+
+def get_table_stats(dynamic_model, model_class):
+    """
+    Return row count, sizes in bytes and access counters of the table of a dynamic model.
+
+    On PostgreSQL they are read from pg_stat_user_tables and the relation size
+    functions, summed over partitions, and rows are an estimate. SQLite only
+    reports an exact row count and, when available, sizes.
+    """
+
+    connection = connections[dynamic_model.database]
+    db_table = model_class._meta.db_table
+
+    if connection.vendor == 'postgresql':
+        counters = get_postgresql_table_counters(connection, db_table)
+    else:
+        counters = get_sqlite_table_counters(connection, db_table)
+
+    return {
+        'table': db_table,
+        'database': dynamic_model.database,
+        **counters,
+        **get_rates((dynamic_model.database, db_table), counters),
+    }
+
+
+def get_dynamic_tables():
+    """Return names of the tables and archive tables of dynamic model classes generated by this process."""
+
+    tables = {
+        model_class._meta.db_table for model_class in list(apps.all_models['api'].values())
+        if issubclass(model_class, DynamicTable)
+    }
+    return tables | get_archive_tables()
+
+
+class SlowQueryLogger:
+    """
+    Execute wrapper logging queries on dynamic model tables slower than DYNAMIC_MODEL_SLOW_QUERY_SECONDS.
+
+    Slow queries are logged with their parameters and the plan the database
+    chooses for them.
+    """
+
+    def __init__(self):
+        self._explaining = threading.local()
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started_at
+
+        if duration >= settings.DYNAMIC_MODEL_SLOW_QUERY_SECONDS and not getattr(self._explaining, 'active', False):
+            connection = context['connection']
+            # Multi row inserts are sent by execute_values as bytes
+            if isinstance(sql, bytes):
+                sql = sql.decode()
+            tables = [table for table in get_dynamic_tables() if connection.ops.quote_name(table) in sql]
+            if tables:
+                plan = None if many else self.explain(connection, sql, params)
+                logger.warning(
+                    'Slow query on %s (%.3f seconds): %s; params=%r%s',
+                    ', '.join(sorted(tables)), duration, sql, params, f'\n{plan}' if plan else '',
+                    extra={'tables': tables, 'duration': duration, 'database': connection.alias}
+                )
+
+        return result
+
+    def explain(self, connection, sql, params):
+        """Return the plan of a query or None, the plan query itself goes through this wrapper without being logged."""
+
+        if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return None
+
+        self._explaining.active = True
+        try:
+            # A failing plan query is rolled back to a savepoint, leaving the transaction of the request usable
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        except DatabaseError:
+            logger.exception('Could not explain slow query')
+            return None
+        finally:
+            self._explaining.active = False
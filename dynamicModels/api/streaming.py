@@ -0,0 +1,160 @@
+import codecs
+import io
+import json
+import re
+from itertools import islice
+
+from rest_framework.exceptions import ParseError
+
+
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/jsonl')
+JSON_MEDIA_TYPE = 'application/json'
+
+READ_SIZE = 64 * 1024
+MAX_ROW_SIZE = 1024 * 1024
+
+# Parser states of a JSON array of rows
+EXPECT_ARRAY, EXPECT_ROW_OR_END, EXPECT_ROW, EXPECT_SEPARATOR, ENDED = range(5)
+
+# Characters that open or close objects and strings, and that end or escape within strings
+_OBJECT_TOKENS = re.compile(r'["{}]')
+_STRING_TOKENS = re.compile(r'["\\]')
+
+_decoder = json.JSONDecoder()
+
+
+def iter_ndjson_rows(stream, max_row_size=MAX_ROW_SIZE):
+    """Yield rows of a newline delimited JSON body one line at a time, rejecting lines over `max_row_size` bytes."""
+
+    # Lines are read at most one byte past the limit, so a body without newlines is not read at once
+    for line_number, line in enumerate(iter(lambda: stream.readline(max_row_size + 1), b''), start=1):
+        if len(line) > max_row_size and not line.endswith(b'\n'):
+            raise ParseError(f'JSON parse error on line {line_number} - rows should be at most {max_row_size} bytes')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ParseError(f'JSON parse error on line {line_number} - {error}')
+
+
+def is_object_closed(text, position):
+    """Return whether the JSON object starting at `position` is closed within text, following its braces and strings."""
+
+    depth = 0
+    while True:
+        match = _OBJECT_TOKENS.search(text, position)
+        if match is None:
+            return False
+        position = match.end()
+        if match.group() == '"':
+            # Skip the string, braces within it do not count
+            while True:
+                match = _STRING_TOKENS.search(text, position)
+                if match is None:
+                    return False
+                # Escaped characters are skipped along with their backslash
+                position = match.end() + (match.group() == '\\')
+                if match.group() == '"':
+                    break
+            continue
+        depth += 1 if match.group() == '{' else -1
+        if depth == 0:
+            return True
+
+
+def iter_json_array_rows(stream, read_size=READ_SIZE, max_row_size=MAX_ROW_SIZE):
+    """
+    Yield rows of a JSON array body, reading it `read_size` bytes at a time.
+
+    The buffer only holds the row being parsed, rows longer than `max_row_size`
+    characters are rejected. Malformed rows are reported as soon as they are
+    read whole, without reading the rest of the body.
+    """
+
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    state = EXPECT_ARRAY
+    eof = False
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+        if position < len(buffer):
+            character = buffer[position]
+            if state == EXPECT_ARRAY:
+                if character != '[':
+                    raise ParseError('JSON parse error - expected an array of rows')
+                state = EXPECT_ROW_OR_END
+                position += 1
+                continue
+            if state == ENDED:
+                raise ParseError('JSON parse error - unexpected data after the array of rows')
+            if state == EXPECT_SEPARATOR:
+                # Rows are separated by exactly one comma
+                if character not in ',]':
+                    raise ParseError("JSON parse error - expected ',' or ']' after a row")
+                state = EXPECT_ROW if character == ',' else ENDED
+                position += 1
+                continue
+            if character == ']' and state == EXPECT_ROW_OR_END:
+                state = ENDED
+                position += 1
+                continue
+            # Only objects are self-delimiting, anything else could be truncated
+            if character != '{':
+                raise ParseError('JSON parse error - rows should be objects')
+            try:
+                row, end = _decoder.raw_decode(buffer, position)
+            except ValueError as error:
+                # Only a row cut by the end of the buffer is worth reading more of
+                if eof or is_object_closed(buffer, position):
+                    raise ParseError(f'JSON parse error - {error}')
+                if len(buffer) - position > max_row_size:
+                    raise ParseError(f'JSON parse error - rows should be at most {max_row_size} characters')
+            else:
+                yield row
+                position = end
+                state = EXPECT_SEPARATOR
+                continue
+
+        if eof:
+            break
+
+        # Drop consumed text so the buffer only holds the row being parsed
+        buffer = buffer[position:]
+        position = 0
+        data = stream.read(read_size)
+        eof = not data
+        buffer += text_decoder.decode(data, final=eof)
+
+    if state != ENDED:
+        raise ParseError('JSON parse error - unterminated array of rows')
+
+
+def iter_request_rows(request):
+    """Yield rows of a streamed request body based on its content type."""
+
+    media_type = request.content_type.split(';')[0].strip().lower()
+    # Requests without a body have no stream
+    stream = request.stream or io.BytesIO()
+    if media_type in NDJSON_MEDIA_TYPES:
+        return iter_ndjson_rows(stream)
+    if media_type == JSON_MEDIA_TYPE:
+        return iter_json_array_rows(stream)
+
+    return None
+
+
+def iter_chunks(rows, chunk_size):
+    """Group an iterable of rows into lists of at most `chunk_size` rows."""
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,129 @@
+import threading
+import unittest
+from unittest import mock
+from django.db import connection, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from api.archiving import archive_chunk, generate_archive_model_class
+from api.models import DynamicModel
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class ArchiveTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+        self.url = reverse('api:archive_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        self.list_url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id})
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'rows': [{'name': f'user{index}', 'age': index} for index in range(5)]}, format='json')
+
+    def get_archived_rows(self):
+        self.dynamic_model.refresh_from_db()
+        archive_class = generate_archive_model_class(self.dynamic_model, generate_model_class(self.dynamic_model))
+        return list(archive_class.objects.order_by('id').values_list('id', 'change_seq', 'age'))
+
+    @override_settings(DYNAMIC_MODEL_ARCHIVE_CHUNK_SIZE=2)
+    def test_archive__rows_moved_in_chunks(self):
+        """Test that matching rows are moved to the archive table in chunks, keeping their IDs and change sequence numbers."""
+
+        response = self.client.post(self.url, {'filters': {'age__lt': 3}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], '3 rows archived successfully')
+        self.assertEqual(self.get_archived_rows(), [(1, 1, 0), (2, 2, 1), (3, 3, 2)])
+        self.assertIn('archive_user', connections[self.dynamic_model.database].introspection.table_names())
+        self.assertTrue(self.dynamic_model.has_archive)
+        self.assertFalse(self.dynamic_model.archive_compressed)
+
+        # Archiving again moves newly matching rows only
+        response = self.client.post(self.url, {'filters': {'age__lt': 4}}, format='json')
+        self.assertEqual(response.data['message'], '1 rows archived successfully')
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Chunks are committed while the table is locked on PostgreSQL')
+    @override_settings(DYNAMIC_MODEL_ARCHIVE_CHUNK_SIZE=2)
+    def test_archive__chunks_committed_one_by_one(self):
+        """Test that each chunk of archived rows is committed before the next one is moved."""
+
+        archived_counts = []
+
+        def count_committed_rows(archive_class):
+            archived_counts.append(archive_class.objects.count())
+            connection.close()
+
+        def move_chunk(dynamic_model, archive_class, chunk):
+            archived_count = archive_chunk(dynamic_model, archive_class, chunk)
+            # Another connection only sees committed rows
+            thread = threading.Thread(target=count_committed_rows, args=(archive_class,))
+            thread.start()
+            thread.join()
+            return archived_count
+
+        with mock.patch('api.views.archive_chunk', move_chunk):
+            response = self.client.post(self.url, {'filters': {'age__lt': 5}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(archived_counts, [2, 4, 5])
+
+    def test_list__archived_rows_on_request(self):
+        """Test that listing reads the table alone unless archived rows are asked for."""
+
+        self.client.post(self.url, {'filters': {'age__in': [0, 1]}}, format='json')
+
+        response = self.client.get(self.list_url)
+        self.assertEqual([row['age'] for row in response.data], [2, 3, 4])
+
+        response = self.client.get(self.list_url, {'include_archived': 'true'})
+        self.assertEqual(sorted(row['age'] for row in response.data), [0, 1, 2, 3, 4])
+
+        response = self.client.get(self.list_url, {'include_archived': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_fields__archive_table_follows(self):
+        """Test that changing the fields of a model changes the columns of its archive table."""
+
+        self.client.post(self.url, {'filters': {'age': 0}}, format='json')
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        data = {'model_name': 'User', 'fields': {'age': 'bigint', 'has_car': 'boolean'}}
+        self.assertEqual(self.client.put(url, data, format='json').status_code, status.HTTP_200_OK)
+
+        self.client.post(self.url, {'filters': {'age': 1}}, format='json')
+        response = self.client.get(self.list_url, {'include_archived': 'true'})
+
+        self.assertEqual(
+            sorted((row['age'], row['has_car']) for row in response.data),
+            [(0, None), (1, None), (2, None), (3, None), (4, None)]
+        )
+        self.assertEqual(self.get_archived_rows(), [(1, 1, 0), (2, 2, 1)])
+
+    def test_archive__invalid_request__bad_request(self):
+        """Test that bad request is returned without filters, for unknown fields and unknown models."""
+
+        for data in ({}, {'filters': {}}, {'filters': {'height': 1}}, {'filters': {'age': 1}, 'compress': 'maybe'}):
+            self.assertEqual(self.client.post(self.url, data, format='json').status_code, status.HTTP_400_BAD_REQUEST, data)
+
+        url = reverse('api:archive_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id + 1})
+        self.assertEqual(self.client.post(url, {'filters': {'age': 1}}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.dynamic_model.refresh_from_db()
+        self.assertFalse(self.dynamic_model.has_archive)
+
+    def test_archive__compressed(self):
+        """Test that asking for compression compresses the archive table, also after it was created."""
+
+        self.client.post(self.url, {'filters': {'age': 0}}, format='json')
+        self.client.post(self.url, {'filters': {'age': 1}, 'compress': True}, format='json')
+
+        self.assertEqual(len(self.get_archived_rows()), 2)
+        self.assertTrue(self.dynamic_model.archive_compressed)
+
+        if connection.vendor == 'postgresql':
+            with connections[self.dynamic_model.database].cursor() as cursor:
+                cursor.execute("SELECT reloptions FROM pg_class WHERE relname = 'archive_user'")
+                self.assertEqual(cursor.fetchone()[0], ['toast_tuple_target=128'])
@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase, TransactionTestCase
+from api.benchmarks import BenchmarkRunner, compare_results, measure_startup
+from api.models import DynamicModel
+
+
+class BenchmarkRunnerTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_run__records_every_measurement(self):
+        """Test that the benchmark runner measures every endpoint and helper and cleans up after itself."""
+
+        results = BenchmarkRunner(widths=(2,), row_counts=(3,), repeat=1).run()
+
+        self.assertEqual(
+            [result['name'] for result in results['results']],
+            [
+                'startup dynamicModels.settings', 'startup dynamicModels.settings_api',
+                'create', 'generate_model_class', 'update', 'write_fields_changes_in_database', 'populate', 'list',
+                'memory instances', 'memory records'
+            ]
+        )
+        for result in results['results'][2:]:
+            self.assertGreater(result['queries'], 0)
+            self.assertGreaterEqual(result['seconds'], 0)
+        memory = {result['name']: result['bytes_per_row'] for result in results['results'][-2:]}
+        self.assertLess(memory['memory records'], memory['memory instances'])
+        # Make sure benchmark tables and their details are removed
+        self.assertFalse(DynamicModel.objects.exists())
+
+
+class CompareResultsTests(SimpleTestCase):
+    def test_compare_results(self):
+        """Test that query count increases and slow downs over the tolerance are reported as regressions."""
+
+        baseline = {'results': [
+            {'name': 'populate', 'width': 5, 'rows': 10, 'seconds': 1.0, 'queries': 4},
+            {'name': 'list', 'width': 5, 'rows': 10, 'seconds': 1.0, 'queries': 4},
+            {'name': 'create', 'width': 5, 'rows': 0, 'seconds': 1.0, 'queries': 4},
+        ]}
+        current = {'results': [
+            {'name': 'populate', 'width': 5, 'rows': 10, 'seconds': 1.0, 'queries': 5},
+            {'name': 'list', 'width': 5, 'rows': 10, 'seconds': 1.5, 'queries': 4},
+            {'name': 'create', 'width': 5, 'rows': 0, 'seconds': 1.1, 'queries': 4},
+        ]}
+
+        regressions = compare_results(baseline, current, tolerance=0.25)
+
+        self.assertEqual([regression['name'] for regression in regressions], ['populate', 'list'])
+
+
+class StartupTests(SimpleTestCase):
+    def test_api_only_settings__lighter_startup(self):
+        """Test that API-only workers serve requests without the admin, sessions and messages apps and load less."""
+
+        full_startup = measure_startup('dynamicModels.settings')
+        api_startup = measure_startup('dynamicModels.settings_api')
+
+        self.assertEqual(api_startup['status_code'], 200)
+        self.assertEqual(api_startup['apps'], ['rest_framework', 'api'])
+        self.assertLess(api_startup['modules'], full_startup['modules'])
+        self.assertGreater(api_startup['seconds'], 0)
+        self.assertGreater(api_startup['max_rss_kb'], 0)
@@ -0,0 +1,118 @@
+from unittest import mock
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from api.models import DeletedRow, DynamicModel
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class, insert_rows
+
+
+class ChangeFeedTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+        self.url = reverse('api:dynamic_model_rows_changes', kwargs={'model_id': self.dynamic_model.id})
+
+    def populate(self, rows):
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        return self.client.post(url, {'rows': rows}, format='json')
+
+    def test_changes__inserts_updates_and_deletes_in_order(self):
+        """Test that inserted, updated and deleted rows are returned in the order of their changes."""
+
+        self.populate([{'name': 'x', 'age': 15}, {'name': 'xx', 'age': 18}])
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'changes': [
+                {'id': 1, 'operation': 'upsert', 'values': {'name': 'x', 'age': 15}},
+                {'id': 2, 'operation': 'upsert', 'values': {'name': 'xx', 'age': 18}},
+            ],
+            'token': '2-2',
+            'has_more': False,
+        })
+
+        url = reverse('api:bulk_update_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'filters': {'name': 'xx'}, 'values': {'age': 19}}, format='json')
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'filters': {'name': 'x'}}, format='json')
+        self.populate([{'name': 'xxx', 'age': 20}])
+
+        response = self.client.get(self.url, {'token': '2-2'})
+
+        self.assertEqual(response.data, {
+            'changes': [
+                {'id': 2, 'operation': 'upsert', 'values': {'name': 'xx', 'age': 19}},
+                {'id': 1, 'operation': 'delete'},
+                {'id': 3, 'operation': 'upsert', 'values': {'name': 'xxx', 'age': 20}},
+            ],
+            'token': '5-3',
+            'has_more': False,
+        })
+        self.assertEqual(self.client.get(self.url, {'token': '5-3'}).data, {'changes': [], 'token': '5-3', 'has_more': False})
+
+    def test_changes__pages(self):
+        """Test that following tokens pages through changes, also within rows updated together."""
+
+        self.populate([{'name': f'user{index}', 'age': index} for index in range(3)])
+        url = reverse('api:bulk_update_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'filters': {'age__gte': 0}, 'values': {'name': 'updated'}}, format='json')
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'filters': {'age': 1}}, format='json')
+
+        changes = []
+        token = '3-3'
+        while True:
+            response = self.client.get(self.url, {'token': token, 'limit': 2})
+            changes.extend((change['id'], change['operation']) for change in response.data['changes'])
+            token = response.data['token']
+            if not response.data['has_more']:
+                break
+
+        self.assertEqual(changes, [(1, 'upsert'), (3, 'upsert'), (2, 'delete')])
+        self.assertEqual(token, '5-2')
+
+    @override_settings(DYNAMIC_MODEL_CHANGES_POLL_INTERVAL=0.01)
+    def test_changes__long_poll(self):
+        """Test that a request waits for a change when there is none yet, or returns no change once the wait is over."""
+
+        model_class = generate_model_class(self.dynamic_model)
+
+        # Rows are inserted while the request waits
+        insert = lambda seconds: insert_rows(self.dynamic_model, model_class, [{'name': 'x', 'age': 15}])
+        with mock.patch('api.changes.time.sleep', side_effect=insert) as sleep:
+            response = self.client.get(self.url, {'wait': 5})
+
+        sleep.assert_called_once()
+        self.assertEqual(response.data['changes'], [{'id': 1, 'operation': 'upsert', 'values': {'name': 'x', 'age': 15}}])
+
+        response = self.client.get(self.url, {'token': response.data['token'], 'wait': 0.05})
+        self.assertEqual(response.data, {'changes': [], 'token': '1-1', 'has_more': False})
+
+    @override_settings(DYNAMIC_MODEL_CHANGES_PAGE_SIZE=10, DYNAMIC_MODEL_CHANGES_MAX_WAIT=1)
+    def test_changes__invalid_request__bad_request(self):
+        """Test that bad request is returned for malformed tokens, too large limits or waits and unknown models."""
+
+        for params in ({'token': '5'}, {'token': 'a-1'}, {'limit': 11}, {'limit': 0}, {'wait': 2}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST, params)
+
+        url = reverse('api:dynamic_model_rows_changes', kwargs={'model_id': self.dynamic_model.id + 1})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete__rows_recorded(self):
+        """Test that deleting rows in chunks records each deleted row with the change of its chunk."""
+
+        self.populate([{'name': f'user{index}', 'age': index} for index in range(5)])
+
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        with override_settings(DYNAMIC_MODEL_DELETE_CHUNK_SIZE=2):
+            response = self.client.post(url, {'filters': {'age__gte': 1}}, format='json')
+
+        self.assertEqual(response.data['message'], '4 rows deleted successfully')
+        self.assertEqual(
+            list(DeletedRow.objects.order_by('row_id').values_list('row_id', 'change_seq')),
+            [(2, 6), (3, 6), (4, 7), (5, 7)]
+        )
@@ -0,0 +1,111 @@
+import unittest
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api.connections import close_unusable_connections
+
+
+class HealthChecksTests(TransactionTestCase):
+    def test_usable_connection_is_kept(self):
+        """Test that a working persistent connection is not closed by health checks."""
+
+        connection.ensure_connection()
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = True
+        try:
+            close_unusable_connections()
+        finally:
+            del connection.settings_dict['CONN_HEALTH_CHECKS']
+
+        self.assertIsNotNone(connection.connection)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Closing the connection destroys SQLite test databases')
+    def test_unusable_connection_is_closed(self):
+        """Test that a persistent connection dropped by the server is closed before it is used."""
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            backend_pid = cursor.fetchone()[0]
+        other_connection = connection.copy()
+        with other_connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [backend_pid])
+        other_connection.close()
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = True
+        try:
+            close_unusable_connections()
+        finally:
+            del connection.settings_dict['CONN_HEALTH_CHECKS']
+
+        self.assertIsNone(connection.connection)
+
+
+class DatabasePoolStatsViewTests(APITestCase):
+    def test_no_pool__empty_stats(self):
+        """Test that pool stats are empty when no database uses a connection pool."""
+
+        if connection.settings_dict['ENGINE'] == 'api.backends.postgresql_pool':
+            self.skipTest('Default database uses a connection pool')
+
+        response = self.client.get(reverse('api:database_pool_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {})
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Connection pools need a PostgreSQL database')
+class ConnectionPoolTests(TestCase):
+    def setUp(self):
+        from api.backends.postgresql_pool.base import DatabaseWrapper
+
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'api.backends.postgresql_pool',
+            'CONN_MAX_AGE': 0,
+            'POOL': {'MIN_CONNS': 1, 'MAX_CONNS': 2, 'TIMEOUT': 0.1},
+        }
+        self.alias = f'pool_{self._testMethodName}'
+        self.wrapper = DatabaseWrapper(settings_dict, alias=self.alias)
+
+    def tearDown(self):
+        from api.backends.postgresql_pool.base import _pools
+
+        self.wrapper.close()
+        conn_params, connection_pool = _pools.pop(self.alias)
+        connection_pool.closeall()
+
+    def pool_stats(self):
+        from api.backends.postgresql_pool.base import get_pool_stats
+
+        return get_pool_stats()[self.alias]
+
+    def test_closed_connections_are_reused(self):
+        """Test that closing a connection returns it to the pool and that it is reused."""
+
+        self.wrapper.ensure_connection()
+        first_connection = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertEqual(self.pool_stats()['idle'], 1)
+
+        self.wrapper.ensure_connection()
+
+        self.assertIs(self.wrapper.connection, first_connection)
+        stats = self.pool_stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(stats['released'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_broken_connections_are_discarded(self):
+        """Test that a pooled connection closed by the server is replaced by a new one."""
+
+        self.wrapper.ensure_connection()
+        first_connection = self.wrapper.connection
+        self.wrapper.close()
+        first_connection.close()
+
+        self.wrapper.ensure_connection()
+
+        self.assertIsNot(self.wrapper.connection, first_connection)
+        self.assertEqual(self.pool_stats()['discarded'], 1)
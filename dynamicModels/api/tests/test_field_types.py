@@ -0,0 +1,145 @@
+import datetime
+import decimal
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.field_types import convert_column, convert_text_column, is_safe_conversion
+from api.models import DynamicModel
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class FieldTypesTests(SimpleTestCase):
+    def test_convert_column(self):
+        """Test that columns of valid values are converted to the python values of their field type."""
+
+        self.assertEqual(convert_column('number', [1, -2]), [1, -2])
+        self.assertEqual(convert_column('bigint', [2 ** 40]), [2 ** 40])
+        self.assertEqual(convert_column('float', [1, 2.5]), [1.0, 2.5])
+        self.assertEqual(convert_column('decimal', ['1.10', 2]), [decimal.Decimal('1.1'), decimal.Decimal(2)])
+        self.assertEqual(convert_column('date', ['2024-02-29']), [datetime.date(2024, 2, 29)])
+        self.assertEqual(
+            convert_column('datetime', ['2024-02-29T10:30:00', '2024-02-29T10:30:00+02:00']),
+            [
+                datetime.datetime(2024, 2, 29, 10, 30, tzinfo=timezone.utc),
+                datetime.datetime(2024, 2, 29, 8, 30, tzinfo=timezone.utc)
+            ]
+        )
+        self.assertEqual(convert_column('json', [{'a': [1]}, 'x', 0]), [{'a': [1]}, 'x', 0])
+        self.assertEqual(convert_column('text', ['x' * 1000]), ['x' * 1000])
+
+    def test_convert_column__invalid_values__value_error(self):
+        """Test that value error is raised for columns with a value of the wrong type or out of range."""
+
+        cases = (
+            ('string', ['x' * 256]),
+            ('number', [1, True]),
+            ('number', [2 ** 31]),
+            ('bigint', ['1']),
+            ('float', [1.5, '2']),
+            ('decimal', ['x']),
+            ('decimal', [10 ** 20]),
+            ('boolean', [1]),
+            ('date', ['2024-02-30']),
+            ('datetime', [1700000000]),
+            ('json', [None]),
+        )
+        for field_type, values in cases:
+            with self.assertRaises(ValueError, msg=field_type):
+                convert_column(field_type, values)
+
+    def test_convert_text_column(self):
+        """Test that CSV text values are parsed before being converted."""
+
+        self.assertEqual(convert_text_column('float', ('1.5', '2')), [1.5, 2.0])
+        self.assertEqual(convert_text_column('boolean', ('True', '0')), [True, False])
+        self.assertEqual(convert_text_column('json', ('{"a": 1}',)), [{'a': 1}])
+
+        with self.assertRaises(ValueError):
+            convert_text_column('boolean', ('yes',))
+
+    def test_is_safe_conversion(self):
+        """Test that only field type changes keeping existing values are safe."""
+
+        self.assertTrue(is_safe_conversion('number', 'bigint'))
+        self.assertTrue(is_safe_conversion('date', 'datetime'))
+        self.assertTrue(is_safe_conversion('boolean', 'string'))
+        self.assertFalse(is_safe_conversion('bigint', 'number'))
+        self.assertFalse(is_safe_conversion('text', 'string'))
+        self.assertFalse(is_safe_conversion('string', 'json'))
+
+
+class FieldTypesViewsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {
+            'model_name': 'Payment',
+            'fields': {
+                'reference': 'string', 'note': 'text', 'count': 'number', 'account': 'bigint', 'rate': 'float',
+                'amount': 'decimal', 'day': 'date', 'paid_at': 'datetime', 'details': 'json', 'refunded': 'boolean'
+            }
+        }
+        self.response = self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='payment')
+        self.row = {
+            'reference': 'abc', 'note': 'Paid, in full!', 'count': 3, 'account': 2 ** 40, 'rate': 0.5,
+            'amount': '10.25', 'day': '2024-02-29', 'paid_at': '2024-02-29T10:30:00Z', 'details': {'tags': ['a']},
+            'refunded': False
+        }
+
+    def test_populate_and_list_rich_field_types(self):
+        """Test that rows of all field types are stored with native column types and listed back."""
+
+        self.assertEqual(self.response.status_code, status.HTTP_201_CREATED)
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.post(url, {'rows': [self.row]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        row = generate_model_class(self.dynamic_model).objects.get()
+        self.assertEqual(row.amount, decimal.Decimal('10.25'))
+        self.assertEqual(row.day, datetime.date(2024, 2, 29))
+        self.assertEqual(row.paid_at, datetime.datetime(2024, 2, 29, 10, 30, tzinfo=timezone.utc))
+        self.assertEqual(row.details, {'tags': ['a']})
+
+        response = self.client.get(reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['amount'], '10.2500000000')
+        self.assertEqual(response.data[0]['day'], '2024-02-29')
+        self.assertEqual(response.data[0]['paid_at'], '2024-02-29T10:30:00Z')
+        self.assertEqual(response.data[0]['details'], {'tags': ['a']})
+
+    def test_update_safe_conversions(self):
+        """Test that safe field type changes are applied to existing rows."""
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'rows': [self.row]}, format='json')
+
+        fields = {field.name: field.field_type for field in self.dynamic_model.fields.all()}
+        fields.update({'count': 'bigint', 'day': 'datetime', 'reference': 'text'})
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.put(url, {'fields': fields}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        row = generate_model_class(self.dynamic_model).objects.get()
+        self.assertEqual(row.count, 3)
+        self.assertEqual(row.reference, 'abc')
+        self.assertEqual(row.day, datetime.datetime(2024, 2, 29, tzinfo=timezone.utc))
+
+        # Stored dates are listed as datetimes at midnight
+        response = self.client.get(reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id}))
+        self.assertEqual(response.data[0]['day'], '2024-02-29T00:00:00Z')
+
+    def test_populate_wrong_value_type(self):
+        """Test that values which can not be converted to their field type are rejected."""
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.row.update({'day': '29/02/2024', 'amount': 'ten'})
+        response = self.client.post(url, {'rows': [self.row]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['Fields with wrong value type'],
+            [{'field_name': 'amount', 'correct_type': 'decimal'}, {'field_name': 'day', 'correct_type': 'date'}]
+        )
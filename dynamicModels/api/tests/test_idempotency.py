@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.models import DynamicModel, IdempotencyKey
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class IdempotencyTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number', 'has_car': 'boolean'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+        self.model_class = generate_model_class(self.dynamic_model)
+        self.url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.data = {'rows': [{'name': 'mohamed', 'age': 26, 'has_car': True}]}
+
+    def populate(self, data, key='key-1'):
+        return self.client.post(self.url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeated_key__response_replayed(self):
+        """Test that a retried request replays the stored response in one query without inserting rows again."""
+
+        response = self.populate(self.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as context:
+            replayed_response = self.populate(self.data)
+
+        self.assertEqual(replayed_response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replayed_response.data, response.data)
+        self.assertEqual(replayed_response['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(self.model_class.objects.count(), 1)
+
+        # Requests without a key or with another key are not deduplicated
+        self.client.post(self.url, self.data, format='json')
+        self.populate(self.data, key='key-2')
+        self.assertEqual(self.model_class.objects.count(), 3)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1000)
+    def test_body_over_upload_memory_limit__key_accepted(self):
+        """Test that a key is accepted on requests with bodies larger than DATA_UPLOAD_MAX_MEMORY_SIZE."""
+
+        data = {'rows': [{'name': f'user{index}', 'age': index, 'has_car': False} for index in range(50)]}
+
+        response = self.populate(data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.populate(data)['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.model_class.objects.count(), 50)
+
+    def test_key_reused_for_different_request__unprocessable(self):
+        """Test that a key can not be reused for a request with another body or endpoint."""
+
+        self.populate(self.data)
+
+        response = self.populate({'rows': [{'name': 'ahmed', 'age': 30, 'has_car': False}]})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.post(url, {'filters': {'age': 26}}, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self.model_class.objects.count(), 1)
+
+    def test_failed_request__not_stored(self):
+        """Test that responses of invalid requests are not stored, so the request can be fixed and retried."""
+
+        response = self.populate({'rows': [{'name': 'mohamed', 'age': 'old', 'has_car': True}]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.populate(self.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.model_class.objects.count(), 1)
+
+    def test_expired_keys(self):
+        """Test that expired keys are not replayed and are purged."""
+
+        self.populate(self.data)
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        response = self.populate(self.data)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self.model_class.objects.count(), 2)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.populate(self.data, key='key-2')
+        output = StringIO()
+        call_command('purge_idempotency_keys', stdout=output)
+
+        self.assertIn('Purged 1 expired idempotency keys', output.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['key-2'])
@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from api import ingestion
+from api.ingestion import create_ingestion_job, run_ingestion_job
+from api.models import DynamicModel, IngestionJob, IngestionTask
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class IngestionTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        for model_name in ('User', 'Car', 'Pet'):
+            data = {'model_name': model_name, 'fields': {'name': 'string', 'age': 'number'}}
+            self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_models = {dynamic_model.name: dynamic_model for dynamic_model in DynamicModel.objects.all()}
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.write_file('users.csv', 'name,age\nx,15\nxx,18\n')
+        self.write_file('cars.columns', '{"columns": {"name": "string", "age": "number"}}\n{"name": ["a", "b", "c"], "age": [1, 2, 3]}\n')
+        self.write_file('pets.csv', 'name,age\nrex,3\nfelix,old\n')
+
+    def write_file(self, file_name, content):
+        with open(os.path.join(self.directory, file_name), 'w') as output_file:
+            output_file.write(content)
+
+    def count_rows(self, model_name):
+        return generate_model_class(self.dynamic_models[model_name]).objects.count()
+
+    def test_command__tables_loaded_and_failures_isolated(self):
+        """Test that tables of a manifest are loaded in parallel and a failing table is rolled back alone."""
+
+        manifest = [
+            {'table': 'User', 'file': 'users.csv'},
+            {'table': 'car', 'file': 'cars.columns', 'format': 'columns'},
+            {'table': 'pet', 'file': 'pets.csv'},
+        ]
+        self.write_file('manifest.json', json.dumps(manifest))
+
+        stdout, stderr = StringIO(), StringIO()
+        with self.assertRaisesMessage(CommandError, '1 of 3 tables failed'), self.assertLogs('api.ingestion', 'ERROR'):
+            call_command('ingest_dynamic_models', os.path.join(self.directory, 'manifest.json'), workers=2, stdout=stdout, stderr=stderr)
+
+        self.assertEqual((self.count_rows('user'), self.count_rows('car'), self.count_rows('pet')), (2, 3, 0))
+        self.assertIn('user: 2 rows in', stdout.getvalue())
+        self.assertIn('car: 3 rows in', stdout.getvalue())
+        self.assertIn('2 of 3 tables loaded, 5 rows', stdout.getvalue())
+        self.assertIn('pet: failed .. ', stderr.getvalue())
+
+        job = IngestionJob.objects.get()
+        self.assertEqual(job.status, IngestionJob.STATUS_FAILED)
+        self.assertEqual(
+            {key: job.report[key] for key in ('tables', 'succeeded', 'failed', 'rows')},
+            {'tables': 3, 'succeeded': 2, 'failed': 1, 'rows': 5}
+        )
+
+    @override_settings(DYNAMIC_MODEL_INGEST_WORKERS=2)
+    def test_command__workers_capped_by_setting(self):
+        """Test that the command loads at most DYNAMIC_MODEL_INGEST_WORKERS tables at a time and says so."""
+
+        self.write_file('manifest.json', json.dumps([{'table': 'user', 'file': 'users.csv'}]))
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command('ingest_dynamic_models', os.path.join(self.directory, 'manifest.json'), workers=8, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(IngestionJob.objects.get().workers, 2)
+        self.assertIn('Workers are limited to DYNAMIC_MODEL_INGEST_WORKERS (2)', stderr.getvalue())
+        workers = 1 if connection.vendor == 'sqlite' else 2
+        self.assertIn(f'Loading tables with {workers} workers', stdout.getvalue())
+
+    def test_command__invalid_manifest__command_error(self):
+        """Test that manifests naming unknown tables or formats are rejected before loading anything."""
+
+        for manifest, message in (
+            ([{'table': 'boat', 'file': 'users.csv'}], 'No dynamic model with name boat exists'),
+            ([{'table': 'user', 'file': 'users.csv', 'format': 'xml'}], 'Format should be one of csv, columns'),
+            ({}, 'non empty list'),
+        ):
+            self.write_file('manifest.json', json.dumps(manifest))
+            with self.assertRaisesMessage(CommandError, message):
+                call_command('ingest_dynamic_models', os.path.join(self.directory, 'manifest.json'))
+
+        self.assertFalse(IngestionJob.objects.exists())
+
+    @override_settings(DYNAMIC_MODEL_INGEST_WORKERS=2)
+    def test_run_ingestion_job__global_concurrency_limit(self):
+        """Test that jobs load at most DYNAMIC_MODEL_INGEST_WORKERS tables at the same time, one on SQLite."""
+
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def load_rows_file(*args):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return 1
+
+        entries = [(self.dynamic_models['user'], os.path.join(self.directory, 'users.csv'), 'csv')] * 4
+        with mock.patch.object(ingestion, '_ingestion_slots', None), \
+                mock.patch('api.ingestion.load_rows_file', side_effect=load_rows_file):
+            job = run_ingestion_job(create_ingestion_job(entries, workers=4))
+
+        self.assertEqual(peak[0], 1 if connection.vendor == 'sqlite' else 2)
+        self.assertEqual(job.report['rows'], 4)
+
+    @unittest.skipIf(connection.vendor == 'sqlite', 'SQLite tables on the default database report rows once loaded')
+    @override_settings(DYNAMIC_MODEL_INGEST_CHUNK_SIZE=1)
+    def test_run_ingestion_task__rows_reported_after_each_chunk(self):
+        """Test that rows inserted by a running task are visible on the task after each chunk, before the task ends."""
+
+        job = create_ingestion_job([(self.dynamic_models['user'], os.path.join(self.directory, 'users.csv'), 'csv')], 1)
+        task = job.tasks.select_related('dynamic_model').get()
+        reported_rows = []
+        record_rows = ingestion.record_task_rows
+
+        def read_task_rows():
+            reported_rows.append(IngestionTask.objects.get(id=task.id).rows)
+            connection.close()
+
+        def record_task_rows(*args):
+            record_rows(*args)
+            # Another connection sees the rows of the task while the table is being loaded
+            thread = threading.Thread(target=read_task_rows)
+            thread.start()
+            thread.join()
+
+        with mock.patch('api.ingestion.record_task_rows', record_task_rows):
+            ingestion.run_ingestion_task(task)
+
+        self.assertEqual(reported_rows, [1, 2])
+        self.assertEqual(IngestionTask.objects.get(id=task.id).rows, 2)
+
+    def test_api_job(self):
+        """Test that an ingestion job started from the API loads files under the ingestion root and reports progress."""
+
+        data = {'tasks': [{'table': 'user', 'file': 'users.csv'}, {'table': 'pet', 'file': 'pets.csv'}], 'workers': 2}
+        with override_settings(DYNAMIC_MODEL_INGEST_ROOT=self.directory), self.assertLogs('api.ingestion', 'ERROR'), \
+                mock.patch('api.views.start_ingestion_job', side_effect=run_ingestion_job):
+            response = self.client.post(reverse('api:create_ingestion_job'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.get(reverse('api:ingestion_job', kwargs={'job_id': response.data['job_id']}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], IngestionJob.STATUS_FAILED)
+        self.assertEqual(
+            [(task['table'], task['status'], task['rows']) for task in response.data['tasks']],
+            [('user', IngestionJob.STATUS_SUCCEEDED, 2), ('pet', IngestionJob.STATUS_FAILED, 0)]
+        )
+        self.assertIn('Invalid values in rows 1 to 2', response.data['tasks'][1]['error'])
+        self.assertEqual(response.data['report']['rows'], 2)
+
+        self.assertEqual(self.client.get(reverse('api:ingestion_job', kwargs={'job_id': 0})).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_api_job__invalid_tasks__bad_request(self):
+        """Test that bad request is returned without an ingestion root, for files out of it and unknown tables."""
+
+        url = reverse('api:create_ingestion_job')
+        data = {'tasks': [{'table': 'user', 'file': 'users.csv'}]}
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        with override_settings(DYNAMIC_MODEL_INGEST_ROOT=self.directory):
+            for task in ({'table': 'user', 'file': '../users.csv'}, {'table': 'user', 'file': 'missing.csv'}, {'table': 'boat', 'file': 'users.csv'}):
+                response = self.client.post(url, {'tasks': [task]}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, task)
+
+        self.assertFalse(IngestionJob.objects.exists())
@@ -0,0 +1,168 @@
+import threading
+import unittest
+from unittest import mock
+from django.db import connection, transaction
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from api.changes import delete_tracked_rows
+from api.locking import ADVISORY_LOCK_NAMESPACE, ReadWriteLock, table_lock
+from api.models import DynamicModel
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class ReadWriteLockTests(SimpleTestCase):
+    def test_shared_and_exclusive_locks(self):
+        """Test that shared locks are held together and exclude an exclusive lock."""
+
+        lock = ReadWriteLock()
+
+        self.assertTrue(lock.acquire(shared=True, timeout=0))
+        self.assertTrue(lock.acquire(shared=True, timeout=0))
+        self.assertFalse(lock.acquire(timeout=0.01))
+
+        lock.release(shared=True)
+        lock.release(shared=True)
+        self.assertTrue(lock.acquire(timeout=0))
+        self.assertFalse(lock.acquire(shared=True, timeout=0.01))
+
+    def test_waiting_writer_goes_before_new_readers(self):
+        """Test that new shared locks wait for a waiting exclusive lock, which gets the lock once readers leave."""
+
+        lock = ReadWriteLock()
+        lock.acquire(shared=True)
+        writer_acquired = threading.Event()
+
+        def write():
+            lock.acquire()
+            writer_acquired.set()
+            lock.release()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not lock._waiting_writers:
+            pass
+
+        self.assertFalse(lock.acquire(shared=True, timeout=0.01))
+        lock.release(shared=True)
+        writer.join(timeout=1)
+        self.assertTrue(writer_acquired.is_set())
+        self.assertTrue(lock.acquire(shared=True, timeout=0))
+
+
+@override_settings(DYNAMIC_MODEL_LOCK_TIMEOUT=0.1)
+class TableLockViewsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        for model_name in ('User', 'Car'):
+            data = {'model_name': model_name, 'fields': {'name': 'string', 'age': 'number'}}
+            self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+
+        self.user_model = DynamicModel.objects.get(name='user')
+        self.car_model = DynamicModel.objects.get(name='car')
+        self.rows = {'rows': [{'name': 'x', 'age': 1}]}
+
+    def hold_lock(self, dynamic_model_id, shared=False):
+        """Hold the lock of a table from another thread until the end of the test."""
+
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            with table_lock(dynamic_model_id, shared=shared):
+                locked.set()
+                release.wait(5)
+            connection.close()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        locked.wait(5)
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+
+    def test_schema_change__blocks_same_table_only(self):
+        """Test that rows of a table being changed are neither written nor read, while other tables are."""
+
+        self.hold_lock(self.user_model.id)
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.user_model.id})
+        response = self.client.post(url, self.rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.user_model.id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.car_model.id})
+        self.assertEqual(self.client.post(url, self.rows, format='json').status_code, status.HTTP_201_CREATED)
+
+    def test_rows_being_written__block_schema_change(self):
+        """Test that a schema change waits for requests writing rows of the table, which do not wait for each other."""
+
+        self.hold_lock(self.user_model.id, shared=True)
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.user_model.id})
+        response = self.client.put(url, {'fields': {'name': 'string', 'age': 'string'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.user_model.id})
+        self.assertEqual(self.client.post(url, self.rows, format='json').status_code, status.HTTP_201_CREATED)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Advisory locks are only taken on PostgreSQL')
+    def test_advisory_lock(self):
+        """Test that an advisory lock keyed by the dynamic model ID is held during the block."""
+
+        with table_lock(self.user_model.id):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT mode FROM pg_locks WHERE locktype = %s AND classid = %s AND objid = %s',
+                    ['advisory', ADVISORY_LOCK_NAMESPACE, self.user_model.id]
+                )
+                self.assertEqual(cursor.fetchall(), [('ExclusiveLock',)])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Advisory locks are only taken on PostgreSQL')
+    def test_advisory_lock__outside_transactions(self):
+        """Test that the lock leaves no transaction open nor lock timeout set, and is released after the block."""
+
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW lock_timeout')
+            lock_timeout = cursor.fetchone()[0]
+            with table_lock(self.user_model.id, shared=True):
+                self.assertFalse(connection.in_atomic_block)
+                cursor.execute('SHOW lock_timeout')
+                self.assertEqual(cursor.fetchone()[0], lock_timeout)
+            cursor.execute('SELECT count(*) FROM pg_locks WHERE locktype = %s AND objid = %s', ['advisory', self.user_model.id])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+            # Within a transaction, like requests sent with an idempotency key
+            with transaction.atomic(), table_lock(self.user_model.id):
+                cursor.execute('SHOW lock_timeout')
+                self.assertEqual(cursor.fetchone()[0], lock_timeout)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Advisory locks are only taken on PostgreSQL')
+    @override_settings(DYNAMIC_MODEL_DELETE_CHUNK_SIZE=1)
+    def test_bulk_delete__chunks_committed_one_by_one(self):
+        """Test that each chunk of a bulk delete is committed before the next one, while the table is locked."""
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.user_model.id})
+        self.client.post(url, {'rows': [{'name': 'x', 'age': age} for age in range(3)]}, format='json')
+        model_class = generate_model_class(self.user_model)
+        visible_counts = []
+
+        def count_committed_rows():
+            visible_counts.append(model_class.objects.count())
+            connection.close()
+
+        def delete_chunk(dynamic_model, chunk):
+            deleted_count = delete_tracked_rows(dynamic_model, chunk)
+            # Another connection only sees committed deletes
+            thread = threading.Thread(target=count_committed_rows)
+            thread.start()
+            thread.join()
+            return deleted_count
+
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.user_model.id})
+        with mock.patch('api.views.delete_tracked_rows', delete_chunk):
+            response = self.client.post(url, {'filters': {'name': 'x'}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(visible_counts, [2, 1, 0, 0])
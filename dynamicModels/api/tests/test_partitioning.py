@@ -0,0 +1,157 @@
+import unittest
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.serializers import ValidationError
+from api.models import DynamicModel, DynamicModelField
+from api.serializers import CreateDynamicModelSerializer, UpdateDynamicModelSerializer
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class PartitionSerializersTests(TestCase):
+    def test_partition_field_not_number__validation_error(self):
+        """Test that validation error is raised when the partition field is not a number field of the model."""
+
+        data = {
+            'model_name': 'Event',
+            'fields': {'name': 'string', 'amount': 'number'},
+            'partition': {'field': 'name', 'type': 'range', 'size': 100}
+        }
+
+        serializer = CreateDynamicModelSerializer(data=data)
+
+        with self.assertRaisesMessage(ValidationError, 'Partition field should be a number field of the model'):
+            serializer.is_valid(raise_exception=True)
+
+        data['partition']['field'] = 'missing'
+        serializer = CreateDynamicModelSerializer(data=data)
+
+        with self.assertRaisesMessage(ValidationError, 'Partition field should be a number field of the model'):
+            serializer.is_valid(raise_exception=True)
+
+    @override_settings(DYNAMIC_MODEL_MAX_HASH_PARTITIONS=8)
+    def test_too_many_hash_partitions__validation_error(self):
+        """Test that validation error is raised for more hash partitions than DYNAMIC_MODEL_MAX_HASH_PARTITIONS."""
+
+        data = {
+            'model_name': 'Event',
+            'fields': {'name': 'string', 'amount': 'number'},
+            'partition': {'field': 'amount', 'type': 'hash', 'size': 9}
+        }
+
+        serializer = CreateDynamicModelSerializer(data=data)
+
+        with self.assertRaisesMessage(ValidationError, 'Hash partitioned tables have at most 8 partitions'):
+            serializer.is_valid(raise_exception=True)
+
+        data['partition']['size'] = 8
+        self.assertTrue(CreateDynamicModelSerializer(data=data).is_valid())
+        # Range partitions are created as rows need them, their size is a range of values
+        data['partition'].update({'type': 'range', 'size': 100000})
+        self.assertTrue(CreateDynamicModelSerializer(data=data).is_valid())
+
+    def test_partition_field_changed__validation_error(self):
+        """Test that validation error is raised when the partition field is removed or its type changed."""
+
+        dynamic_model = DynamicModel.objects.create(
+            name='event', partition_field='amount', partition_type='hash', partition_size=4
+        )
+        DynamicModelField.objects.create(model=dynamic_model, name='name', field_type='string')
+        DynamicModelField.objects.create(model=dynamic_model, name='amount', field_type='number')
+
+        for fields in ({'name': 'string'}, {'name': 'string', 'amount': 'string'}):
+            serializer = UpdateDynamicModelSerializer(data={'fields': fields}, context={'model_id': dynamic_model.id})
+
+            with self.assertRaisesMessage(ValidationError, 'Partition field can not be removed or changed .. amount'):
+                serializer.is_valid(raise_exception=True)
+
+
+class PartitioningViewsTests(DynamicModelTransactionTestCase):
+    def create_partitioned_model(self, partition_type, size):
+        data = {
+            'model_name': 'Event',
+            'fields': {'name': 'string', 'amount': 'number'},
+            'partition': {'field': 'amount', 'type': partition_type, 'size': size}
+        }
+        response = self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return DynamicModel.objects.get(name='event')
+
+    def populate(self, dynamic_model, amounts):
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id})
+        rows = [{'name': 'event', 'amount': amount} for amount in amounts]
+        response = self.client.post(url, {'rows': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+    def get_partitions(self, dynamic_model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass ORDER BY 1',
+                [f'api_{dynamic_model.name}']
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_partitioned_model(self):
+        """Ensure that a model declaring a partition key can be created and populated on any database."""
+
+        dynamic_model = self.create_partitioned_model('range', 1000)
+        self.populate(dynamic_model, [5, 1500, -3])
+
+        self.assertEqual(dynamic_model.partition_field, 'amount')
+        self.assertEqual(generate_model_class(dynamic_model).objects.count(), 3)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning is only applied on PostgreSQL')
+    def test_range_partitions_are_created_when_populating(self):
+        """Ensure that range partitions are created for the rows being inserted."""
+
+        dynamic_model = self.create_partitioned_model('range', 1000)
+
+        self.assertEqual(self.get_partitions(dynamic_model), [])
+
+        self.populate(dynamic_model, [5, 1500, -3])
+        self.populate(dynamic_model, [20, 999])
+
+        self.assertEqual(self.get_partitions(dynamic_model), ['api_event_p0', 'api_event_p1000', 'api_event_pm1000'])
+        self.assertEqual(generate_model_class(dynamic_model).objects.count(), 5)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning is only applied on PostgreSQL')
+    def test_hash_partitions_are_created_with_the_table(self):
+        """Ensure that all hash partitions are created with the table."""
+
+        dynamic_model = self.create_partitioned_model('hash', 3)
+
+        self.assertEqual(self.get_partitions(dynamic_model), ['api_event_p0', 'api_event_p1', 'api_event_p2'])
+
+        self.populate(dynamic_model, range(10))
+        self.assertEqual(generate_model_class(dynamic_model).objects.count(), 10)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning is only applied on PostgreSQL')
+    def test_update_partitioned_model(self):
+        """Ensure that fields other than the partition key of a partitioned model can be updated."""
+
+        dynamic_model = self.create_partitioned_model('hash', 2)
+        self.populate(dynamic_model, [1, 2])
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': dynamic_model.id})
+        data = {'fields': {'amount': 'number', 'note': 'string'}}
+        response = self.client.put(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(generate_model_class(dynamic_model).objects.values_list('note', flat=True)), [None, None])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning is only applied on PostgreSQL')
+    def test_partitioned_table_indexes(self):
+        """Ensure that partitioned tables and their partitions get the index on change_seq read by the change feed."""
+
+        dynamic_model = self.create_partitioned_model('range', 1000)
+        self.populate(dynamic_model, [5, 1500])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tablename FROM pg_indexes WHERE tablename LIKE %s AND indexdef LIKE %s ORDER BY 1',
+                ['api\\_event%', '%(change_seq)%']
+            )
+            self.assertEqual([row[0] for row in cursor.fetchall()], ['api_event', 'api_event_p0', 'api_event_p1000'])
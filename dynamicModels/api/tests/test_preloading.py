@@ -0,0 +1,46 @@
+from django.test import TestCase
+from api.models import DynamicModel, DynamicModelField
+from api.preloading import preload_model_classes
+from api.utils import generate_model_class
+
+
+class PreloadModelClassesTests(TestCase):
+    def setUp(self):
+        for index in range(5):
+            dynamic_model = DynamicModel.objects.create(name=f'preloadmodel{index}')
+            DynamicModelField.objects.create(model=dynamic_model, name='name', field_type='string')
+            DynamicModelField.objects.create(model=dynamic_model, name='age', field_type='number')
+        # A dynamic model without fields has no model class
+        DynamicModel.objects.create(name='emptymodel')
+
+    def test_preload_model_classes(self):
+        """Test that model classes of all dynamic models are built with two queries."""
+
+        with self.assertNumQueries(2):
+            preloaded_count, duration = preload_model_classes()
+
+        self.assertEqual(preloaded_count, 5)
+        self.assertGreaterEqual(duration, 0)
+
+        # Preloaded classes are reused instead of being built again
+        dynamic_model = DynamicModel.objects.prefetch_related('fields').get(name='preloadmodel0')
+        self.assertIs(generate_model_class(dynamic_model), generate_model_class(dynamic_model))
+
+    def test_preload_limit(self):
+        """Test that at most `limit` dynamic models are preloaded."""
+
+        preloaded_count, duration = preload_model_classes(limit=2)
+
+        self.assertEqual(preloaded_count, 2)
+
+    def test_schema_change__new_model_class(self):
+        """Test that a new model class is built when the fields of a dynamic model change."""
+
+        dynamic_model = DynamicModel.objects.get(name='preloadmodel0')
+        old_model_class = generate_model_class(dynamic_model)
+
+        dynamic_model.fields.filter(name='age').update(field_type='string')
+        new_model_class = generate_model_class(dynamic_model)
+
+        self.assertIsNot(old_model_class, new_model_class)
+        self.assertEqual(new_model_class._meta.get_field('age').get_internal_type(), 'CharField')
@@ -0,0 +1,125 @@
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from api.benchmarks import generate_schema, generate_rows, generate_updated_schema
+from api.models import DynamicModel
+from api.tests.utils import DynamicModelTransactionTestCase
+
+
+SCHEMA_WIDTHS = (1, 5, 10)
+ROW_COUNTS = (1, 10, 50)
+
+# Upper bounds of SQL queries for a single request of each endpoint, whatever the schema
+# width or the number of rows. Schema changes are included in the create and update budgets,
+# the bounds are the counts on SQLite which also logs transaction and PRAGMA statements.
+# Creating a model takes one more query to choose its shard when tables are sharded.
+# Creating a model creates the change counter of its table, writing rows takes a transaction
+# and two queries on that counter. On PostgreSQL, requests on rows take and release the
+# advisory lock of their table with two more queries.
+TABLE_LOCK_QUERIES = 2 if connection.vendor == 'postgresql' else 0
+CREATE_QUERY_BUDGET = 14
+UPDATE_QUERY_BUDGET = 25
+POPULATE_QUERY_BUDGET = 8 + TABLE_LOCK_QUERIES
+LIST_QUERY_BUDGET = 3 + TABLE_LOCK_QUERIES
+BULK_UPDATE_QUERY_BUDGET = 8 + TABLE_LOCK_QUERIES
+
+
+class QueryBudgetTests(DynamicModelTransactionTestCase):
+    """Pin the number of queries of every endpoint so that it does not grow with columns or rows."""
+
+    def create_dynamic_model(self, schema):
+        data = {'model_name': f'budget{DynamicModel.objects.count()}', 'fields': schema}
+        response = self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return DynamicModel.objects.get(name=data['model_name'])
+
+    def count_queries(self, request, *args, **kwargs):
+        # Count queries on every database tables may be placed on
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in settings.DYNAMIC_MODEL_SHARDS
+            ]
+            response = request(*args, format='json', **kwargs)
+        self.assertLess(response.status_code, 300, getattr(response, 'data', None))
+        return sum(len(context.captured_queries) for context in contexts)
+
+    def assertQueryBudget(self, queries_counts, budget):
+        """Assert that query counts are the same for all sizes and within budget."""
+
+        self.assertEqual(len(set(queries_counts.values())), 1, f'Query count grows with size: {queries_counts}')
+        self.assertLessEqual(max(queries_counts.values()), budget, queries_counts)
+
+    def test_create_query_budget(self):
+        """Ensure the number of queries to create a model does not depend on the number of fields."""
+
+        queries_counts = {}
+        for width in SCHEMA_WIDTHS:
+            data = {'model_name': f'budget{width}', 'fields': generate_schema(width)}
+            queries_counts[width] = self.count_queries(self.client.post, reverse('api:create_dynamic_model'), data)
+
+        self.assertQueryBudget(queries_counts, CREATE_QUERY_BUDGET)
+
+    def test_update_query_budget(self):
+        """Ensure the number of queries to update a model only depends on the number of changed fields."""
+
+        queries_counts = {}
+        for width in SCHEMA_WIDTHS:
+            schema = {'name': 'string', 'age': 'number', **generate_schema(width)}
+            dynamic_model = self.create_dynamic_model(schema)
+            # Convert one field and add another whatever the schema width
+            new_schema = {**schema, 'age': 'string', 'extra_field': 'string'}
+            url = reverse('api:update_dynamic_model', kwargs={'model_id': dynamic_model.id})
+            queries_counts[width] = self.count_queries(self.client.put, url, {'fields': new_schema})
+
+        self.assertQueryBudget(queries_counts, UPDATE_QUERY_BUDGET)
+
+    def test_populate_query_budget(self):
+        """Ensure the number of queries to populate a model depends neither on fields nor on rows."""
+
+        queries_counts = {}
+        for width in SCHEMA_WIDTHS:
+            schema = generate_schema(width)
+            dynamic_model = self.create_dynamic_model(schema)
+            url = reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id})
+            for row_count in ROW_COUNTS:
+                data = {'rows': generate_rows(schema, row_count)}
+                queries_counts[(width, row_count)] = self.count_queries(self.client.post, url, data)
+
+        self.assertQueryBudget(queries_counts, POPULATE_QUERY_BUDGET)
+
+    def test_list_query_budget(self):
+        """Ensure the number of queries to list a model depends neither on fields nor on rows."""
+
+        queries_counts = {}
+        for width in SCHEMA_WIDTHS:
+            schema = generate_schema(width)
+            dynamic_model = self.create_dynamic_model(schema)
+            existing_rows = 0
+            for row_count in ROW_COUNTS:
+                populate_url = reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id})
+                self.client.post(populate_url, {'rows': generate_rows(schema, row_count - existing_rows)}, format='json')
+                existing_rows = row_count
+                list_url = reverse('api:list_dynamic_model_data', kwargs={'model_id': dynamic_model.id})
+                queries_counts[(width, row_count)] = self.count_queries(self.client.get, list_url)
+
+        self.assertQueryBudget(queries_counts, LIST_QUERY_BUDGET)
+
+    def test_bulk_update_query_budget(self):
+        """Ensure the number of queries to update rows depends neither on fields nor on rows."""
+
+        queries_counts = {}
+        for width in SCHEMA_WIDTHS:
+            schema = {'age': 'number', **generate_schema(width)}
+            dynamic_model = self.create_dynamic_model(schema)
+            existing_rows = 0
+            for row_count in ROW_COUNTS:
+                populate_url = reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id})
+                self.client.post(populate_url, {'rows': generate_rows(schema, row_count - existing_rows)}, format='json')
+                existing_rows = row_count
+                url = reverse('api:bulk_update_dynamic_model_rows', kwargs={'model_id': dynamic_model.id})
+                data = {'filters': {'age__gte': 0}, 'values': {'age': row_count}}
+                queries_counts[(width, row_count)] = self.count_queries(self.client.post, url, data)
+
+        self.assertQueryBudget(queries_counts, BULK_UPDATE_QUERY_BUDGET)
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import sys
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from api.models import DynamicModel
+from api.records import as_dict, get_record_class, iter_export_lines
+from api.tests.utils import DynamicModelTransactionTestCase
+
+
+class RecordsTests(SimpleTestCase):
+    def test_record_class__tuple_with_field_attributes(self):
+        """Test that records read fields as attributes, have no attributes dictionary and are cached per fields."""
+
+        record_class = get_record_class(['name', '_age', 'count'])
+        record = record_class(('x', 15, 3))
+
+        self.assertEqual((record.name, record._age, record.count), ('x', 15, 3))
+        self.assertEqual(as_dict(record), {'name': 'x', '_age': 15, 'count': 3})
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(sys.getsizeof(record), sys.getsizeof(('x', 15, 3)))
+        self.assertIs(get_record_class(('name', '_age', 'count')), record_class)
+
+    def test_iter_export_lines__chunks(self):
+        """Test that ndjson and csv lines are yielded in chunks of rows."""
+
+        record_class = get_record_class(['name', 'tags'])
+        records = [record_class(('x', ['a'])), record_class(('x, y', None)), record_class(('xx', []))]
+
+        self.assertEqual(list(iter_export_lines(records, ['name', 'tags'], 'ndjson', 2)), [
+            '{"name": "x", "tags": ["a"]}\n{"name": "x, y", "tags": null}\n', '{"name": "xx", "tags": []}\n'
+        ])
+        self.assertEqual(list(iter_export_lines(records, ['name', 'tags'], 'csv', 2)), [
+            'name,tags\r\nx,"[""a""]"\r\n"x, y",\r\n', 'xx,[]\r\n'
+        ])
+
+
+class RecordsViewsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number', 'has_car': 'boolean'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+
+        self.rows = [
+            {'name': 'x', 'age': 15, 'has_car': False},
+            {'name': 'xx', 'age': 18, 'has_car': True},
+            {'name': 'xxx', 'age': 30, 'has_car': True},
+        ]
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'rows': self.rows}, format='json')
+
+    def test_list__rows_from_records(self):
+        """Test that listed rows are serialized from records."""
+
+        response = self.client.get(reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.rows)
+
+    @override_settings(DYNAMIC_MODEL_EXPORT_CHUNK_SIZE=2)
+    def test_export(self):
+        """Test that rows are streamed as ndjson or csv in chunks."""
+
+        url = reverse('api:export_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="user.ndjson"')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual([json.loads(line) for line in content.splitlines()], self.rows)
+
+        response = self.client.get(url, {'export_format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(content))), [
+            ['name', 'age', 'has_car'], ['x', '15', 'False'], ['xx', '18', 'True'], ['xxx', '30', 'True']
+        ])
+
+    def test_export__invalid_request__bad_request(self):
+        """Test that bad request is returned for unknown formats and models."""
+
+        url = reverse('api:export_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        self.assertEqual(self.client.get(url, {'export_format': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = reverse('api:export_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id + 1})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_aggregate(self):
+        """Test that rows are counted and aggregated, as a whole or per group."""
+
+        url = reverse('api:aggregate_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{'count_rows': 3}])
+
+        response = self.client.get(url, {'group_by': 'has_car', 'metrics': 'count,sum:age,max:name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [
+            {'has_car': False, 'count_rows': 1, 'sum_age': 15, 'max_name': 'x'},
+            {'has_car': True, 'count_rows': 2, 'sum_age': 48, 'max_name': 'xxx'},
+        ])
+
+    def test_aggregate__invalid_metrics__bad_request(self):
+        """Test that bad request is returned for unknown fields and functions not applying to a field type."""
+
+        url = reverse('api:aggregate_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        cases = (
+            ({'group_by': 'weight'}, 'weight'),
+            ({'metrics': 'median:age'}, 'Acceptable functions'),
+            ({'metrics': 'sum'}, 'Only count applies to rows'),
+            ({'metrics': 'avg:name'}, 'avg does not apply to string fields'),
+            ({'metrics': 'max:has_car'}, 'max does not apply to boolean fields'),
+        )
+        for params, message in cases:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(message, str(response.data))
@@ -0,0 +1,103 @@
+import unittest
+from contextlib import ExitStack
+from unittest import mock
+from django.conf import settings
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from api.middleware import PIN_COOKIE_NAME
+from api.models import DynamicModel, DynamicModelField
+from api.routers import DynamicModelReplicaRouter, unpin_from_primary
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+@override_settings(DYNAMIC_MODEL_READ_REPLICAS={'default': ['replica']})
+class DynamicModelReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = DynamicModelReplicaRouter()
+        dynamic_model = DynamicModel.objects.create(name='testmodel')
+        DynamicModelField.objects.create(model=dynamic_model, name='name', field_type='string')
+        self.model_class = generate_model_class(dynamic_model)
+        unpin_from_primary()
+
+    def tearDown(self):
+        unpin_from_primary()
+
+    def test_dynamic_model_reads__replica(self):
+        """Test that reads of generated model classes go to a replica."""
+
+        self.assertEqual(self.router.db_for_read(self.model_class), 'replica')
+
+    def test_metadata_reads__primary(self):
+        """Test that reads of dynamic models details stay on the primary."""
+
+        self.assertIsNone(self.router.db_for_read(DynamicModel))
+
+    def test_reads_after_write__primary(self):
+        """Test that reads are pinned to the primary after a write and until the pin expires."""
+
+        with mock.patch('api.routers.time.monotonic', return_value=1000):
+            self.assertEqual(self.router.db_for_write(self.model_class), 'default')
+            self.assertEqual(self.router.db_for_read(self.model_class), 'default')
+
+        pin_seconds = settings.DYNAMIC_MODEL_REPLICA_PIN_SECONDS
+        with mock.patch('api.routers.time.monotonic', return_value=1000 + pin_seconds - 0.1):
+            self.assertEqual(self.router.db_for_read(self.model_class), 'default')
+        # The pin lapses by itself
+        with mock.patch('api.routers.time.monotonic', return_value=1000 + pin_seconds):
+            self.assertEqual(self.router.db_for_read(self.model_class), 'replica')
+
+    def test_replicas_are_not_migrated(self):
+        """Test that migrations do not run on replicas."""
+
+        self.assertFalse(self.router.allow_migrate('replica', 'api'))
+        self.assertIsNone(self.router.allow_migrate('default', 'api'))
+
+
+class ReplicaPinningTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+        url = reverse('api:create_dynamic_model')
+        self.response = self.client.post(url, {'model_name': 'User', 'fields': {'name': 'string'}}, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+
+    @override_settings(DYNAMIC_MODEL_READ_REPLICAS={'default': ['replica']})
+    def test_read_own_writes(self):
+        """Ensure that a client reads from the primary after it wrote and from replicas otherwise."""
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.post(url, {'rows': [{'name': 'mohamed'}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+        # The 'replica' database does not exist, listing only works if reads go to the primary
+        url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        # Without the cookie reads go to the replica again
+        self.client.cookies.clear()
+        router = DynamicModelReplicaRouter()
+        self.assertEqual(router.db_for_read(generate_model_class(self.dynamic_model)), 'replica')
+
+    @unittest.skipUnless(settings.DYNAMIC_MODEL_READ_REPLICAS, 'No read replicas configured')
+    def test_list_reads_from_replica(self):
+        """Ensure that listing rows of a dynamic model reads from a replica."""
+
+        replica_connections = [connections[alias] for alias in settings.DYNAMIC_MODEL_READ_REPLICAS['default']]
+        self.client.cookies.clear()
+
+        url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id})
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(replica_connection)) for replica_connection in replica_connections
+            ]
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(len(context.captured_queries) for context in contexts), 1)
@@ -4,7 +4,9 @@ from rest_framework.serializers import ValidationError
 from api.serializers import (
     CreateDynamicModelSerializer,
     UpdateDynamicModelSerializer,
-    PopulateDynamicModelSerializer
+    PopulateDynamicModelSerializer,
+    BulkDeleteDynamicModelRowsSerializer,
+    BulkUpdateDynamicModelRowsSerializer
 )
 from api.models import DynamicModel, DynamicModelField
 
@@ -87,7 +89,7 @@ class CreateDynamicModelSerializerTests(TestCase):
         data = {
             'model_name': 'UserName',
             'fields': {
-                'name': 'decimal',
+                'name': 'money',
                 'age': 'number',
                 'has_car': 'boolean'
             }
@@ -95,9 +97,20 @@ class CreateDynamicModelSerializerTests(TestCase):
 
         serializer = CreateDynamicModelSerializer(data=data)
 
-        with self.assertRaisesMessage(ValidationError, 'Acceptable field types are string, number or boolean'):
+        with self.assertRaisesMessage(ValidationError, 'Acceptable field types are string, number, boolean, text, bigint, float, decimal, date, datetime or json'):
             serializer.is_valid(raise_exception=True)
     
+    def test_reserved_field_names__validation_error(self):
+        """Test that validation error is raised when request data contains names of columns every table has."""
+
+        for field_name in ('id', 'Change_Seq'):
+            data = {'model_name': 'UserName', 'fields': {'name': 'string', field_name: 'number'}}
+
+            serializer = CreateDynamicModelSerializer(data=data)
+
+            with self.assertRaisesMessage(ValidationError, 'Field names id, change_seq are reserved'):
+                serializer.is_valid(raise_exception=True)
+
     def test_valid_data(self):
         """Test valid data."""
     
@@ -161,7 +174,7 @@ class UpdateDynamicModelSerializerTests(TestCase):
     
         data = {
             'fields': {
-                'name': 'decimal', # incorrect field type
+                'name': 'money', # incorrect field type
                 'age': 'number',
                 'has_car': 'boolean'
             }
@@ -169,7 +182,7 @@ class UpdateDynamicModelSerializerTests(TestCase):
         dynamic_model = DynamicModel.objects.create(name='testmodel2')
         serializer = UpdateDynamicModelSerializer(data=data, context={'model_id': dynamic_model.id})
 
-        with self.assertRaisesMessage(ValidationError, 'Acceptable field types are string, number or boolean'):
+        with self.assertRaisesMessage(ValidationError, 'Acceptable field types are string, number, boolean, text, bigint, float, decimal, date, datetime or json'):
             serializer.is_valid(raise_exception=True)
     
     def test_not_allowed_field_types_conversions__validation_error(self):
@@ -189,7 +202,7 @@ class UpdateDynamicModelSerializerTests(TestCase):
         }
 
         serializer = UpdateDynamicModelSerializer(data=data, context={'model_id': dynamic_model.id})
-        validation_error_message = 'Field types can only be changed to string .. name -> number'
+        validation_error_message = 'Field type can not be changed safely .. name: string -> number'
         with self.assertRaisesMessage(ValidationError, validation_error_message):
             serializer.is_valid(raise_exception=True)
         
@@ -202,7 +215,7 @@ class UpdateDynamicModelSerializerTests(TestCase):
         }
 
         serializer = UpdateDynamicModelSerializer(data=data, context={'model_id': dynamic_model.id})
-        validation_error_message = 'Field types can only be changed to string .. age -> boolean'
+        validation_error_message = 'Field type can not be changed safely .. age: number -> boolean'
         with self.assertRaisesMessage(ValidationError, validation_error_message):
             serializer.is_valid(raise_exception=True)
         
@@ -215,7 +228,7 @@ class UpdateDynamicModelSerializerTests(TestCase):
         }
 
         serializer = UpdateDynamicModelSerializer(data=data, context={'model_id': dynamic_model.id})
-        validation_error_message = 'Field types can only be changed to string .. has_car -> number'
+        validation_error_message = 'Field type can not be changed safely .. has_car: boolean -> number'
         with self.assertRaisesMessage(ValidationError, validation_error_message):
             serializer.is_valid(raise_exception=True)
 
@@ -302,3 +315,50 @@ class PopulateDynamicModelSerializerTests(TestCase):
 
         with self.assertRaisesMessage(ValidationError, validation_error_message):
             serializer.is_valid(raise_exception=True)
+
+
+class BulkDynamicModelRowsSerializersTests(TestCase):
+    def setUp(self):
+        self.dynamic_model = DynamicModel.objects.create(name='testmodel')
+        DynamicModelField.objects.create(model=self.dynamic_model, name='name', field_type='string')
+        DynamicModelField.objects.create(model=self.dynamic_model, name='age', field_type='number')
+
+    def test_not_allowed_filter_lookup__validation_error(self):
+        """Test that validation error is raised when filters use a not allowed lookup."""
+
+        data = {'filters': {'name__contains': 'moh'}}
+
+        serializer = BulkDeleteDynamicModelRowsSerializer(data=data, context={'model_id': self.dynamic_model.id})
+
+        with self.assertRaisesMessage(ValidationError, 'Acceptable filter lookups are'):
+            serializer.is_valid(raise_exception=True)
+
+    def test_incorrect_filter_value__validation_error(self):
+        """Test that validation error is raised when filters values have the wrong type."""
+
+        for filters in ({'age': '22'}, {'age__in': [22, 'x']}):
+            serializer = BulkDeleteDynamicModelRowsSerializer(
+                data={'filters': filters}, context={'model_id': self.dynamic_model.id}
+            )
+
+            with self.assertRaisesMessage(ValidationError, 'Fields with wrong value type'):
+                serializer.is_valid(raise_exception=True)
+
+    def test_incorrect_update_values__validation_error(self):
+        """Test that validation error is raised when new values have a wrong field name or type."""
+
+        data = {'filters': {'age': 22}, 'values': {'names': 'mohamed'}}
+
+        serializer = BulkUpdateDynamicModelRowsSerializer(data=data, context={'model_id': self.dynamic_model.id})
+
+        with self.assertRaisesMessage(ValidationError, 'Fields do NOT exist'):
+            serializer.is_valid(raise_exception=True)
+
+    def test_valid_data(self):
+        """Test valid data."""
+
+        data = {'filters': {'age__gte': 22, 'name__in': ['mohamed', 'ahmed']}, 'values': {'age': 30}}
+
+        serializer = BulkUpdateDynamicModelRowsSerializer(data=data, context={'model_id': self.dynamic_model.id})
+
+        self.assertTrue(serializer.is_valid(raise_exception=True))
@@ -0,0 +1,126 @@
+import unittest
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from api.models import DynamicModel, DynamicModelField
+from api.routers import DynamicModelReplicaRouter, unpin_from_primary
+from api.sharding import choose_database
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class ShardPlacementTests(TestCase):
+    def setUp(self):
+        unpin_from_primary()
+
+    def tearDown(self):
+        unpin_from_primary()
+
+    @override_settings(DYNAMIC_MODEL_SHARDS=['default', 'shard1', 'shard2'])
+    def test_choose_database__fewest_tables(self):
+        """Test that new tables are placed on the shard holding the fewest tables."""
+
+        self.assertEqual(choose_database(), 'default')
+
+        DynamicModel.objects.create(name='model1', database='default')
+        DynamicModel.objects.create(name='model2', database='shard2')
+        self.assertEqual(choose_database(), 'shard1')
+
+        DynamicModel.objects.create(name='model3', database='shard1')
+        DynamicModel.objects.create(name='model4', database='retired')
+        self.assertEqual(choose_database(), 'default')
+
+    @override_settings(DYNAMIC_MODEL_READ_REPLICAS={'shard1': ['shard1_replica']})
+    def test_router__shard_of_table(self):
+        """Test that queries of a dynamic model table go to its shard, and reads to replicas of that shard."""
+
+        router = DynamicModelReplicaRouter()
+        dynamic_model = DynamicModel.objects.create(name='testmodel', database='shard1')
+        DynamicModelField.objects.create(model=dynamic_model, name='name', field_type='string')
+        model_class = generate_model_class(dynamic_model)
+        # Writing dynamic model details pins reads to the primary
+        unpin_from_primary()
+
+        self.assertEqual(router.db_for_read(model_class), 'shard1_replica')
+        self.assertEqual(router.db_for_write(model_class), 'shard1')
+        self.assertEqual(router.db_for_read(model_class), 'shard1')
+        self.assertIsNone(router.db_for_write(DynamicModel))
+
+        # The model class of the dynamic model follows it to another shard
+        dynamic_model.database = 'shard2'
+        self.assertEqual(router.db_for_write(generate_model_class(dynamic_model)), 'shard2')
+
+
+@unittest.skipUnless(len(settings.DYNAMIC_MODEL_SHARDS) > 1, 'Set DATABASE_SHARDS to test tables on several databases')
+class ShardingViewsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        self.shard = settings.DYNAMIC_MODEL_SHARDS[1]
+        for model_name in ('User', 'Car'):
+            data = {'model_name': model_name, 'fields': {'name': 'string', 'age': 'number'}}
+            self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+
+        self.user_model = DynamicModel.objects.get(name='user')
+        self.car_model = DynamicModel.objects.get(name='car')
+
+    def populate(self, dynamic_model, rows):
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': dynamic_model.id})
+        return self.client.post(url, {'rows': rows}, format='json')
+
+    def test_tables_placed_on_shards(self):
+        """Test that tables are created, written and read on the shard they are placed on."""
+
+        self.assertEqual(self.user_model.database, 'default')
+        self.assertEqual(self.car_model.database, self.shard)
+        self.assertIn('api_car', connections[self.shard].introspection.table_names())
+        self.assertNotIn('api_car', connections['default'].introspection.table_names())
+
+        self.assertEqual(self.populate(self.car_model, [{'name': 'x', 'age': 1}]).status_code, status.HTTP_201_CREATED)
+        url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.car_model.id})
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.car_model.id})
+        response = self.client.put(url, {'fields': {'name': 'string', 'age': 'string'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.car_model.refresh_from_db()
+        self.assertEqual(generate_model_class(self.car_model).objects.get().age, '1')
+
+    def test_move_dynamic_model(self):
+        """Test that moving a table copies its rows in batches to the target shard and drops the source table."""
+
+        self.populate(self.user_model, [{'name': f'user{index}', 'age': index} for index in range(5)])
+
+        output = StringIO()
+        call_command('move_dynamic_model', self.user_model.id, self.shard, batch_size=2, stdout=output)
+
+        self.assertIn(f'Moved "user" from default to {self.shard}, 5 rows copied', output.getvalue())
+        self.user_model.refresh_from_db()
+        self.assertEqual(self.user_model.database, self.shard)
+        self.assertNotIn('api_user', connections['default'].introspection.table_names())
+
+        # New rows continue after the copied ones
+        self.assertEqual(self.populate(self.user_model, [{'name': 'user5', 'age': 5}]).status_code, status.HTTP_201_CREATED)
+        model_class = generate_model_class(self.user_model)
+        self.assertEqual(list(model_class.objects.order_by('id').values_list('age', flat=True)), list(range(6)))
+        self.assertEqual(len(set(model_class.objects.values_list('id', flat=True))), 6)
+        # So do their change sequence numbers
+        self.assertEqual(list(model_class.objects.order_by('id').values_list('change_seq', flat=True)), list(range(1, 7)))
+
+    def test_move_dynamic_model__archive_moved(self):
+        """Test that moving a table moves its archive table with the archived rows."""
+
+        self.populate(self.user_model, [{'name': f'user{index}', 'age': index} for index in range(3)])
+        url = reverse('api:archive_dynamic_model_rows', kwargs={'model_id': self.user_model.id})
+        self.client.post(url, {'filters': {'age__lt': 2}}, format='json')
+
+        call_command('move_dynamic_model', self.user_model.id, self.shard, batch_size=1, stdout=StringIO())
+
+        self.assertNotIn('archive_user', connections['default'].introspection.table_names())
+        self.assertIn('archive_user', connections[self.shard].introspection.table_names())
+        url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.user_model.id})
+        response = self.client.get(url, {'include_archived': 'true'})
+        self.assertEqual(sorted(row['age'] for row in response.data), [0, 1, 2])
@@ -0,0 +1,82 @@
+import unittest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from api.models import DynamicModel
+from api.statements import KIND_INSERT, KIND_SELECT, _statements, number_placeholders
+from api.tests.utils import DynamicModelTransactionTestCase
+
+
+class NumberPlaceholdersTests(unittest.TestCase):
+    def test_number_placeholders(self):
+        """Test that driver placeholders are numbered and escaped percent signs unescaped."""
+
+        self.assertEqual(
+            number_placeholders('SELECT %s, %s FROM "t" WHERE "a" LIKE \'x%%\''),
+            'SELECT $1, $2 FROM "t" WHERE "a" LIKE \'x%\''
+        )
+
+
+class StatementsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+        self.populate_url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.list_url = reverse('api:list_dynamic_model_data', kwargs={'model_id': self.dynamic_model.id})
+
+    def get_statements(self):
+        return {key[1][0]: statement for key, statement in _statements['api_user'][2].items()}
+
+    def test_statements__cached_per_schema(self):
+        """Test that statements are compiled once per schema and compiled again when the schema changes."""
+
+        self.client.post(self.populate_url, {'rows': [{'name': 'x', 'age': 15}]}, format='json')
+        self.client.get(self.list_url)
+        statements = self.get_statements()
+
+        self.client.post(self.populate_url, {'rows': [{'name': 'xx', 'age': 18}, {'name': 'xxx', 'age': 19}]}, format='json')
+        self.client.get(self.list_url)
+        self.assertEqual(self.get_statements(), statements)
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number', 'has_car': 'boolean'}}
+        self.assertEqual(self.client.put(url, data, format='json').status_code, status.HTTP_200_OK)
+
+        self.client.post(self.populate_url, {'rows': [{'name': 'y', 'age': 20, 'has_car': True}]}, format='json')
+        response = self.client.get(self.list_url)
+
+        new_statements = self.get_statements()
+        self.assertEqual(set(new_statements), {KIND_INSERT, KIND_SELECT})
+        self.assertNotEqual(new_statements[KIND_INSERT].name, statements[KIND_INSERT].name)
+        self.assertIn('"has_car"', new_statements[KIND_INSERT].sql)
+        self.assertEqual(
+            [(row['name'], row['age'], row['has_car']) for row in response.data],
+            [('x', 15, None), ('xx', 18, None), ('xxx', 19, None), ('y', 20, True)]
+        )
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Prepared statements are only used on PostgreSQL')
+    def test_prepared_statements__replaced_when_schema_changes(self):
+        """Test that statements are prepared once per connection and replaced by those of a new schema."""
+
+        def prepared_statements():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT name FROM pg_prepared_statements')
+                return {name for name, in cursor.fetchall()}
+
+        self.client.post(self.populate_url, {'rows': [{'name': 'x', 'age': 15}]}, format='json')
+        self.client.get(self.list_url)
+        names = {statement.name for statement in self.get_statements().values()}
+        self.assertLessEqual(names, prepared_statements())
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'bigint'}}
+        self.client.put(url, data, format='json')
+        self.client.post(self.populate_url, {'rows': [{'name': 'xx', 'age': 2 ** 40}]}, format='json')
+        response = self.client.get(self.list_url)
+
+        self.assertEqual([row['age'] for row in response.data], [15, 2 ** 40])
+        new_names = {statement.name for statement in self.get_statements().values()}
+        self.assertLessEqual(new_names, prepared_statements())
+        self.assertFalse(names & prepared_statements())
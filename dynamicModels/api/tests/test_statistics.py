@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from api.models import DynamicModel
+from api.statistics import get_rates
+from api.tests.utils import DynamicModelTransactionTestCase
+
+
+class RatesTests(SimpleTestCase):
+    def test_get_rates__since_previous_request(self):
+        """Test that rates are counted per second since the previous sample of the same table."""
+
+        counters = {'inserted_rows': 100, 'read_rows': 50}
+        with mock.patch('api.statistics.time.monotonic', side_effect=[10, 12, 13]):
+            self.assertEqual(get_rates(('rates', 't'), counters), {
+                'inserted_rows_per_second': None, 'read_rows_per_second': None
+            })
+            self.assertEqual(get_rates(('rates', 't'), {'inserted_rows': 300, 'read_rows': 60}), {
+                'inserted_rows_per_second': 100, 'read_rows_per_second': 5
+            })
+            # Counters reset by the database do not give negative rates
+            self.assertEqual(get_rates(('rates', 't'), {'inserted_rows': 0, 'read_rows': 60}), {
+                'inserted_rows_per_second': 0, 'read_rows_per_second': 0
+            })
+
+
+class TableStatsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+
+        url = reverse('api:populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.client.post(url, {'rows': [{'name': 'x', 'age': 15}, {'name': 'xx', 'age': 18}]}, format='json')
+
+    def test_table_stats(self):
+        """Test that row count and sizes of the table are returned."""
+
+        url = reverse('api:dynamic_model_table_stats', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['table'], 'api_user')
+        self.assertEqual(response.data['database'], self.dynamic_model.database)
+        self.assertGreater(response.data['total_bytes'], 0)
+        self.assertEqual(response.data['total_bytes'], response.data['table_bytes'] + response.data['indexes_bytes'])
+        self.assertIsNone(response.data['inserted_rows_per_second'])
+        if connection.vendor != 'postgresql':
+            self.assertEqual(response.data['rows'], 2)
+            self.assertIsNone(response.data['inserted_rows'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Access counters are only kept by PostgreSQL')
+    def test_table_stats__access_counters(self):
+        """Test that insert and read counters and their rates are read from pg_stat_user_tables."""
+
+        url = reverse('api:dynamic_model_table_stats', kwargs={'model_id': self.dynamic_model.id})
+        self.client.get(url)
+        response = self.client.get(url)
+
+        for counter in ('inserted_rows', 'read_rows', 'sequential_scans', 'index_scans'):
+            self.assertGreaterEqual(response.data[counter], 0)
+        self.assertGreaterEqual(response.data['inserted_rows_per_second'], 0)
+
+    def test_table_stats__unknown_model__not_found(self):
+        """Test that not found is returned for unknown models."""
+
+        url = reverse('api:dynamic_model_table_stats', kwargs={'model_id': self.dynamic_model.id + 1})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(DYNAMIC_MODEL_SLOW_QUERY_SECONDS=0)
+    def test_slow_queries__logged_with_plan(self):
+        """Test that slow queries on dynamic model tables are logged with parameters and plan, others are not."""
+
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        with self.assertLogs('api.statistics', 'WARNING') as logs:
+            response = self.client.post(url, {'filters': {'age__gt': 16}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(logs.records)
+        for record in logs.records:
+            self.assertEqual(record.tables, ['api_user'])
+        select_message = next(message for message in logs.output if '"age" > %s' in message and 'SELECT' in message)
+        self.assertIn('params=(16,)', select_message)
+        # The plan follows the query
+        self.assertIn('\n', select_message)
@@ -0,0 +1,139 @@
+import io
+import json
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from api.models import DynamicModel
+from api.streaming import iter_ndjson_rows, iter_json_array_rows, iter_chunks
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+class StreamingParsersTests(SimpleTestCase):
+    def test_iter_json_array_rows__rows_split_across_reads(self):
+        """Test that rows of a JSON array are parsed when reads cut them at any position."""
+
+        rows = [{'name': f'user {index}', 'age': index, 'has_car': index % 2 == 0} for index in range(20)]
+        body = json.dumps(rows, indent=1).replace('"user 3"', '"us\\u00e9r 3 é"').encode()
+        rows[3]['name'] = 'usér 3 é'
+
+        for read_size in (1, 7, 1024):
+            self.assertEqual(list(iter_json_array_rows(io.BytesIO(body), read_size=read_size)), rows)
+
+        self.assertEqual(list(iter_json_array_rows(io.BytesIO(b' [ ] '))), [])
+
+    def test_iter_json_array_rows__malformed_body__parse_error(self):
+        """Test that parse error is raised for bodies that are not a complete JSON array of objects."""
+
+        for body in (
+            b'{"name": "a"}', b'[{"name": "a"}', b'[{"name": "a"}, 1]', b'[{"name": "a"}] []', b'[{"name": }]',
+            b'[{"name": "a"},,{"name": "b"}]', b'[,{"name": "a"}]', b'[{"name": "a"},]', b'[{"name": "a"} {"name": "b"}]',
+        ):
+            with self.assertRaises(ParseError, msg=body):
+                list(iter_json_array_rows(io.BytesIO(body), read_size=4))
+
+    def test_iter_json_array_rows__malformed_row__parse_error_before_reading_on(self):
+        """Test that a malformed row is reported once read whole, and too long rows once the buffer exceeds the limit."""
+
+        rows = ',\n'.join(['{"name": "a {\\"}"}', '{"name": tru }'] + ['{"name": "b"}'] * 1000)
+        stream = io.BytesIO(f'[{rows}]'.encode())
+        with self.assertRaisesMessage(ParseError, 'Expecting'):
+            list(iter_json_array_rows(stream, read_size=8))
+        self.assertLess(stream.tell(), 64)
+
+        stream = io.BytesIO(b'[{"name": "' + b'a' * 1000 + b'"}]')
+        with self.assertRaisesMessage(ParseError, 'at most 100 characters'):
+            list(iter_json_array_rows(stream, read_size=8, max_row_size=100))
+        self.assertLess(stream.tell(), 200)
+
+    def test_iter_ndjson_rows(self):
+        """Test that NDJSON rows are parsed line by line, skipping blank lines."""
+
+        body = b'{"name": "a"}\n\n{"name": "b"}\r\n{"name": "c"}'
+        self.assertEqual(list(iter_ndjson_rows(io.BytesIO(body))), [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+
+        with self.assertRaisesMessage(ParseError, 'line 2'):
+            list(iter_ndjson_rows(io.BytesIO(b'{"name": "a"}\n{"name"\n')))
+
+        # Lines of exactly the limit are read, longer ones are rejected without reading the rest of the body
+        self.assertEqual(list(iter_ndjson_rows(io.BytesIO(b'{"name": "a"}\n'), max_row_size=13)), [{'name': 'a'}])
+        stream = io.BytesIO(b'{"name": "a"}\n{"name": "' + b'b' * 1000 + b'"}\n')
+        with self.assertRaisesMessage(ParseError, 'line 2 - rows should be at most 100 bytes'):
+            list(iter_ndjson_rows(stream, max_row_size=100))
+        self.assertLess(stream.tell(), 200)
+
+    def test_iter_chunks(self):
+        """Test that rows are grouped in chunks of the given size."""
+
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+
+class StreamPopulateViewsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': {'name': 'string', 'age': 'number', 'has_car': 'boolean'}}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+        self.model_class = generate_model_class(self.dynamic_model)
+        self.url = reverse('api:stream_populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        self.rows = [{'name': f'user{index}', 'age': index, 'has_car': False} for index in range(5)]
+
+    @override_settings(DYNAMIC_MODEL_INGEST_CHUNK_SIZE=2)
+    def test_stream_populate_ndjson__rows_inserted_in_chunks(self):
+        """Test that NDJSON rows are inserted with one insert per chunk."""
+
+        body = '\n'.join(json.dumps(row) for row in self.rows)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['message'], '5 rows created successfully')
+        self.assertEqual(
+            list(self.model_class.objects.order_by('age').values('name', 'age', 'has_car')), self.rows
+        )
+        # Rows are inserted by executemany on SQLite and by an executed prepared statement for single rows on PostgreSQL
+        inserts = [
+            query for query in context.captured_queries
+            if 'INSERT INTO "api_user"' in query['sql'] or query['sql'].startswith('EXECUTE')
+        ]
+        self.assertEqual(len(inserts), 3)
+
+    def test_stream_populate_json_array(self):
+        """Test that rows of a JSON array body are inserted."""
+
+        response = self.client.post(self.url, json.dumps(self.rows), content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.model_class.objects.count(), 5)
+
+    @override_settings(DYNAMIC_MODEL_INGEST_CHUNK_SIZE=2)
+    def test_stream_populate_invalid_row__rolled_back(self):
+        """Test that an invalid row in a later chunk rolls back rows of the previous chunks."""
+
+        self.rows[3]['age'] = 'three'
+
+        response = self.client.post(self.url, json.dumps(self.rows), content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['Error'], 'Invalid rows 3 to 4')
+        self.assertEqual(response.data['Fields with wrong value type'], [{'field_name': 'age', 'correct_type': 'number'}])
+        self.assertEqual(self.model_class.objects.count(), 0)
+
+    def test_stream_populate_errors(self):
+        """Test responses to empty bodies, unsupported content types and unknown models."""
+
+        response = self.client.post(self.url, '[]', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, 'name,age', content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        url = reverse('api:stream_populate_dynamic_model', kwargs={'model_id': self.dynamic_model.id + 1})
+        response = self.client.post(url, json.dumps(self.rows), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,119 @@
+import io
+import json
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.serializers import ValidationError
+from api.models import DynamicModel
+from api.uploads import iter_csv_rows, iter_columnar_rows
+from api.tests.utils import DynamicModelTransactionTestCase
+from api.utils import generate_model_class
+
+
+FIELD_TYPES = {'name': 'string', 'age': 'number', 'has_car': 'boolean'}
+
+
+class UploadReadersTests(SimpleTestCase):
+    def test_iter_csv_rows__columns_converted(self):
+        """Test that CSV columns are mapped to fields and converted to their types in chunks."""
+
+        body = '\ufeffName,age,has_car\r\nx,15,true\r\n"x y",18,0\r\nxx,20,False\r\n'.encode()
+
+        chunks = list(iter_csv_rows(io.BytesIO(body), FIELD_TYPES, chunk_size=2))
+
+        self.assertEqual(chunks, [
+            [{'name': 'x', 'age': 15, 'has_car': True}, {'name': 'x y', 'age': 18, 'has_car': False}],
+            [{'name': 'xx', 'age': 20, 'has_car': False}]
+        ])
+
+    def test_iter_csv_rows__invalid_file__validation_error(self):
+        """Test that validation error is raised for unknown columns, wrong values and missing cells."""
+
+        cases = (
+            (b'name,weight\nx,15\n', 'weight'),
+            (b'name,age\nx,15\nxx,old\n', 'Invalid values in rows 1 to 2'),
+            (b'name,has_car\nx,yes\n', 'boolean'),
+            (b'name,age\nx\n', 'should have 2 columns'),
+            (b'name,age\nx,15\n"x, y",18\n', 'special characters'),
+        )
+        for body, message in cases:
+            with self.assertRaisesMessage(ValidationError, message):
+                list(iter_csv_rows(io.BytesIO(body), FIELD_TYPES, chunk_size=10))
+
+    def test_iter_columnar_rows(self):
+        """Test that typed column blocks are turned into rows and checked per column."""
+
+        body = (
+            b'{"columns": {"name": "string", "age": "number"}}\n'
+            b'{"name": ["x", "xx"], "age": [15, 18]}\n\n'
+            b'{"name": ["xxx"], "age": [20]}\n'
+        )
+
+        self.assertEqual(list(iter_columnar_rows(io.BytesIO(body), FIELD_TYPES)), [
+            [{'name': 'x', 'age': 15}, {'name': 'xx', 'age': 18}], [{'name': 'xxx', 'age': 20}]
+        ])
+
+        cases = (
+            (b'{"columns": {"name": "number"}}\n', 'Fields with wrong value type'),
+            (b'{"name": ["x"]}\n', 'header'),
+            (b'{"columns": {"name": "string", "age": "number"}}\n{"name": ["x"], "age": []}\n', 'same length'),
+            (b'{"columns": {"age": "number"}}\n{"age": [1, true]}\n', 'number'),
+            (b'{"columns": {"name": "string"}}\n{"name": ["x", "x;y"]}\n', 'special characters'),
+            (b'{"columns": {"name": "string"}}\n{"name": ["' + b'x' * 100 + b'"]}\n', 'at most 64 bytes'),
+        )
+        for body, message in cases:
+            with self.assertRaisesMessage(ValidationError, message):
+                list(iter_columnar_rows(io.BytesIO(body), FIELD_TYPES, max_block_size=64))
+
+
+class UploadViewsTests(DynamicModelTransactionTestCase):
+    def setUp(self):
+
+        data = {'model_name': 'User', 'fields': FIELD_TYPES}
+        self.client.post(reverse('api:create_dynamic_model'), data, format='json')
+
+        self.dynamic_model = DynamicModel.objects.get(name='user')
+        self.model_class = generate_model_class(self.dynamic_model)
+        self.url = reverse('api:upload_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+
+    @override_settings(DYNAMIC_MODEL_INGEST_CHUNK_SIZE=2)
+    def test_upload_csv(self):
+        """Test that rows of an uploaded CSV file are inserted."""
+
+        csv_file = SimpleUploadedFile('users.csv', b'name,age,has_car\nx,15,true\nxx,18,false\nxxx,20,true\n')
+
+        response = self.client.post(self.url, {'file': csv_file})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['message'], '3 rows created successfully')
+        self.assertEqual(
+            list(self.model_class.objects.order_by('age').values_list('name', 'age', 'has_car')),
+            [('x', 15, True), ('xx', 18, False), ('xxx', 20, True)]
+        )
+
+    def test_upload_columns(self):
+        """Test that rows of an uploaded columnar file are inserted."""
+
+        lines = [
+            {'columns': FIELD_TYPES},
+            {'name': ['x', 'xx'], 'age': [15, 18], 'has_car': [True, False]},
+        ]
+        columns_file = SimpleUploadedFile('users.jsonl', '\n'.join(map(json.dumps, lines)).encode())
+
+        response = self.client.post(self.url, {'file': columns_file, 'format': 'columns'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.model_class.objects.count(), 2)
+
+    @override_settings(DYNAMIC_MODEL_INGEST_CHUNK_SIZE=1)
+    def test_upload_invalid_row__rolled_back(self):
+        """Test that an invalid row rolls back the rows inserted before it."""
+
+        csv_file = SimpleUploadedFile('users.csv', b'name,age,has_car\nx,15,true\nxx,old,false\n')
+
+        response = self.client.post(self.url, {'file': csv_file})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['Error'], 'Invalid values in rows 2 to 2')
+        self.assertEqual(self.model_class.objects.count(), 0)
@@ -1,13 +1,14 @@
 from django.test import TestCase
 from rest_framework import status
-from rest_framework.test import APITestCase
+from django.test import override_settings
 from django.urls import reverse
 from django.db import connection
 from api.models import DynamicModel
 from api.utils import generate_model_class
+from api.tests.utils import DynamicModelTransactionTestCase
 
 
-class ViewsTests(APITestCase):
+class ViewsTests(DynamicModelTransactionTestCase):
     def setUp(self):
 
         # Create a dynamic model
@@ -152,3 +153,50 @@ class ViewsTests(APITestCase):
 
 
         
+
+    def test_update_dynamic_model_keeps_other_models_fields(self):
+        """Ensure that updating a dynamic model does not remove fields of other dynamic models."""
+
+        url = reverse('api:create_dynamic_model')
+        self.client.post(url, {'model_name': 'Car', 'fields': {'brand': 'string'}}, format='json')
+        car_model = DynamicModel.objects.get(name='car')
+
+        url = reverse('api:update_dynamic_model', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.put(url, {'fields': {'name': 'string'}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(self.dynamic_model.fields.values_list('name', flat=True)), ['name'])
+        self.assertEqual(list(car_model.fields.values_list('name', flat=True)), ['brand'])
+
+    @override_settings(DYNAMIC_MODEL_DELETE_CHUNK_SIZE=2)
+    def test_bulk_delete_dynamic_model_rows(self):
+        """Ensure rows matching filters are deleted, in chunks."""
+
+        self.test_populate_dynamic_model()
+        self.model_class.objects.create(name='Omar', age=52, has_car=True)
+
+        url = reverse('api:bulk_delete_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        response = self.client.post(url, {'filters': {'has_car': True, 'age__gte': 30}}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], '2 rows deleted successfully')
+        self.assertEqual(list(self.model_class.objects.order_by('id').values_list('name', flat=True)), ['mohamed', 'Ahmed'])
+
+        response = self.client.post(url, {'filters': {'name__in': ['mohamed', 'Ahmed', 'Asmaa']}}, format='json')
+
+        self.assertEqual(response.data['message'], '2 rows deleted successfully')
+        self.assertEqual(self.model_class.objects.count(), 0)
+
+    def test_bulk_update_dynamic_model_rows(self):
+        """Ensure rows matching filters are updated."""
+
+        self.test_populate_dynamic_model()
+
+        url = reverse('api:bulk_update_dynamic_model_rows', kwargs={'model_id': self.dynamic_model.id})
+        data = {'filters': {'age__lt': 40}, 'values': {'has_car': True, 'age': 40}}
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], '2 rows updated successfully')
+        self.assertEqual(self.model_class.objects.filter(has_car=True, age=40).count(), 2)
+        self.assertEqual(self.model_class.objects.filter(age=41).count(), 1)
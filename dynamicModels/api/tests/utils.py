@@ -0,0 +1,29 @@
+from django.db import connections
+from rest_framework.test import APITransactionTestCase
+from api.archiving import generate_archive_model_class
+from api.models import DynamicModel
+from api.utils import generate_model_class
+
+
+class DynamicModelTransactionTestCase(APITransactionTestCase):
+    """
+    Test case for tests that write dynamic models in database.
+
+    Schema changes can't run inside the transaction of a TestCase on SQLite, and
+    flushing the database between tests does not drop dynamic model tables.
+    Reads of dynamic model tables may be routed to any configured database.
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        for dynamic_model in DynamicModel.objects.all():
+            model_class = generate_model_class(dynamic_model)
+            database = connections[dynamic_model.database]
+            if model_class and model_class._meta.db_table in database.introspection.table_names():
+                with database.schema_editor() as editor:
+                    editor.delete_model(model_class)
+            if model_class and dynamic_model.has_archive:
+                with database.schema_editor() as editor:
+                    editor.delete_model(generate_archive_model_class(dynamic_model, model_class))
+        super().tearDown()
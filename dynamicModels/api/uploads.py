@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from rest_framework import serializers
+
+from api.field_types import convert_column, convert_text_column
+from api.validators import detect_column_special_characters
+
+
+FORMAT_CSV = 'csv'
+FORMAT_COLUMNS = 'columns'
+UPLOAD_FORMATS = (FORMAT_CSV, FORMAT_COLUMNS)
+
+# Lines of columnar files hold a block of rows each
+MAX_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def validate_column_names(column_names, field_types):
+    """Validate that columns of an upload are distinct fields of the dynamic model."""
+
+    fields_do_not_exist = [column_name for column_name in column_names if column_name not in field_types]
+    if fields_do_not_exist:
+        raise serializers.ValidationError({'Fields do NOT exist': fields_do_not_exist})
+    if len(set(column_names)) != len(column_names):
+        raise serializers.ValidationError({'Error': 'Columns should not be repeated'})
+
+
+def column_error(column_name, field_type, first_row, rows_count):
+    return serializers.ValidationError({
+        'Error': f'Invalid values in rows {first_row} to {first_row + rows_count - 1}',
+        'Fields with wrong value type': [{'field_name': column_name, 'correct_type': field_type}]
+    })
+
+
+def iter_csv_rows(uploaded_file, field_types, chunk_size):
+    """Yield chunks of rows of a CSV file whose header names fields of the dynamic model."""
+
+    # Read the temporary file through a text wrapper instead of loading it in memory
+    text_file = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text_file)
+        column_names = [column_name.strip().lower() for column_name in next(reader, [])]
+        validate_column_names(column_names, field_types)
+
+        first_row = 1
+        while True:
+            records = list(islice(reader, chunk_size))
+            if not records:
+                return
+            if any(len(record) != len(column_names) for record in records):
+                raise serializers.ValidationError(
+                    {'Error': f'Rows {first_row} to {first_row + len(records) - 1} should have {len(column_names)} columns'}
+                )
+
+            # Convert each column at once instead of checking the type of every cell
+            columns = []
+            for column_name, column in zip(column_names, zip(*records)):
+                try:
+                    columns.append(convert_text_column(field_types[column_name], column))
+                except ValueError:
+                    raise column_error(column_name, field_types[column_name], first_row, len(records))
+                detect_column_special_characters(field_types[column_name], columns[-1])
+
+            yield [dict(zip(column_names, values)) for values in zip(*columns)]
+            first_row += len(records)
+    finally:
+        text_file.detach()
+
+
+def iter_block_lines(uploaded_file, max_block_size):
+    """Yield non blank lines of a file, lines longer than `max_block_size` bytes are rejected."""
+
+    # Lines are read at most one byte past the limit, so a file without newlines is not read at once
+    for line in iter(lambda: uploaded_file.readline(max_block_size + 1), b''):
+        if len(line) > max_block_size and not line.endswith(b'\n'):
+            raise serializers.ValidationError({'Error': f'Lines should be at most {max_block_size} bytes'})
+        if line.strip():
+            yield line
+
+
+def iter_columnar_rows(uploaded_file, field_types, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Yield chunks of rows of a columnar file.
+
+    The first line is a header mapping column names to field types, each
+    following line is a block mapping column names to lists of values, e.g.
+
+        {"columns": {"name": "string", "age": "number"}}
+        {"name": ["x", "xx"], "age": [15, 18]}
+    """
+
+    lines = iter_block_lines(uploaded_file, max_block_size)
+    try:
+        header = json.loads(next(lines, b'{}'))
+        column_types = header['columns']
+        column_names = list(column_types)
+    except (ValueError, KeyError, TypeError):
+        raise serializers.ValidationError({'Error': 'First line should be a header of columns and their types'})
+
+    validate_column_names(column_names, field_types)
+    wrong_types = [
+        {'field_name': column_name, 'correct_type': field_types[column_name]}
+        for column_name, column_type in column_types.items() if column_type != field_types[column_name]
+    ]
+    if wrong_types:
+        raise serializers.ValidationError({'Fields with wrong value type': wrong_types})
+
+    first_row = 1
+    for line_number, line in enumerate(lines, start=2):
+        try:
+            block = json.loads(line)
+            columns = [block[column_name] for column_name in column_names]
+        except (ValueError, KeyError, TypeError):
+            raise serializers.ValidationError({'Error': f'Line {line_number} should be a block of all columns'})
+        rows_count = len(columns[0]) if columns else 0
+        if not all(isinstance(column, list) and len(column) == rows_count for column in columns):
+            raise serializers.ValidationError({'Error': f'Columns of line {line_number} should be lists of the same length'})
+
+        # Values are typed already, check and convert each column at once
+        for index, column_name in enumerate(column_names):
+            try:
+                columns[index] = convert_column(field_types[column_name], columns[index])
+            except ValueError:
+                raise column_error(column_name, field_types[column_name], first_row, rows_count)
+            detect_column_special_characters(field_types[column_name], columns[index])
+
+        if rows_count:
+            yield [dict(zip(column_names, values)) for values in zip(*columns)]
+            first_row += rows_count
@@ -1,11 +1,21 @@
-from django.contrib import admin
 from django.urls import path
-from django.conf.urls import include
 from api import views
 
 urlpatterns = [
     path('table/', views.CreateDynamicModelView.as_view(), name='create_dynamic_model'),
     path('table/<int:model_id>/', views.UpdateDynamicModelView.as_view(), name='update_dynamic_model'),
     path('table/<int:model_id>/row/', views.PopulateDynamicModelView.as_view(), name='populate_dynamic_model'),
-    path('table/<int:model_id>/rows/', views.ListDynamicModelRowsView.as_view(), name='list_dynamic_model_data')
+    path('table/<int:model_id>/row/stream/', views.StreamPopulateDynamicModelView.as_view(), name='stream_populate_dynamic_model'),
+    path('table/<int:model_id>/row/upload/', views.UploadDynamicModelRowsView.as_view(), name='upload_dynamic_model_rows'),
+    path('table/<int:model_id>/rows/', views.ListDynamicModelRowsView.as_view(), name='list_dynamic_model_data'),
+    path('table/<int:model_id>/rows/export/', views.ExportDynamicModelRowsView.as_view(), name='export_dynamic_model_rows'),
+    path('table/<int:model_id>/rows/aggregate/', views.AggregateDynamicModelRowsView.as_view(), name='aggregate_dynamic_model_rows'),
+    path('table/<int:model_id>/rows/changes/', views.DynamicModelRowsChangesView.as_view(), name='dynamic_model_rows_changes'),
+    path('table/<int:model_id>/rows/delete/', views.BulkDeleteDynamicModelRowsView.as_view(), name='bulk_delete_dynamic_model_rows'),
+    path('table/<int:model_id>/rows/update/', views.BulkUpdateDynamicModelRowsView.as_view(), name='bulk_update_dynamic_model_rows'),
+    path('table/<int:model_id>/rows/archive/', views.ArchiveDynamicModelRowsView.as_view(), name='archive_dynamic_model_rows'),
+    path('table/<int:model_id>/stats/', views.DynamicModelTableStatsView.as_view(), name='dynamic_model_table_stats'),
+    path('ingest/', views.CreateIngestionJobView.as_view(), name='create_ingestion_job'),
+    path('ingest/<int:job_id>/', views.IngestionJobView.as_view(), name='ingestion_job'),
+    path('pool/stats/', views.DatabasePoolStatsView.as_view(), name='database_pool_stats')
 ]
\ No newline at end of file
@@ -1,95 +1,185 @@
+import threading
+from django.apps.registry import Apps
+from django.db import models, connections, transaction
+from api.models import DynamicModel, DynamicModelField, DynamicTable
+from api.field_types import build_model_field
+from api.changes import allocate_change_seqs
+from api.statements import insert_table_rows
 
 
-from django.db import models, connection
-from django.core.exceptions import FieldDoesNotExist
-from api.models import DynamicModel, DynamicModelField
+# Generated model classes keyed by dynamic model ID, along with the schema they were built from
+_model_classes = {}
+_model_classes_lock = threading.RLock()
 
 
 def generate_model_class(dynamic_model):
     """Generate model class from data in database."""
 
-    if not dynamic_model.fields.exists():
+    # Evaluate fields once, this also makes use of fields prefetched by the caller
+    model_fields = list(dynamic_model.fields.all())
+    if not model_fields:
         return None
 
-    field_types = {
-        'string': models.CharField,
-        'number': models.IntegerField,
-        'boolean': models.BooleanField
-    }
+    # Reuse the class built for the same schema instead of building and registering it again
+    schema = (
+        dynamic_model.name,
+        dynamic_model.database,
+        tuple(sorted((field.name, field.field_type) for field in model_fields))
+    )
+    with _model_classes_lock:
+        cached_schema, model_class = _model_classes.get(dynamic_model.id, (None, None))
+        if cached_schema != schema:
+            model_class = build_model_class(dynamic_model, model_fields)
+            _model_classes[dynamic_model.id] = (schema, model_class)
+
+    return model_class
+
+
+def build_model_class(dynamic_model, model_fields):
+    """Build model class from dynamic model details."""
 
     fields_data = {
         '__module__': 'api.models',
+        '_database': dynamic_model.database,
     }
 
-    for field in dynamic_model.fields.all():
-        field_type_constructor = field_types[field.field_type]
-        if field.field_type == 'string':
-            fields_data.update({
-                field.name: field_type_constructor(max_length=255)
-            })
-        else:
-            fields_data.update({
-                field.name: field_type_constructor()
-            })    
+    for field in model_fields:
+        fields_data[field.name] = build_model_field(field.field_type)
 
     model_class = type(
         dynamic_model.name,
-        (models.Model,),
+        (DynamicTable,),
         fields_data
     )
 
     return model_class
 
 
+def insert_rows(dynamic_model, model_class, rows, track_changes=True):
+    """
+    Insert rows in a dynamic model table, creating range partitions they need first.
+
+    Inserted rows are numbered in the change feed of the table, unless
+    `track_changes` is false and rows carry their change sequence numbers.
+    """
+
+    if dynamic_model.partition_field:
+        from api.partitioning import create_missing_partitions
+        create_missing_partitions(connections[model_class._database], dynamic_model, model_class, rows)
+
+    with transaction.atomic(using=model_class._database):
+        if track_changes:
+            first_change_seq = allocate_change_seqs(dynamic_model, len(rows))
+            rows = [{**row, 'change_seq': first_change_seq + index} for index, row in enumerate(rows)]
+        # Insert all rows in one query with the statement cached for the schema of the table
+        insert_table_rows(model_class, rows)
+
+
 def update_dynamic_model_with_new_fields(new_fields_data, dynamic_model):
     """Update dynamic models with new fields in database."""
 
-    for field_name, field_type in new_fields_data.items():
-        DynamicModelField.objects.update_or_create(
-            name=field_name, model=dynamic_model, defaults={'field_type': field_type}
-        )
+    old_fields_data = {field.name: field.field_type for field in dynamic_model.fields.all()}
+
+    # Create new fields in one query
+    DynamicModelField.objects.bulk_create([
+        DynamicModelField(name=field_name, field_type=field_type, model=dynamic_model)
+        for field_name, field_type in new_fields_data.items() if field_name not in old_fields_data
+    ])
 
-    fields_names_to_delete = list(DynamicModelField.objects.exclude(
-        name__in=new_fields_data.keys()
-    ).values_list('name', flat=True))
+    # Update changed field types with one query per target field type
+    changed_fields = {}
+    for field_name, field_type in new_fields_data.items():
+        if field_name in old_fields_data and old_fields_data[field_name] != field_type:
+            changed_fields.setdefault(field_type, []).append(field_name)
+    for field_type, field_names in changed_fields.items():
+        dynamic_model.fields.filter(name__in=field_names).update(field_type=field_type)
 
-    DynamicModelField.objects.exclude(name__in=new_fields_data.keys()).delete()
+    fields_names_to_delete = [field_name for field_name in old_fields_data if field_name not in new_fields_data]
+    if fields_names_to_delete:
+        dynamic_model.fields.filter(name__in=fields_names_to_delete).delete()
 
     return fields_names_to_delete
 
 
+def generate_transitional_model_class(model_class, fields):
+    """Generate a throwaway model class with the given fields that points at the table of model_class."""
+
+    meta = type('Meta', (), {
+        'apps': Apps(),
+        'app_label': model_class._meta.app_label,
+        'db_table': model_class._meta.db_table
+    })
+    fields_data = {'__module__': 'api.models', 'Meta': meta}
+    fields_data.update({field.name: field.clone() for field in fields})
+
+    return type(model_class.__name__, (models.Model,), fields_data)
+
+
+def convert_stored_values(editor, db_table, old_field, new_field):
+    """Convert values of a column whose type changed, where the database copies them unchanged."""
+
+    # PostgreSQL casts dates to timestamps, SQLite keeps the date text, which datetime columns don't parse
+    types = (old_field.get_internal_type(), new_field.get_internal_type())
+    if editor.connection.vendor == 'sqlite' and types == ('DateField', 'DateTimeField'):
+        table, column = editor.quote_name(db_table), editor.quote_name(new_field.column)
+        editor.execute(f"UPDATE {table} SET {column} = {column} || ' 00:00:00' WHERE {column} IS NOT NULL")
+
+
 def write_fields_changes_in_database(old_model_class, new_model_class, fields_names_to_delete):
-    """Write fields changes in database."""
+    """Write fields changes in the database holding the table."""
+
+    # SQLite rebuilds the whole table from the model it is given, so every change is applied
+    # against a model class that matches the table state left by the previous change.
+    current_fields = {field.name: field for field in old_model_class._meta.local_concrete_fields}
 
     fields_updated = False
-    for new_field in new_model_class._meta.fields:
-        try:
-            old_field = old_model_class._meta.get_field(new_field.name)
-            # This means that field name is the same but field type has changed
-            if old_field and (new_field.get_internal_type() != old_field.get_internal_type()):
-                if not fields_updated:
-                    fields_updated = True
-                with connection.schema_editor() as editor:
-                    editor.alter_field(new_model_class, old_field, new_field)
-        # This means that a new field needs to be added
-        except FieldDoesNotExist:
-            if not fields_updated:
-                fields_updated = True
-            with connection.schema_editor() as editor:
+    # Use a single schema editor so that all changes are applied in one transaction
+    with connections[old_model_class._database].schema_editor() as editor:
+        for field_name in fields_names_to_delete:
+            current_model_class = generate_transitional_model_class(old_model_class, current_fields.values())
+            editor.remove_field(current_model_class, current_model_class._meta.get_field(field_name))
+            del current_fields[field_name]
+            fields_updated = True
+
+        for new_field in new_model_class._meta.local_concrete_fields:
+            old_field = current_fields.get(new_field.name)
+            current_model_class = generate_transitional_model_class(old_model_class, current_fields.values())
+            # This means that a new field needs to be added
+            if old_field is None:
                 # make the new field nullable to avoid errors when model already has records
                 new_field.null = True
-                editor.add_field(new_model_class, new_field)
+                editor.add_field(current_model_class, new_field)
+            # This means that field name is the same but field type has changed
+            elif new_field.get_internal_type() != old_field.get_internal_type():
+                editor.alter_field(current_model_class, current_model_class._meta.get_field(old_field.name), new_field)
+                convert_stored_values(editor, old_model_class._meta.db_table, old_field, new_field)
+            else:
+                continue
+            current_fields[new_field.name] = new_field
+            fields_updated = True
 
-    if fields_names_to_delete:    
-        for field_name in fields_names_to_delete:
-            old_field = old_model_class._meta.get_field(field_name)
-            with connection.schema_editor() as editor:
-                editor.remove_field(new_model_class, old_field)
-        fields_updated = True            
-    
     return fields_updated
 
 
+def delete_rows_in_chunks(queryset, chunk_size, delete_chunk=None):
+    """
+    Delete rows of a queryset in chunks of primary keys, to avoid long locks and large WAL bursts.
+
+    Chunks are deleted by `delete_chunk`, which returns the number of rows it deleted.
+    """
 
+    if delete_chunk is None:
+        delete_chunk = lambda chunk: chunk.delete()[0]
 
+    deleted_count = 0
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        # Primary key of the last row of the next chunk, if there are more rows than a chunk
+        boundary_pk = chunk.order_by('pk').values_list('pk', flat=True)[chunk_size - 1:chunk_size].first()
+        if boundary_pk is None:
+            deleted_count += delete_chunk(chunk)
+            return deleted_count
 
+        deleted_count += delete_chunk(chunk.filter(pk__lte=boundary_pk))
+        last_pk = boundary_pk
@@ -9,12 +9,24 @@ def detect_string_special_characters(string):
                 raise serializers.ValidationError(f'string should NOT include special characters --> {character} in {string}')
 
 
+def detect_column_special_characters(field_type, values):
+    # Special characters are only checked in short strings, other types have their own formats
+    if field_type == 'string':
+        for value in values:
+            detect_string_special_characters(value)
+
+
 def detect_dictionary_special_characters(dictionary):
     for key, value in dictionary.items():
         detect_string_special_characters(key)
         detect_string_special_characters(value)
 
 
+def detect_dictionary_keys_special_characters(dictionary):
+    for key in dictionary:
+        detect_string_special_characters(key)
+
+
 def validate_model_fields(fields):
     for key, value in fields.items():
         if not key or (isinstance(value, str) and not value):
@@ -1,23 +1,71 @@
-from django.http import JsonResponse
+import functools
+
 from rest_framework import status, serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView
-from django.apps import apps
-from django.db import models, connection
+from rest_framework.parsers import MultiPartParser
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http import StreamingHttpResponse
+from django.conf import settings
+from django.db import connections, router, transaction
 
 from api.serializers import (
     CreateDynamicModelSerializer,
     UpdateDynamicModelSerializer,
     PopulateDynamicModelSerializer,
+    UploadDynamicModelRowsSerializer,
+    BulkDeleteDynamicModelRowsSerializer,
+    BulkUpdateDynamicModelRowsSerializer,
+    ArchiveDynamicModelRowsSerializer,
+    ListDynamicModelRowsSerializer,
+    ExportDynamicModelRowsSerializer,
+    AggregateDynamicModelRowsSerializer,
+    DynamicModelRowsChangesSerializer,
+    CreateIngestionJobSerializer,
     generate_serializer_fields
 )
 from api.utils import (
     generate_model_class,
     write_fields_changes_in_database,
-    update_dynamic_model_with_new_fields
+    update_dynamic_model_with_new_fields,
+    delete_rows_in_chunks,
+    insert_rows
+)
+from api.streaming import iter_request_rows, iter_chunks
+from api.idempotency import idempotent
+from api.locking import locks_table, table_lock
+from api.records import (
+    EXPORT_CONTENT_TYPES,
+    get_field_names,
+    get_records,
+    get_aggregate_records,
+    as_dict,
+    iter_export_lines
+)
+from api.connections import get_connection_pools_stats
+from api.statistics import get_table_stats
+from api.statements import select_table_records
+from api.changes import (
+    OPERATION_UPSERT,
+    OPERATION_DELETE,
+    allocate_change_seqs,
+    delete_tracked_rows,
+    format_token,
+    get_changes,
+    parse_token,
+    wait_for_changes
 )
-from api.models import DynamicModel, DynamicModelField
+from api.archiving import (
+    archive_chunk,
+    compress_archive_columns,
+    compress_archive_table,
+    create_archive_table,
+    generate_archive_model_class
+)
+from api.ingestion import create_ingestion_job, describe_ingestion_job, load_rows_file, start_ingestion_job
+from api.models import ChangeCounter, DynamicModel, DynamicModelField, IngestionJob
+from api.sharding import choose_database
 
 
 class CreateDynamicModelView(APIView):
@@ -29,11 +77,18 @@ class CreateDynamicModelView(APIView):
         serializer.is_valid(raise_exception=True)
 
         # Save details of the dynamic model
-        dynamic_model = DynamicModel.objects.create(name=serializer.data['model_name'].lower())
-        for field_name, field_type in serializer.data['fields'].items():
-            DynamicModelField.objects.create(
-                name=field_name.lower(), field_type=field_type.lower(), model=dynamic_model
-            )
+        partition = serializer.validated_data.get('partition', {})
+        dynamic_model = DynamicModel.objects.create(
+            name=serializer.data['model_name'].lower(),
+            partition_field=partition.get('field', ''),
+            partition_type=partition.get('type', ''),
+            partition_size=partition.get('size'),
+            database=choose_database()
+        )
+        DynamicModelField.objects.bulk_create([
+            DynamicModelField(name=field_name.lower(), field_type=field_type.lower(), model=dynamic_model)
+            for field_name, field_type in serializer.data['fields'].items()
+        ])
 
         model_class = generate_model_class(dynamic_model)
 
@@ -42,9 +97,12 @@ class CreateDynamicModelView(APIView):
                 {'message': f'Error creating model class'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        # Write the model in the database
-        with connection.schema_editor() as editor:
-            editor.create_model(model_class)     
+        from api.partitioning import create_model_table
+
+        # Write the model in the database it is placed on
+        with connections[dynamic_model.database].schema_editor() as editor:
+            create_model_table(editor, dynamic_model, model_class)
+        ChangeCounter.objects.using(dynamic_model.database).create(dynamic_model_id=dynamic_model.id)
 
         return Response(
             {'message': f'Model "{dynamic_model.name}" created successfully. Its ID is {dynamic_model.id}'},
@@ -55,6 +113,7 @@ class CreateDynamicModelView(APIView):
 class UpdateDynamicModelView(APIView):
     serializer_class = UpdateDynamicModelSerializer
 
+    @locks_table()
     def put(self, request, model_id):
 
         serializer = self.serializer_class(data=request.data, context={'model_id': model_id})
@@ -72,12 +131,25 @@ class UpdateDynamicModelView(APIView):
             old_model_class, new_model_class, fields_names_to_delete
         )
 
+        # The archive table follows the schema of the table
+        if dynamic_model.has_archive:
+            old_archive_class = generate_archive_model_class(dynamic_model, old_model_class)
+            new_archive_class = generate_archive_model_class(dynamic_model, new_model_class)
+            write_fields_changes_in_database(old_archive_class, new_archive_class, fields_names_to_delete)
+            if dynamic_model.archive_compressed:
+                old_columns = {field.column for field in old_archive_class._meta.local_concrete_fields}
+                compress_archive_columns(connections[dynamic_model.database], new_archive_class, [
+                    field for field in new_archive_class._meta.local_concrete_fields if field.column not in old_columns
+                ])
+
         return Response({'message': 'Fields updated successfully'}, status=status.HTTP_200_OK)
 
 
 class PopulateDynamicModelView(APIView):
     serializer_class = PopulateDynamicModelSerializer
 
+    @idempotent
+    @locks_table(shared=True)
     def post(self, request, model_id):
 
         serializer = self.serializer_class(data=request.data, context={'model_id': model_id})
@@ -86,43 +158,340 @@ class PopulateDynamicModelView(APIView):
         dynamic_model = DynamicModel.objects.get(id=model_id)
         model_class = generate_model_class(dynamic_model)
 
-        for row in serializer.data['rows']:
-            model_class.objects.create(**row)
+        insert_rows(dynamic_model, model_class, serializer.validated_data['rows'])
 
         return Response({'message': 'Rows created successfully'}, status=status.HTTP_201_CREATED)
 
 
+class StreamPopulateDynamicModelView(APIView):
+    serializer_class = PopulateDynamicModelSerializer
+
+    @locks_table(shared=True)
+    def post(self, request, model_id):
+
+        # Rows are read from the request stream, never from request.data, so the body is not loaded at once
+        rows = iter_request_rows(request)
+        if rows is None:
+            return Response(
+                {'Error': 'Rows should be sent as application/x-ndjson or a JSON array'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        dynamic_model = DynamicModel.objects.prefetch_related('fields').filter(id=model_id).first()
+        if dynamic_model is None:
+            return Response({'Error': 'No dynamic model with this ID exists'}, status=status.HTTP_404_NOT_FOUND)
+        model_class = generate_model_class(dynamic_model)
+
+        # Validate and insert one chunk at a time, all chunks are rolled back if any of them is invalid
+        rows_count = 0
+        with transaction.atomic(using=router.db_for_write(model_class)):
+            for chunk in iter_chunks(rows, settings.DYNAMIC_MODEL_INGEST_CHUNK_SIZE):
+                serializer = self.serializer_class(data={'rows': chunk}, context={'dynamic_model': dynamic_model})
+                if not serializer.is_valid():
+                    raise serializers.ValidationError(
+                        {'Error': f'Invalid rows {rows_count + 1} to {rows_count + len(chunk)}', **serializer.errors}
+                    )
+                insert_rows(dynamic_model, model_class, serializer.validated_data['rows'])
+                rows_count += len(chunk)
+
+        if not rows_count:
+            raise serializers.ValidationError({'rows': ['This list may not be empty.']})
+
+        return Response({'message': f'{rows_count} rows created successfully'}, status=status.HTTP_201_CREATED)
+
+
+class UploadDynamicModelRowsView(APIView):
+    serializer_class = UploadDynamicModelRowsSerializer
+    parser_classes = [MultiPartParser]
+
+    @locks_table(shared=True)
+    def post(self, request, model_id):
+
+        # Write the uploaded file to a temporary file whatever its size, rows are then read from disk
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+
+        serializer = self.serializer_class(data=request.data, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+
+        dynamic_model = serializer.validated_data['dynamic_model']
+        uploaded_file = serializer.validated_data['file']
+        uploaded_file.seek(0)
+
+        # All chunks are rolled back if any of them is invalid
+        rows_count = load_rows_file(
+            dynamic_model, generate_model_class(dynamic_model), uploaded_file, serializer.validated_data['format']
+        )
+
+        if not rows_count:
+            raise serializers.ValidationError({'file': ['The file has no rows.']})
+
+        return Response({'message': f'{rows_count} rows created successfully'}, status=status.HTTP_201_CREATED)
+
+
 class ListDynamicModelRowsView(ListAPIView):
 
+    include_archived = False
+
+    def get_dynamic_model(self):
+        """Return the dynamic model of the request with its fields, loaded once per request."""
+
+        if not hasattr(self, '_dynamic_model'):
+            model_id = self.request.parser_context['kwargs']['model_id']
+            self._dynamic_model = DynamicModel.objects.prefetch_related('fields').filter(id=model_id).first()
+
+        return self._dynamic_model
+
     def get_serializer(self, *args, **kwargs):
         """
         Return the serializer instance that should be used for validating and
         deserializing input, and for serializing output.
         """
-        model_id = self.request.parser_context['kwargs']['model_id']
-        dynamic_model = DynamicModel.objects.get(id=model_id)
-
         serializer_class = type(
             'ListDynamicModelSerializer',
             (serializers.Serializer,),
-            generate_serializer_fields(dynamic_model)
+            generate_serializer_fields(self.get_dynamic_model())
         )
 
         return serializer_class(*args, **kwargs)
 
     def get_queryset(self):
-        model_id = self.request.parser_context['kwargs']['model_id']
-        try:
-            dynamic_model = DynamicModel.objects.get(id=model_id)
-            model_class = generate_model_class(dynamic_model)
-        except DynamicModel.DoesNotExist:
-            return None        
+        dynamic_model = self.get_dynamic_model()
+        if dynamic_model is None:
+            return None
 
-        return model_class.objects.all()
+        # Rows are serialized from records read with the select statement cached for the schema of the table
+        model_class = generate_model_class(dynamic_model)
+        field_names = get_field_names(dynamic_model)
+        records = select_table_records(model_class, field_names)
+        if self.include_archived and dynamic_model.has_archive:
+            archive_class = generate_archive_model_class(dynamic_model, model_class)
+            records.extend(get_records(archive_class.objects.all(), field_names))
+
+        return records
 
+    @locks_table(shared=True)
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        if queryset is None:
+        if self.get_dynamic_model() is None:
             return Response({'Error': 'No dynamic model with this ID exists'}, status=status.HTTP_404_NOT_FOUND)
 
+        serializer = ListDynamicModelRowsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        # Archived rows are only read when asked for
+        self.include_archived = serializer.validated_data['include_archived']
+
         return super().list(request, *args, **kwargs)
+
+
+class ExportDynamicModelRowsView(APIView):
+    serializer_class = ExportDynamicModelRowsSerializer
+
+    def get(self, request, model_id):
+
+        serializer = self.serializer_class(data=request.query_params, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+
+        dynamic_model = serializer.validated_data['dynamic_model']
+        export_format = serializer.validated_data['export_format']
+        model_class = generate_model_class(dynamic_model)
+        field_names = get_field_names(dynamic_model)
+        chunk_size = settings.DYNAMIC_MODEL_EXPORT_CHUNK_SIZE
+
+        def stream():
+            # The lock is held until the response is sent or closed
+            with table_lock(model_id, shared=True):
+                yield ''
+                records = get_records(model_class.objects.order_by('pk'), field_names, chunk_size)
+                yield from iter_export_lines(records, field_names, export_format, chunk_size)
+
+        lines = stream()
+        # Take the lock before the response starts, so a timeout still fails with 503
+        next(lines)
+
+        response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{dynamic_model.name}.{export_format}"'
+        return response
+
+
+class AggregateDynamicModelRowsView(APIView):
+    serializer_class = AggregateDynamicModelRowsSerializer
+
+    @locks_table(shared=True)
+    def get(self, request, model_id):
+
+        serializer = self.serializer_class(data=request.query_params, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+
+        model_class = generate_model_class(serializer.validated_data['dynamic_model'])
+        records = get_aggregate_records(
+            model_class.objects.all(), serializer.validated_data['group_by'], serializer.validated_data['metrics']
+        )
+
+        return Response([as_dict(record) for record in records], status=status.HTTP_200_OK)
+
+
+class DynamicModelRowsChangesView(APIView):
+    serializer_class = DynamicModelRowsChangesSerializer
+
+    def get(self, request, model_id):
+
+        serializer = self.serializer_class(data=request.query_params, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+
+        dynamic_model = serializer.validated_data['dynamic_model']
+        token = serializer.validated_data['token']
+        limit = serializer.validated_data['limit']
+
+        def read_changes():
+            # The table is not locked while waiting, schema updates may go on in between
+            with table_lock(model_id, shared=True):
+                return get_changes(dynamic_model, generate_model_class(dynamic_model), token, limit)
+
+        changes, has_more = read_changes()
+        # Long poll: hold the request until a change is made or the wait is over
+        if not changes and wait_for_changes(dynamic_model, parse_token(token)[0], serializer.validated_data['wait']):
+            changes, has_more = read_changes()
+
+        values_serializer = type(
+            'DynamicModelRowValuesSerializer', (serializers.Serializer,), generate_serializer_fields(dynamic_model)
+        )()
+        return Response({
+            'changes': [
+                {'id': row_id, 'operation': OPERATION_DELETE} if record is None else
+                {'id': row_id, 'operation': OPERATION_UPSERT, 'values': values_serializer.to_representation(record)}
+                for _, row_id, record in changes
+            ],
+            'token': format_token(*changes[-1][:2]) if changes else token,
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
+
+
+class BulkDeleteDynamicModelRowsView(APIView):
+    serializer_class = BulkDeleteDynamicModelRowsSerializer
+
+    @idempotent
+    @locks_table(shared=True)
+    def post(self, request, model_id):
+
+        serializer = self.serializer_class(data=request.data, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+
+        dynamic_model = DynamicModel.objects.get(id=model_id)
+        model_class = generate_model_class(dynamic_model)
+
+        # Select rows to delete on the database they are deleted from
+        queryset = model_class.objects.using(router.db_for_write(model_class)).filter(**serializer.validated_data['filters'])
+        deleted_count = delete_rows_in_chunks(
+            queryset, settings.DYNAMIC_MODEL_DELETE_CHUNK_SIZE, functools.partial(delete_tracked_rows, dynamic_model)
+        )
+
+        return Response({'message': f'{deleted_count} rows deleted successfully'}, status=status.HTTP_200_OK)
+
+
+class BulkUpdateDynamicModelRowsView(APIView):
+    serializer_class = BulkUpdateDynamicModelRowsSerializer
+
+    @idempotent
+    @locks_table(shared=True)
+    def post(self, request, model_id):
+
+        serializer = self.serializer_class(data=request.data, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+
+        dynamic_model = DynamicModel.objects.get(id=model_id)
+        model_class = generate_model_class(dynamic_model)
+
+        # Rows moving to another range partition may need a new partition
+        if dynamic_model.partition_field:
+            from api.partitioning import create_missing_partitions
+            create_missing_partitions(
+                connections[dynamic_model.database], dynamic_model, model_class, [serializer.validated_data['values']]
+            )
+        # Updated rows share one change sequence number
+        with transaction.atomic(using=dynamic_model.database):
+            updated_count = model_class.objects.filter(**serializer.validated_data['filters']).update(
+                **serializer.validated_data['values'], change_seq=allocate_change_seqs(dynamic_model, 1)
+            )
+
+        return Response({'message': f'{updated_count} rows updated successfully'}, status=status.HTTP_200_OK)
+
+
+class ArchiveDynamicModelRowsView(APIView):
+    serializer_class = ArchiveDynamicModelRowsSerializer
+
+    def post(self, request, model_id):
+
+        serializer = self.serializer_class(data=request.data, context={'model_id': model_id})
+        serializer.is_valid(raise_exception=True)
+        compress = serializer.validated_data['compress']
+
+        dynamic_model = DynamicModel.objects.get(id=model_id)
+        if not dynamic_model.has_archive or (compress and not dynamic_model.archive_compressed):
+            # Creating or compressing the archive table changes the schema
+            with table_lock(model_id):
+                dynamic_model.refresh_from_db()
+                archive_class = generate_archive_model_class(dynamic_model, generate_model_class(dynamic_model))
+                if not dynamic_model.has_archive:
+                    create_archive_table(dynamic_model, archive_class, compress)
+                elif compress and not dynamic_model.archive_compressed:
+                    compress_archive_table(connections[dynamic_model.database], archive_class)
+                dynamic_model.has_archive = True
+                dynamic_model.archive_compressed = dynamic_model.archive_compressed or compress
+                dynamic_model.save(update_fields=['has_archive', 'archive_compressed'])
+
+        with table_lock(model_id, shared=True):
+            # The table may have moved to another database meanwhile
+            dynamic_model.refresh_from_db()
+            model_class = generate_model_class(dynamic_model)
+            archive_class = generate_archive_model_class(dynamic_model, model_class)
+            queryset = model_class.objects.using(router.db_for_write(model_class)).filter(**serializer.validated_data['filters'])
+            archived_count = delete_rows_in_chunks(
+                queryset, settings.DYNAMIC_MODEL_ARCHIVE_CHUNK_SIZE, functools.partial(archive_chunk, dynamic_model, archive_class)
+            )
+
+        return Response({'message': f'{archived_count} rows archived successfully'}, status=status.HTTP_200_OK)
+
+
+class DynamicModelTableStatsView(APIView):
+
+    def get(self, request, model_id):
+
+        dynamic_model = DynamicModel.objects.prefetch_related('fields').filter(id=model_id).first()
+        if dynamic_model is None:
+            return Response({'Error': 'No dynamic model with this ID exists'}, status=status.HTTP_404_NOT_FOUND)
+
+        stats = get_table_stats(dynamic_model, generate_model_class(dynamic_model))
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+class CreateIngestionJobView(APIView):
+    serializer_class = CreateIngestionJobSerializer
+
+    def post(self, request):
+
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Files are loaded in the background, the job is followed with IngestionJobView
+        job = create_ingestion_job(serializer.validated_data['entries'], serializer.validated_data['workers'])
+        start_ingestion_job(job)
+
+        return Response(
+            {'message': f'Ingestion job started. Its ID is {job.id}', 'job_id': job.id}, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class IngestionJobView(APIView):
+
+    def get(self, request, job_id):
+
+        job = IngestionJob.objects.filter(id=job_id).first()
+        if job is None:
+            return Response({'Error': 'No ingestion job with this ID exists'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(describe_ingestion_job(job), status=status.HTTP_200_OK)
+
+
+class DatabasePoolStatsView(APIView):
+
+    def get(self, request):
+        return Response(get_connection_pools_stats(), status=status.HTTP_200_OK)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaPinningMiddleware',
+    'api.middleware.SlowQueryLogMiddleware',
 ]
 
 ROOT_URLCONF = 'dynamicModels.urls'
@@ -84,9 +87,105 @@ DATABASES = {
         'PASSWORD': 'postgres',
         'HOST': 'localhost',
         'PORT': 5432,
+        # Keep connections open between requests, and check them before reusing them
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     },
 }
 
+# Set DATABASE_POOL_MAX_CONNS to share a pool of connections between the threads of a process
+if os.environ.get('DATABASE_POOL_MAX_CONNS'):
+    DATABASES['default'].update({
+        'ENGINE': 'api.backends.postgresql_pool',
+        # Connections are returned to the pool at the end of every request
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL': {
+            'MIN_CONNS': int(os.environ.get('DATABASE_POOL_MIN_CONNS', 4)),
+            'MAX_CONNS': int(os.environ['DATABASE_POOL_MAX_CONNS']),
+            'TIMEOUT': float(os.environ.get('DATABASE_POOL_TIMEOUT', 5)),
+            'HEALTH_CHECKS': True,
+        },
+    })
+
+# Set DATABASE_ENGINE=sqlite to run against a local SQLite database instead of Postgres
+if os.environ.get('DATABASE_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+    }
+
+
+# Read replicas of dynamic model tables, set DATABASE_REPLICAS to a comma separated list
+# of replica hosts (or of database files with DATABASE_ENGINE=sqlite)
+DYNAMIC_MODEL_READ_REPLICAS = {}
+for index, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    replica_settings = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    replica_settings['NAME' if os.environ.get('DATABASE_ENGINE') == 'sqlite' else 'HOST'] = replica
+    DATABASES[f'replica{index}'] = replica_settings
+    DYNAMIC_MODEL_READ_REPLICAS.setdefault('default', []).append(f'replica{index}')
+
+# Seconds during which reads go to the primary after a write, so that clients read their own writes
+DYNAMIC_MODEL_REPLICA_PIN_SECONDS = 5
+
+# Databases dynamic model tables are placed on, set DATABASE_SHARDS to a comma separated list of
+# shard hosts (or of database files with DATABASE_ENGINE=sqlite). New tables are placed on the shard
+# holding the fewest tables, details of dynamic models stay in the default database.
+DYNAMIC_MODEL_SHARDS = ['default']
+for index, shard in enumerate(filter(None, os.environ.get('DATABASE_SHARDS', '').split(',')), start=1):
+    shard_settings = {**DATABASES['default']}
+    shard_settings['NAME' if os.environ.get('DATABASE_ENGINE') == 'sqlite' else 'HOST'] = shard
+    DATABASES[f'shard{index}'] = shard_settings
+    DYNAMIC_MODEL_SHARDS.append(f'shard{index}')
+
+DATABASE_ROUTERS = ['api.routers.DynamicModelReplicaRouter']
+
+# Build model classes of dynamic models when a process starts, either 'eager' (startup waits for them)
+# or 'lazy' (built by a background thread), for at most DYNAMIC_MODELS_PRELOAD_LIMIT dynamic models
+DYNAMIC_MODELS_PRELOAD = os.environ.get('DYNAMIC_MODELS_PRELOAD')
+DYNAMIC_MODELS_PRELOAD_LIMIT = int(os.environ.get('DYNAMIC_MODELS_PRELOAD_LIMIT', 5000))
+
+# Hash partitioned tables are created with at most this many partitions
+DYNAMIC_MODEL_MAX_HASH_PARTITIONS = 64
+
+# Bulk deletes of dynamic model rows are run in chunks of this many rows
+DYNAMIC_MODEL_DELETE_CHUNK_SIZE = 10000
+
+# Rows are moved to archive tables in chunks of this many rows
+DYNAMIC_MODEL_ARCHIVE_CHUNK_SIZE = 1000
+
+# Streamed rows are validated and inserted in chunks of this many rows
+DYNAMIC_MODEL_INGEST_CHUNK_SIZE = 1000
+
+# Ingestion jobs load at most this many tables at the same time per process, from files under
+# DYNAMIC_MODEL_INGEST_ROOT when started from the API (disabled when it is not set)
+DYNAMIC_MODEL_INGEST_WORKERS = int(os.environ.get('DYNAMIC_MODEL_INGEST_WORKERS', 4))
+DYNAMIC_MODEL_INGEST_ROOT = os.environ.get('DYNAMIC_MODEL_INGEST_ROOT')
+
+# Exported rows are read from the database and written to the response in chunks of this many rows
+DYNAMIC_MODEL_EXPORT_CHUNK_SIZE = 1000
+
+# Change feed requests return at most this many changes, and wait at most DYNAMIC_MODEL_CHANGES_MAX_WAIT
+# seconds for new ones, checking every DYNAMIC_MODEL_CHANGES_POLL_INTERVAL seconds
+DYNAMIC_MODEL_CHANGES_PAGE_SIZE = 1000
+DYNAMIC_MODEL_CHANGES_MAX_WAIT = 30
+DYNAMIC_MODEL_CHANGES_POLL_INTERVAL = 0.5
+
+# Responses of requests sent with an Idempotency-Key header are replayed for this many seconds
+DYNAMIC_MODEL_IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Seconds requests wait for the lock of a dynamic model table before failing with 503
+DYNAMIC_MODEL_LOCK_TIMEOUT = 30
+
+# Queries on dynamic model tables running longer than this many seconds are logged with their plan
+DYNAMIC_MODEL_SLOW_QUERY_SECONDS = float(os.environ.get('DYNAMIC_MODEL_SLOW_QUERY_SECONDS', 1))
+
+# Run inserts and selects of dynamic model tables as prepared statements on PostgreSQL,
+# to be turned off behind a transaction pooler since they live in database sessions
+DYNAMIC_MODEL_PREPARED_STATEMENTS = os.environ.get('DYNAMIC_MODEL_PREPARED_STATEMENTS', 'true').lower() == 'true'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -0,0 +1,37 @@
+"""
+API-only settings for dynamicModels project.
+
+Slim deployment profile for workers that only serve the api app: the
+admin, sessions, messages, static files and browsable API stacks are not
+loaded, which lowers worker startup time and memory use. Select it with
+DJANGO_SETTINGS_MODULE=dynamicModels.settings_api.
+"""
+
+from dynamicModels.settings import *  # noqa: F401,F403
+
+
+INSTALLED_APPS = [
+    'rest_framework',
+    'api'
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'api.middleware.ReplicaPinningMiddleware',
+    'api.middleware.SlowQueryLogMiddleware',
+]
+
+ROOT_URLCONF = 'dynamicModels.urls_api'
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# Without django.contrib.auth requests are anonymous and responses are rendered as JSON only
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'UNAUTHENTICATED_USER': None,
+}
@@ -0,0 +1,7 @@
+"""dynamicModels URL Configuration of the API-only settings, see settings_api.py"""
+from django.urls import path
+from django.conf.urls import include
+
+urlpatterns = [
+    path('api/', include(('api.urls', 'api'), namespace='api'))
+]